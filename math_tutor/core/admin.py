@@ -1,17 +1,15 @@
 # core/admin.py
-from decimal import Decimal
-from django.db import models
 from django.urls import path
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib import admin, messages
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.db.models import Sum, F, Value
-from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.exceptions import PermissionDenied
+from .services.scheduling import generate_sessions_for_groups
+from .services.billing import refresh_invoice_statuses, with_billing_summary
 from .models import (
     Subject,
     TeacherProfile,
@@ -30,7 +28,9 @@ from .models import (
     NotificationLog,
     Invoice,
     Payment,
+    PdfJob,
     StudentProfile,
+    TeacherDashboardSnapshot,
 )
 
 # ----------------- Inlines -----------------
@@ -166,39 +166,12 @@ class GroupAdmin(admin.ModelAdmin):
         return my_urls + urls
 
     def _generate_for_groups(self, groups):
-        """منطق التوليد الفعلي؛ يُستخدم في المسارين."""
-        created = 0
+        """منطق التوليد الفعلي؛ يُستخدم في المسارين (اليوم + 7 أيام)."""
         today = timezone.localdate()
-        next_week = today + timezone.timedelta(days=7)
-
-        blocks_prefetch = WeeklyScheduleBlock.objects.select_related("group")
-        groups = groups.select_related("teacher", "subject").prefetch_related(
-            models.Prefetch("weekly_blocks", queryset=blocks_prefetch)
+        return generate_sessions_for_groups(
+            groups, today, today + timezone.timedelta(days=7)
         )
 
-        for g in groups:
-            for b in g.weekly_blocks.all():
-                day = today
-                while day <= next_week:
-                    if day.isoweekday() == b.weekday:
-                        exists = ClassSession.objects.filter(
-                            group=g, date=day, start_time=b.start_time
-                        ).exists()
-                        if not exists:
-                            ClassSession.objects.create(
-                                group=g,
-                                teacher=g.teacher,
-                                subject=g.subject,  # ياخذ مادة الجروب
-                                date=day,
-                                start_time=b.start_time,
-                                end_time=b.end_time,
-                                is_online=b.is_online,
-                                meeting_link=b.meeting_link,
-                            )
-                            created += 1
-                    day += timezone.timedelta(days=1)
-        return created
-
     def generate_next_week_view(self, request):
         if not self.has_change_permission(request):
             raise PermissionDenied
@@ -207,9 +180,11 @@ class GroupAdmin(admin.ModelAdmin):
             return redirect("admin:core_group_changelist")
 
         groups = Group.objects.all()
-        created = self._generate_for_groups(groups)
+        created, skipped = self._generate_for_groups(groups)
         messages.success(
-            request, f"تم توليد {created} حصة للأسبوع القادم لجميع المجموعات."
+            request,
+            f"تم توليد {created} حصة للأسبوع القادم لجميع المجموعات"
+            f" (تم تخطّي {skipped} موجودة مسبقًا).",
         )
         return redirect("admin:core_group_changelist")
 
@@ -226,10 +201,11 @@ class GroupAdmin(admin.ModelAdmin):
             return redirect("admin:core_group_changelist")
 
         groups = Group.objects.filter(teacher_id=teacher_id)
-        created = self._generate_for_groups(groups)
+        created, skipped = self._generate_for_groups(groups)
         messages.success(
             request,
-            f"تم توليد {created} حصة للأسبوع القادم لمجموعات المدرّس #{teacher_id}.",
+            f"تم توليد {created} حصة للأسبوع القادم لمجموعات المدرّس #{teacher_id}"
+            f" (تم تخطّي {skipped} موجودة مسبقًا).",
         )
         return redirect("admin:core_group_changelist")
 
@@ -428,38 +404,23 @@ class InvoiceAdmin(admin.ModelAdmin):
 
     actions = ["action_refresh_status"]
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        # نضيف paid_sum و remaining_annot لتُعرض بسرعة في الجدول
-        qs = qs.annotate(
-            paid_sum=Coalesce(Sum("payments__amount_egp"), Value(Decimal("0.00"))),
-        ).annotate(remaining_annot=F("amount_egp") - F("paid_sum"))
-        return qs.select_related("student", "parent__user", "group")
-
-    @admin.display(description=_("مدفوع"))
+    @admin.display(description=_("مدفوع"), ordering="paid_total")
     def total_paid_annot(self, obj):
-        # يستخدم الـ annotate لتجنّب N+1
-        paid = getattr(obj, "paid_sum", None)
-        return paid if paid is not None else obj.total_paid
+        # paid_total مخزّن على الفاتورة (بدون join/تجميع للمدفوعات)
+        return obj.paid_total
 
     @admin.display(description=_("المتبقي"))
     def remaining_annot(self, obj):
-        rem = getattr(obj, "remaining_annot", None)
-        if rem is None:
-            rem = obj.amount_egp - obj.total_paid
         # لا نظهر قيم سالبة
-        return rem if rem > 0 else Decimal("0.00")
+        return obj.remaining
 
     @admin.action(description=_("تحديث حالة الفواتير المختارة"))
     def action_refresh_status(self, request, queryset):
-        updated = 0
-        for inv in queryset:
-            old = inv.status
-            inv.refresh_status(commit=True)
-            if inv.status != old:
-                updated += 1
+        changed = refresh_invoice_statuses(queryset)
         self.message_user(
-            request, _(f"تم تحديث حالة {updated} فاتورة."), level=messages.SUCCESS
+            request,
+            _(f"تم تحديث حالة {sum(changed.values())} فاتورة."),
+            level=messages.SUCCESS,
         )
 
 
@@ -498,6 +459,48 @@ class NotificationLogAdmin(admin.ModelAdmin):
     list_select_related = ("recipient",)
 
 
+# ----------------- PDF jobs -----------------
+
+
+@admin.register(PdfJob)
+class PdfJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "kind",
+        "status",
+        "requested_by",
+        "group",
+        "year",
+        "month",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("kind", "status", "created_at")
+    search_fields = ("requested_by__username", "filename")
+    list_select_related = ("requested_by", "group")
+    readonly_fields = [f.name for f in PdfJob._meta.fields]
+
+
+# ----------------- Dashboard snapshots -----------------
+
+
+@admin.register(TeacherDashboardSnapshot)
+class TeacherDashboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = (
+        "teacher",
+        "built_for",
+        "total_groups",
+        "total_students",
+        "upcoming_count",
+        "due_invoices",
+        "is_stale",
+        "built_at",
+    )
+    list_filter = ("is_stale", "built_for")
+    list_select_related = ("teacher__user",)
+    readonly_fields = [f.name for f in TeacherDashboardSnapshot._meta.fields]
+
+
 # ----------------- Profiles -----------------
 
 
@@ -510,10 +513,37 @@ class TeacherProfileAdmin(admin.ModelAdmin):
 
 @admin.register(ParentProfile)
 class ParentProfileAdmin(admin.ModelAdmin):
-    list_display = ("user", "phone")
+    list_display = (
+        "user",
+        "phone",
+        "total_due_annot",
+        "total_overdue_annot",
+        "month_paid_annot",
+        "open_count_annot",
+    )
     search_fields = ("user__username", "user__first_name", "user__last_name")
     list_select_related = ("user",)
 
+    def get_queryset(self, request):
+        # ملخّص الفوترة (نفس أرقام لوحة وليّ الأمر) كأعمدة في نفس كويري القائمة
+        return with_billing_summary(super().get_queryset(request))
+
+    @admin.display(description=_("المستحق"), ordering="total_due")
+    def total_due_annot(self, obj):
+        return obj.total_due
+
+    @admin.display(description=_("المتأخر"), ordering="total_overdue")
+    def total_overdue_annot(self, obj):
+        return obj.total_overdue
+
+    @admin.display(description=_("مدفوع هذا الشهر"), ordering="month_paid")
+    def month_paid_annot(self, obj):
+        return obj.month_paid
+
+    @admin.display(description=_("فواتير مفتوحة"), ordering="open_count")
+    def open_count_annot(self, obj):
+        return obj.open_count
+
 
 @admin.register(StudentProfile)
 class StudentProfileAdmin(admin.ModelAdmin):
@@ -1,68 +1,125 @@
 # core/export_views.py
-import csv
+from django.core.files.storage import default_storage
+from django.db.models.functions import Substr
 from django.http import HttpResponse
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 from .views import _get_teacher
-from .models import Attendance, HomeworkSubmission, Group
+from .models import Attendance, HomeworkSubmission
+from .utiils import parse_date_param, parse_int_param, stream_csv, wants_bom
+
+# كل التصديرات متدفقة: values_list + iterator، من غير model instances
+CHUNK = 2000
 
 
 @login_required
 def export_today_attendance(request):
+    """
+    حضور النهارده افتراضيًا؛ ?date_from=&date_to= لأي مدى (ترم كامل مثلًا)،
+    ?group= لمجموعة واحدة، ?bom=1 لـ Excel.
+    """
     teacher = _get_teacher(request.user)
     if not teacher:
         return HttpResponse("Unauthorized", status=401)
 
     today = timezone.localdate()
+    date_from = parse_date_param(request, "date_from") or today
+    date_to = parse_date_param(request, "date_to") or max(date_from, today)
     qs = Attendance.objects.filter(
-        session__teacher=teacher, session__date=today
-    ).select_related("session", "student", "session__group")
+        session__teacher=teacher, session__date__range=(date_from, date_to)
+    )
+    group_id = parse_int_param(request, "group")
+    if group_id:
+        qs = qs.filter(session__group_id=group_id)
 
-    response = HttpResponse(content_type="text/csv; charset=utf-8")
-    response["Content-Disposition"] = f'attachment; filename="attendance_{today}.csv"'
-    writer = csv.writer(response)
-    writer.writerow(["التاريخ", "الوقت", "المجموعة", "الطالب", "الحالة", "ملاحظة"])
-    for r in qs:
-        writer.writerow(
-            [
-                r.session.date,
-                f"{r.session.start_time}-{r.session.end_time}",
-                r.session.group.name,
-                f"{r.student.first_name} {r.student.last_name}",
-                r.get_status_display(),
-                r.note or "",
-            ]
+    status_labels = dict(Attendance.Status.choices)
+    rows = (
+        [
+            d,
+            f"{start}-{end}",
+            group,
+            f"{first} {last}",
+            status_labels.get(status, status),
+            note or "",
+        ]
+        for d, start, end, group, first, last, status, note in qs.order_by(
+            "session__date", "session__start_time", "session__group__name", "student_id"
+        )
+        .values_list(
+            "session__date",
+            "session__start_time",
+            "session__end_time",
+            "session__group__name",
+            "student__first_name",
+            "student__last_name",
+            "status",
+            "note",
         )
-    return response
+        .iterator(chunk_size=CHUNK)
+    )
+    filename = (
+        f"attendance_{date_from}.csv"
+        if date_from == date_to
+        else f"attendance_{date_from}_{date_to}.csv"
+    )
+    return stream_csv(
+        ["التاريخ", "الوقت", "المجموعة", "الطالب", "الحالة", "ملاحظة"],
+        rows,
+        filename,
+        bom=wants_bom(request),
+    )
 
 
 @login_required
 def export_ungraded_submissions(request):
+    """التسليمات اللي لسه ما اتصحّحتش — ?date_from=&date_to= (وقت التسليم)، ?group=، ?bom=1."""
     teacher = _get_teacher(request.user)
     if not teacher:
         return HttpResponse("Unauthorized", status=401)
 
-    groups = Group.objects.filter(teacher=teacher)
     qs = HomeworkSubmission.objects.filter(
-        assignment__group__in=groups, status=HomeworkSubmission.Status.SUBMITTED
-    ).select_related("assignment", "student", "assignment__group")
-
-    response = HttpResponse(content_type="text/csv; charset=utf-8")
-    response["Content-Disposition"] = 'attachment; filename="ungraded_submissions.csv"'
-    writer = csv.writer(response)
-    writer.writerow(
-        ["الواجب", "المجموعة", "الطالب", "وقت التسليم", "رابط", "ملف", "نص الإجابة"]
+        assignment__group__teacher=teacher, status=HomeworkSubmission.Status.SUBMITTED
     )
-    for r in qs:
-        writer.writerow(
-            [
-                r.assignment.title,
-                r.assignment.group.name,
-                f"{r.student.first_name} {r.student.last_name}",
-                timezone.localtime(r.submitted_at).strftime("%Y-%m-%d %H:%M"),
-                r.link or "",
-                (r.file.url if r.file else ""),
-                (r.answer_text[:100].replace("\n", " ") if r.answer_text else ""),
-            ]
+    date_from = parse_date_param(request, "date_from")
+    date_to = parse_date_param(request, "date_to")
+    if date_from:
+        qs = qs.filter(submitted_at__date__gte=date_from)
+    if date_to:
+        qs = qs.filter(submitted_at__date__lte=date_to)
+    group_id = parse_int_param(request, "group")
+    if group_id:
+        qs = qs.filter(assignment__group_id=group_id)
+
+    rows = (
+        [
+            title,
+            group,
+            f"{first} {last}",
+            timezone.localtime(submitted_at).strftime("%Y-%m-%d %H:%M"),
+            link or "",
+            default_storage.url(file) if file else "",
+            (answer or "").replace("\n", " "),
+        ]
+        for title, group, first, last, submitted_at, link, file, answer in qs.order_by(
+            "-submitted_at", "-id"
+        )
+        # أول 100 حرف بس من الإجابة — من غير ما نسحب النص كله من الداتابيز
+        .annotate(answer_head=Substr("answer_text", 1, 100))
+        .values_list(
+            "assignment__title",
+            "assignment__group__name",
+            "student__first_name",
+            "student__last_name",
+            "submitted_at",
+            "link",
+            "file",
+            "answer_head",
         )
-    return response
+        .iterator(chunk_size=CHUNK)
+    )
+    return stream_csv(
+        ["الواجب", "المجموعة", "الطالب", "وقت التسليم", "رابط", "ملف", "نص الإجابة"],
+        rows,
+        "ungraded_submissions.csv",
+        bom=wants_bom(request),
+    )
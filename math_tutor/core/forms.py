@@ -100,6 +100,42 @@ class HomeworkBulkGradeForm(forms.ModelForm):
         return cleaned
 
 
+class _LoadedRowChoiceField(forms.ModelChoiceField):
+    """حقل id في الفورمسِت: بيتحقق من الصفوف المحمّلة بالفعل بدل queryset.get() لكل فورم."""
+
+    def __init__(self, rows, *args, **kwargs):
+        self.rows = rows
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.rows[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"], code="invalid_choice"
+            )
+
+
+class BulkGradeFormSet(forms.BaseModelFormSet):
+    """صفحة تصحيح كاملة (لحد 200 صف) بكويري واحد للصفوف بدل كويري لكل صف."""
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        if not hasattr(self, "_rows"):
+            self._rows = {obj.pk: obj for obj in self.get_queryset()}
+        pk_name = self.model._meta.pk.name
+        field = form.fields[pk_name]
+        form.fields[pk_name] = _LoadedRowChoiceField(
+            self._rows,
+            field.queryset,
+            initial=field.initial,
+            required=False,
+            widget=field.widget,
+        )
+
+
 class StudentSubmissionForm(forms.ModelForm):
     class Meta:
         model = HomeworkSubmission
@@ -223,9 +259,15 @@ class InvoiceForm(forms.ModelForm):
 class InvoiceBulkForm(forms.Form):
     group = forms.ModelChoiceField(
         queryset=Group.objects.none(),
+        required=False,
         widget=forms.Select(attrs={"class": "form-select"}),
         label="المجموعة",
     )
+    all_groups = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
+        label="كل مجموعاتي",
+    )
     year = forms.IntegerField(
         min_value=2020,
         widget=forms.NumberInput(attrs={"class": "form-control"}),
@@ -243,6 +285,44 @@ class InvoiceBulkForm(forms.Form):
         widget=forms.NumberInput(attrs={"class": "form-control", "step": "0.01"}),
         label="المبلغ",
     )
+    due_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+        label="تاريخ الاستحقاق",
+    )
+
+    def __init__(self, *args, **kwargs):
+        teacher = kwargs.pop("teacher", None)
+        super().__init__(*args, **kwargs)
+        if teacher:
+            self.fields["group"].queryset = Group.objects.filter(
+                teacher=teacher
+            ).order_by("name")
+
+    def clean(self):
+        cleaned = super().clean()
+        if not cleaned.get("group") and not cleaned.get("all_groups"):
+            self.add_error("group", "اختر مجموعة أو فعّل (كل مجموعاتي).")
+        return cleaned
+
+
+class InvoiceBundleForm(forms.Form):
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.none(),
+        widget=forms.Select(attrs={"class": "form-select"}),
+        label="المجموعة",
+    )
+    year = forms.IntegerField(
+        min_value=2020,
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+        label="السنة",
+    )
+    month = forms.IntegerField(
+        min_value=1,
+        max_value=12,
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+        label="الشهر",
+    )
 
     def __init__(self, *args, **kwargs):
         teacher = kwargs.pop("teacher", None)
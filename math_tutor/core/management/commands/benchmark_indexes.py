@@ -0,0 +1,168 @@
+# core/management/commands/benchmark_indexes.py
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core.models import (
+    Assignment,
+    Attendance,
+    ClassSession,
+    Enrollment,
+    Group,
+    HomeworkSubmission,
+    Resource,
+    Student,
+    TeacherProfile,
+)
+from core.services.dataset import seed_dataset
+
+# الفهارس المركّبة اللي بنقيس أثرها (نفس اللي في Meta.indexes)
+BENCH_INDEXES = [
+    (ClassSession, ["teacher", "date", "start_time"]),
+    (HomeworkSubmission, ["status", "-submitted_at"]),
+    (Assignment, ["group", "-assigned_at"]),
+    (Attendance, ["student", "session"]),
+    (Enrollment, ["group", "is_active"]),
+    (Resource, ["-created_at"]),
+]
+
+
+def _indexes():
+    out = []
+    for model, fields in BENCH_INDEXES:
+        idx = next((i for i in model._meta.indexes if i.fields == fields), None)
+        if idx is None:
+            raise CommandError(f"الفهرس {model.__name__}{fields} غير موجود في Meta.indexes.")
+        out.append((model, idx))
+    return out
+
+
+def _queries(teacher, group, student):
+    """نفس أشكال الاستعلامات الساخنة في core/views.py."""
+    today = timezone.localdate()
+    groups = Group.objects.filter(teacher=teacher)
+    return {
+        "teacher_upcoming_sessions": ClassSession.objects.filter(
+            teacher=teacher, date__gte=today
+        ).order_by("date", "start_time")[:10],
+        "group_sessions": ClassSession.objects.filter(group=group).order_by(
+            "date", "start_time"
+        ),
+        "recent_ungraded_submissions": HomeworkSubmission.objects.filter(
+            assignment__group__in=groups, status=HomeworkSubmission.Status.SUBMITTED
+        ).order_by("-submitted_at")[:8],
+        "to_grade_queue": HomeworkSubmission.objects.filter(
+            status__in=[
+                HomeworkSubmission.Status.SUBMITTED,
+                HomeworkSubmission.Status.LATE,
+            ]
+        ).order_by("-submitted_at")[:50],
+        "recent_assignments": Assignment.objects.filter(group__in=groups).order_by(
+            "-assigned_at"
+        )[:5],
+        "student_attendance": Attendance.objects.filter(student=student).select_related(
+            "session"
+        ),
+        "group_active_enrollments": Enrollment.objects.filter(
+            group=group, is_active=True
+        ),
+        "latest_resources": Resource.objects.order_by("-created_at")[:20],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "قياس أثر الفهارس المركّبة: EXPLAIN + توقيتات للاستعلامات الساخنة بدون الفهارس ثم بها. "
+        "شغّله على داتابيز قياس مش على الإنتاج (--seed يضيف بيانات)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed", action="store_true", help="ازرع بيانات تجريبية قبل القياس."
+        )
+        parser.add_argument("--teachers", type=int, default=10)
+        parser.add_argument("--groups-per-teacher", type=int, default=5)
+        parser.add_argument("--students-per-group", type=int, default=30)
+        parser.add_argument("--weeks", type=int, default=16)
+        parser.add_argument("--prefix", type=str, default="bench")
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="عدد مرات تنفيذ كل استعلام (افتراضي 20)."
+        )
+        parser.add_argument("--output", type=str, help="مسار ملف JSON للتقرير.")
+
+    def handle(self, *args, **opts):
+        report = {"vendor": connection.vendor, "repeat": opts["repeat"]}
+
+        if opts["seed"]:
+            t0 = time.perf_counter()
+            report["seeded"] = seed_dataset(
+                teachers=opts["teachers"],
+                groups_per_teacher=opts["groups_per_teacher"],
+                students_per_group=opts["students_per_group"],
+                weeks=opts["weeks"],
+                prefix=opts["prefix"],
+            )
+            report["seed_seconds"] = round(time.perf_counter() - t0, 2)
+            self.stdout.write(f"تم زرع البيانات: {report['seeded']}")
+
+        teacher = TeacherProfile.objects.order_by("-id").first()
+        group = Group.objects.filter(teacher=teacher).first() if teacher else None
+        student = (
+            Student.objects.filter(enrollments__group=group).first() if group else None
+        )
+        if not (teacher and group and student):
+            raise CommandError("لا توجد بيانات كافية للقياس — استخدم --seed.")
+
+        indexes = _indexes()
+        try:
+            self._set_indexes(indexes, present=False)
+            report["before"] = self._measure(teacher, group, student, opts["repeat"])
+        finally:
+            # الفهارس لازم ترجع مهما حصل
+            self._set_indexes(indexes, present=True)
+        report["after"] = self._measure(teacher, group, student, opts["repeat"])
+
+        for name, after in report["after"].items():
+            before = report["before"][name]
+            self.stdout.write(
+                f"{name:32} {before['median_ms']:9.3f}ms → {after['median_ms']:9.3f}ms"
+            )
+
+        if opts.get("output"):
+            with open(opts["output"], "w", encoding="utf-8") as fh:
+                json.dump(report, fh, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"تم حفظ التقرير في {opts['output']}"))
+
+    def _existing_index_names(self, model):
+        with connection.cursor() as cursor:
+            return set(
+                connection.introspection.get_constraints(cursor, model._meta.db_table)
+            )
+
+    def _set_indexes(self, indexes, present):
+        with connection.schema_editor() as editor:
+            for model, idx in indexes:
+                exists = idx.name in self._existing_index_names(model)
+                if present and not exists:
+                    editor.add_index(model, idx)
+                elif not present and exists:
+                    editor.remove_index(model, idx)
+
+    def _measure(self, teacher, group, student, repeat):
+        results = {}
+        for name, qs in _queries(teacher, group, student).items():
+            timings = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                list(qs.all())
+                timings.append((time.perf_counter() - t0) * 1000)
+            results[name] = {
+                "median_ms": round(statistics.median(timings), 3),
+                "max_ms": round(max(timings), 3),
+                "explain": qs.explain(),
+            }
+        return results
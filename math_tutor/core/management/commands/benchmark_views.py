@@ -0,0 +1,232 @@
+# core/management/commands/benchmark_views.py
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from core.models import (
+    Invoice,
+    MonthlyReport,
+    Student,
+    TeacherProfile,
+)
+from core.services import fragment_cache
+from core.views import (
+    _PARENT_TAB_BUILDERS,
+    _STUDENT_TAB_BUILDERS,
+    _TEACHER_TAB_BUILDERS,
+)
+
+
+def _pick_actors():
+    """أكبر مدرّس (بعدد المجموعات) + وليّ أمر وطالب من مجموعاته + فاتورة وتقرير."""
+    teacher = (
+        TeacherProfile.objects.select_related("user")
+        .annotate(n=Count("teachergroups"))
+        .order_by("-n", "id")
+        .first()
+    )
+    if teacher is None:
+        return None
+    student = (
+        Student.objects.filter(
+            enrollments__group__teacher=teacher,
+            parent__isnull=False,
+            profile__isnull=False,
+        )
+        .select_related("parent__user", "profile__user")
+        .first()
+    )
+    if student is None:
+        return None
+    return {
+        "teacher": teacher,
+        "parent": student.parent,
+        "student_user": student.profile.user,
+        "invoice": Invoice.objects.filter(
+            parent=student.parent, group__teacher=teacher
+        ).first(),
+        "report": MonthlyReport.objects.filter(student=student).first(),
+    }
+
+
+def _tab_endpoints(prefix, user, url_name, builders):
+    """كل تبويب مرتين: بكاش أجزاء فاضي (cold) ومسخّن (warm)."""
+    eps = []
+    for slug in builders:
+        url = reverse(url_name, args=[slug])
+        eps.append((f"{prefix}_tab_{slug}_cold", user, url, True))
+        eps.append((f"{prefix}_tab_{slug}_warm", user, url, False))
+    return eps
+
+
+def _endpoints(a):
+    """(الاسم، المستخدم، الرابط، cold) لكل endpoint بنقيسه."""
+    tu, pu, su = a["teacher"].user, a["parent"].user, a["student_user"]
+    eps = [
+        ("teacher_dashboard", tu, reverse("core:dashboard")),
+        ("parent_dashboard", pu, reverse("core:parent_dashboard")),
+        ("student_dashboard", su, reverse("core:student_dashboard")),
+        ("bulk_grade", tu, reverse("core:bulk_grade")),
+        ("bulk_grade_export_csv", tu, reverse("core:bulk_grade_export")),
+        ("export_today_attendance_csv", tu, reverse("core:export_today_att")),
+        ("export_ungraded_csv", tu, reverse("core:export_ungraded")),
+        ("parent_invoices", pu, reverse("core:parent_invoices")),
+    ]
+    if a["invoice"]:
+        eps.append(
+            (
+                "invoice_pdf",
+                tu,
+                reverse("core:invoice_pdf_teacher", args=[a["invoice"].id]),
+            )
+        )
+    if a["report"]:
+        r = a["report"]
+        eps.append(
+            (
+                "parent_report_pdf",
+                pu,
+                reverse("core:parent_report_pdf", args=[r.student_id, r.year, r.month]),
+            )
+        )
+    eps = [e + (False,) for e in eps]
+    eps += _tab_endpoints("teacher", tu, "core:dashboard_tab", _TEACHER_TAB_BUILDERS)
+    eps += _tab_endpoints("parent", pu, "core:parent_dashboard_tab", _PARENT_TAB_BUILDERS)
+    eps += _tab_endpoints("student", su, "core:student_dashboard_tab", _STUDENT_TAB_BUILDERS)
+    return eps
+
+
+def _reset_fragments():
+    # برّه أي transaction فالـ on_commit بيتنفّذ على طول
+    for section in fragment_cache.SECTIONS:
+        fragment_cache.bump_all(section)
+
+
+def _consume(response):
+    # الردود المتدفقة (streaming) لازم تتقرا عشان الشغل الحقيقي يتنفّذ
+    if getattr(response, "streaming", False):
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+class Command(BaseCommand):
+    help = (
+        "قياس أداء الصفحات الأساسية عبر test client: زمن التنفيذ، عدد الكويريز "
+        "وذروة الذاكرة لكل endpoint، مع تقرير JSON ومقارنة بتقرير سابق. "
+        "ولّد البيانات الأول بـ generate_dataset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="عدد مرات تنفيذ كل endpoint (افتراضي 5)."
+        )
+        parser.add_argument("--only", action="append", help="قصر القياس على endpoint (يتكرر).")
+        parser.add_argument("--output", type=str, help="مسار ملف JSON للتقرير.")
+        parser.add_argument("--baseline", type=str, help="تقرير JSON سابق للمقارنة.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="نسبة زيادة الزمن المعتبرة تراجعًا (افتراضي 0.2 = 20%%).",
+        )
+        parser.add_argument(
+            "--fail-on-regression", action="store_true", help="اخرج بخطأ لو في تراجع."
+        )
+
+    def handle(self, *args, **opts):
+        actors = _pick_actors()
+        if actors is None:
+            raise CommandError("لا توجد بيانات كافية — شغّل generate_dataset الأول.")
+
+        endpoints = _endpoints(actors)
+        if opts.get("only"):
+            endpoints = [e for e in endpoints if e[0] in opts["only"]]
+
+        # ALLOWED_HOSTS=testserver + بريد locmem (ما نبعتش إيميلات حقيقية)
+        setup_test_environment()
+        try:
+            results = {
+                name: self._measure(user, url, opts["repeat"], cold)
+                for name, user, url, cold in endpoints
+            }
+        finally:
+            teardown_test_environment()
+
+        report = {
+            "vendor": connection.vendor,
+            "repeat": opts["repeat"],
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "endpoints": results,
+        }
+
+        baseline = {}
+        if opts.get("baseline"):
+            with open(opts["baseline"], encoding="utf-8") as fh:
+                baseline = json.load(fh).get("endpoints", {})
+
+        regressions = []
+        for name, r in results.items():
+            line = (
+                f"{name:30} {r['status']:4} {r['median_ms']:9.1f}ms "
+                f"{r['queries']:5}q {r['peak_kb']:9.1f}KB"
+            )
+            old = baseline.get(name)
+            if old:
+                slower = r["median_ms"] > old["median_ms"] * (1 + opts["threshold"])
+                more_queries = r["queries"] > old["queries"]
+                line += f"   (كان {old['median_ms']:.1f}ms / {old['queries']}q)"
+                if slower or more_queries:
+                    regressions.append(name)
+                    line = self.style.ERROR(line + "  ← تراجع")
+            self.stdout.write(line)
+
+        if opts.get("output"):
+            with open(opts["output"], "w", encoding="utf-8") as fh:
+                json.dump(report, fh, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"تم حفظ التقرير في {opts['output']}"))
+
+        if regressions and opts["fail_on_regression"]:
+            raise CommandError(f"تراجع في الأداء: {', '.join(regressions)}")
+
+    def _measure(self, user, url, repeat, cold=False):
+        client = Client()
+        client.force_login(user)
+        _consume(client.get(url))  # تسخين (كاش القوالب/الخطوط)
+
+        timings, queries, peaks = [], [], []
+        status = size = None
+        for _ in range(max(1, repeat)):
+            if cold:
+                _reset_fragments()  # برّه القياس: كل لفّة تبني الأجزاء من الأول
+            tracemalloc.start()
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time.perf_counter()
+                response = client.get(url)
+                size = _consume(response)
+                timings.append((time.perf_counter() - t0) * 1000)
+            peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+            tracemalloc.stop()
+            queries.append(len(ctx))
+            status = response.status_code
+
+        return {
+            "url": url,
+            "status": status,
+            "bytes": size,
+            "median_ms": round(statistics.median(timings), 2),
+            "max_ms": round(max(timings), 2),
+            "queries": max(queries),
+            "peak_kb": round(max(peaks), 1),
+        }
@@ -0,0 +1,67 @@
+# core/management/commands/generate_dataset.py
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from core.services.dataset import seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "توليد بيانات تجريبية بحجم واقعي (مدرّسين، مجموعات، طلاب، أولياء أمور، ترم حصص، "
+        "حضور، تسليمات، فواتير ومدفوعات) بـ bulk inserts لقياس الأداء."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--teachers", type=int, default=10)
+        parser.add_argument("--groups-per-teacher", type=int, default=5)
+        parser.add_argument("--students-per-group", type=int, default=30)
+        parser.add_argument(
+            "--weeks", type=int, default=16, help="طول الترم بالأسابيع (افتراضي 16)."
+        )
+        parser.add_argument("--sessions-per-week", type=int, default=2)
+        parser.add_argument("--assignments-per-week", type=int, default=1)
+        parser.add_argument("--students-per-parent", type=int, default=2)
+        parser.add_argument(
+            "--no-student-logins",
+            action="store_true",
+            help="بدون إنشاء حسابات دخول للطلاب.",
+        )
+        parser.add_argument("--monthly-fee", type=str, default="300.00")
+        parser.add_argument(
+            "--paid-ratio", type=float, default=0.6, help="نسبة الفواتير المسدّدة."
+        )
+        parser.add_argument(
+            "--prefix", type=str, default="bench", help="بادئة أسماء المستخدمين/المجموعات."
+        )
+        parser.add_argument("--random-seed", type=int, default=42)
+
+    def handle(self, *args, **opts):
+        prefix = opts["prefix"]
+        if User.objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(f"البادئة '{prefix}' مستخدمة بالفعل — اختر --prefix جديدة.")
+        if not 7 >= opts["sessions_per_week"] >= 1:
+            raise CommandError("--sessions-per-week لازم يكون بين 1 و 7.")
+
+        t0 = time.perf_counter()
+        counts = seed_dataset(
+            teachers=opts["teachers"],
+            groups_per_teacher=opts["groups_per_teacher"],
+            students_per_group=opts["students_per_group"],
+            weeks=opts["weeks"],
+            sessions_per_week=opts["sessions_per_week"],
+            assignments_per_week=opts["assignments_per_week"],
+            students_per_parent=opts["students_per_parent"],
+            student_logins=not opts["no_student_logins"],
+            monthly_fee=Decimal(opts["monthly_fee"]),
+            paid_ratio=opts["paid_ratio"],
+            prefix=prefix,
+            seed=opts["random_seed"],
+        )
+        for name, n in counts.items():
+            self.stdout.write(f"{name:18} {n}")
+        self.stdout.write(
+            self.style.SUCCESS(f"تم توليد البيانات في {time.perf_counter() - t0:.1f} ث.")
+        )
@@ -0,0 +1,53 @@
+# core/management/commands/generate_monthly_reports.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Group, TeacherProfile
+from core.services.reports import generate_monthly_reports, previous_month
+
+
+class Command(BaseCommand):
+    help = (
+        "توليد/تحديث التقارير الشهرية (نسبة الحضور ومتوسط الواجبات) لكل الطلاب "
+        "دفعة واحدة — نصوص المدرّس في التقارير الموجودة ما بتتغيّرش."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="السنة (افتراضي: الشهر اللي فات).")
+        parser.add_argument("--month", type=int, help="الشهر (افتراضي: الشهر اللي فات).")
+        parser.add_argument(
+            "--teacher-username", type=str, help="قصر التوليد على طلاب مدرّس (username)."
+        )
+        parser.add_argument(
+            "--group", type=int, action="append", help="قصر التوليد على مجموعة (يتكرر)."
+        )
+
+    def handle(self, *args, **opts):
+        default_year, default_month = previous_month()
+        year = opts.get("year") or default_year
+        month = opts.get("month") or default_month
+        if not 1 <= month <= 12:
+            raise CommandError("--month لازم يكون بين 1 و 12.")
+
+        groups = None
+        if opts.get("teacher_username") or opts.get("group"):
+            groups = Group.objects.all()
+            if opts.get("teacher_username"):
+                try:
+                    teacher = TeacherProfile.objects.get(
+                        user__username=opts["teacher_username"]
+                    )
+                except TeacherProfile.DoesNotExist:
+                    raise CommandError("لم يتم العثور على المدرّس المطلوب.")
+                groups = groups.filter(teacher=teacher)
+            if opts.get("group"):
+                groups = groups.filter(id__in=opts["group"])
+
+        t0 = time.perf_counter()
+        created, updated, skipped = generate_monthly_reports(year, month, groups=groups)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"تقارير {month}/{year}: جديدة {created}، محدّثة {updated}، "
+                f"بدون بيانات {skipped} ({time.perf_counter() - t0:.1f} ث)."
+            )
+        )
@@ -0,0 +1,54 @@
+# core/management/commands/issue_monthly_invoices.py
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.models import Group, TeacherProfile
+from core.services.billing import issue_monthly_invoices
+
+
+class Command(BaseCommand):
+    help = "إصدار فواتير شهر لكل التسجيلات النشطة (مجموعة/مدرّس/كل المجموعات) دفعة واحدة."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--amount", type=str, required=True, help="المبلغ لكل طالب.")
+        parser.add_argument("--year", type=int, help="السنة (افتراضي: الحالية).")
+        parser.add_argument("--month", type=int, help="الشهر (افتراضي: الحالي).")
+        parser.add_argument(
+            "--teacher-username", type=str, help="فلترة على مدرّس محدد (username)."
+        )
+        parser.add_argument(
+            "--group", type=int, action="append", help="قصر الإصدار على مجموعة (يتكرر)."
+        )
+        parser.add_argument("--due-date", type=str, help="YYYY-MM-DD تاريخ الاستحقاق.")
+
+    def handle(self, *args, **opts):
+        today = timezone.localdate()
+        year = opts.get("year") or today.year
+        month = opts.get("month") or today.month
+        if not 1 <= month <= 12:
+            raise CommandError("--month لازم يكون بين 1 و 12.")
+        try:
+            amount = Decimal(opts["amount"])
+        except InvalidOperation:
+            raise CommandError("--amount غير صالح.")
+
+        groups = Group.objects.all()
+        if opts.get("teacher_username"):
+            try:
+                teacher = TeacherProfile.objects.get(user__username=opts["teacher_username"])
+            except TeacherProfile.DoesNotExist:
+                raise CommandError("لم يتم العثور على المدرّس المطلوب.")
+            groups = groups.filter(teacher=teacher)
+        if opts.get("group"):
+            groups = groups.filter(id__in=opts["group"])
+        due_date = date.fromisoformat(opts["due_date"]) if opts.get("due_date") else None
+
+        created, skipped = issue_monthly_invoices(
+            groups, year, month, amount, due_date=due_date
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"تم إنشاء {created} فاتورة لشهر {month}/{year}. تم تجاهل {skipped}."
+            )
+        )
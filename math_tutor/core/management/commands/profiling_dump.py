@@ -0,0 +1,39 @@
+# core/management/commands/profiling_dump.py
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.services.profiling import reset, summarize
+
+
+class Command(BaseCommand):
+    help = "عرض ملخص قياسات الطلبات (percentiles لكل view + الكويريز المكرّرة)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--json", action="store_true", help="اطبع JSON كامل.")
+        parser.add_argument(
+            "--reset", action="store_true", help="امسح العيّنات بعد العرض."
+        )
+
+    def handle(self, *args, **opts):
+        rows = summarize()
+        if opts["json"]:
+            self.stdout.write(json.dumps(rows, ensure_ascii=False, indent=2))
+        elif not rows:
+            self.stdout.write("لا توجد عيّنات (هل REQUEST_PROFILING مفعّل؟).")
+        else:
+            self.stdout.write(
+                f"{'view':40} {'n':>5} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} "
+                f"{'db p95':>8} {'tpl p95':>8} {'q p95':>6} {'N+1':>5}"
+            )
+            for r in rows:
+                self.stdout.write(
+                    f"{r['view'][:40]:40} {r['count']:5} {r['total_ms']['p50']:8.1f} "
+                    f"{r['total_ms']['p95']:8.1f} {r['total_ms']['p99']:8.1f} "
+                    f"{r['db_ms']['p95']:8.1f} {r['template_ms']['p95']:8.1f} "
+                    f"{r['queries']['p95']:6} {r['n_plus_one_requests']:5}"
+                )
+                for d in r["top_duplicates"]:
+                    self.stdout.write(f"    ×{d['max_repeats']}: {d['sql'][:120]}")
+        if opts["reset"]:
+            reset()
@@ -0,0 +1,19 @@
+# core/management/commands/rebuild_attendance_rollup.py
+from datetime import date
+from django.core.management.base import BaseCommand
+from core.services.attendance import rebuild_all_rollups
+
+
+class Command(BaseCommand):
+    help = "إعادة بناء جدول تجميعات الحضور اليومية (AttendanceDailyRollup) من سجلات الحضور الخام."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--group", type=int, action="append", help="قصر البناء على مجموعة (يتكرر)."
+        )
+        parser.add_argument("--since", type=str, help="YYYY-MM-DD ابدأ من هذا التاريخ.")
+
+    def handle(self, *args, **opts):
+        since = date.fromisoformat(opts["since"]) if opts.get("since") else None
+        created = rebuild_all_rollups(group_ids=opts.get("group"), since=since)
+        self.stdout.write(self.style.SUCCESS(f"تم بناء {created} صف تجميعة."))
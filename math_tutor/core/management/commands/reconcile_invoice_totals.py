@@ -0,0 +1,21 @@
+# core/management/commands/reconcile_invoice_totals.py
+from django.core.management.base import BaseCommand
+from core.services.billing import reconcile_paid_totals
+
+
+class Command(BaseCommand):
+    help = "إعادة حساب Invoice.paid_total من صفوف Payment وتصليح الفواتير المختلفة."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true", help="اعرض الفروقات بدون تعديل."
+        )
+
+    def handle(self, *args, **opts):
+        mismatched = reconcile_paid_totals(dry_run=opts["dry_run"])
+        for invoice_id, stored, actual in mismatched[:50]:
+            self.stdout.write(f"فاتورة #{invoice_id}: مخزّن {stored} ← فعلي {actual}")
+        if len(mismatched) > 50:
+            self.stdout.write(f"... و {len(mismatched) - 50} أخرى")
+        verb = "مختلفة" if opts["dry_run"] else "تم تصليحها"
+        self.stdout.write(self.style.SUCCESS(f"{len(mismatched)} فاتورة {verb}."))
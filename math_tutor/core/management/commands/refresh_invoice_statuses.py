@@ -0,0 +1,36 @@
+# core/management/commands/refresh_invoice_statuses.py
+from datetime import date
+from django.core.management.base import BaseCommand
+from core.models import Invoice
+from core.services.billing import refresh_invoice_statuses
+
+
+class Command(BaseCommand):
+    help = "إعادة تصنيف حالة الفواتير (PAID/DUE/OVERDUE) بـ UPDATEs جماعية."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="قصر التحديث على سنة.")
+        parser.add_argument("--month", type=int, help="قصر التحديث على شهر.")
+        parser.add_argument(
+            "--group", type=int, action="append", help="قصر التحديث على مجموعة (يتكرر)."
+        )
+        parser.add_argument(
+            "--today", type=str, help="YYYY-MM-DD تاريخ المرجع (افتراضي: اليوم)."
+        )
+
+    def handle(self, *args, **opts):
+        qs = Invoice.objects.all()
+        if opts.get("year"):
+            qs = qs.filter(year=opts["year"])
+        if opts.get("month"):
+            qs = qs.filter(month=opts["month"])
+        if opts.get("group"):
+            qs = qs.filter(group_id__in=opts["group"])
+        today = date.fromisoformat(opts["today"]) if opts.get("today") else None
+
+        changed = refresh_invoice_statuses(qs, today=today)
+        for status, n in changed.items():
+            self.stdout.write(f"{Invoice.Status(status).label}: {n}")
+        self.stdout.write(
+            self.style.SUCCESS(f"تم تحديث حالة {sum(changed.values())} فاتورة.")
+        )
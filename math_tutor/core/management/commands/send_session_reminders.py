@@ -1,9 +1,9 @@
 # core/management/commands/send_session_reminders.py
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import timedelta
 from core.models import ClassSession
-from core.services.notify import notify_session_reminder
+from core.services.notify import notify_session_reminders_batch
 
 
 class Command(BaseCommand):
@@ -20,19 +20,12 @@ class Command(BaseCommand):
         target_start_min = now + timedelta(hours=2) - timedelta(minutes=opts["window"])
         target_start_max = now + timedelta(hours=2) + timedelta(minutes=opts["window"])
 
-        # دمج date + time إلى datetime في التصفية
-        # ما في حقل datetime مباشر، فنفلتر تقريبيًا ثم نتحقق يدويًا
-        sessions = ClassSession.objects.filter(
-            date__gte=target_start_min.date(),
-            date__lte=target_start_max.date(),
-        ).select_related("group")
+        # range scan واحد على starts_at المفهرس (بدون تحقّق يدوي في بايثون)
+        due = ClassSession.objects.filter(
+            starts_at__range=(target_start_min, target_start_max)
+        ).select_related("group", "subject", "group__subject")
 
-        sent_total = 0
-        for s in sessions:
-            start_dt = timezone.make_aware(
-                datetime.combine(s.date, s.start_time), now.tzinfo
-            )
-            if target_start_min <= start_dt <= target_start_max:
-                sent_total += notify_session_reminder(s)
+        # دفعة واحدة: أولياء الأمور + السجل + اتصال البريد مرة واحدة لكل الحصص
+        sent_total = notify_session_reminders_batch(due)
 
         self.stdout.write(self.style.SUCCESS(f"تم إرسال {sent_total} تذكير/تذكيرات."))
@@ -0,0 +1,101 @@
+# core/middleware.py
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+from core.services.profiling import UNRESOLVED, record_sample
+
+_local = threading.local()
+_original_render = Template.render
+
+
+def _profiled_render(self, context):
+    """يقيس زمن أول (أبعد) Template.render بس، عشان include/الـ nested ما يتحسبوش مرتين."""
+    prof = getattr(_local, "profile", None)
+    if prof is None or prof.template_depth:
+        return _original_render(self, context)
+    prof.template_depth += 1
+    t0 = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        prof.template_ms += (time.perf_counter() - t0) * 1000
+        prof.template_depth -= 1
+
+
+class _RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.template_depth = 0
+        self.signatures = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: الـ sql هنا parametrized، فهو نفسه "توقيع" الكويري
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - t0) * 1000
+            self.queries += 1
+            self.signatures[sql] += 1
+
+
+class RequestProfilingMiddleware:
+    """
+    قياس لكل طلب: عدد الكويريز، زمن الداتابيز، زمن القوالب، والزمن الكلي لكل view.
+    - بيعلّم الكويريز المكرّرة (نفس الـ SQL >= REQUEST_PROFILING_DUPLICATE_THRESHOLD) كـ N+1.
+    - بيضيف Server-Timing header للرد.
+    - متعطّل إلا لو REQUEST_PROFILING = True (MiddlewareNotUsed).
+    ملاحظة: الردود المتدفقة بتتقاس لحد رجوع الفيو فقط.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_PROFILING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.dup_threshold = getattr(settings, "REQUEST_PROFILING_DUPLICATE_THRESHOLD", 3)
+        Template.render = _profiled_render
+
+    def __call__(self, request):
+        prof = _RequestProfile()
+        _local.profile = prof
+        t0 = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(prof))
+                response = self.get_response(request)
+        finally:
+            _local.profile = None
+        total_ms = (time.perf_counter() - t0) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        # مش request.path: كل URL عشوائي (404) كان بيعمل مفتاح وفيو جديد في الفهرس
+        view_name = (match.view_name if match else None) or UNRESOLVED
+        duplicates = {
+            sql[:300]: n for sql, n in prof.signatures.items() if n >= self.dup_threshold
+        }
+        record_sample(
+            view_name,
+            {
+                "total_ms": round(total_ms, 2),
+                "db_ms": round(prof.db_ms, 2),
+                "template_ms": round(prof.template_ms, 2),
+                "queries": prof.queries,
+                "status": response.status_code,
+                "duplicates": duplicates,
+            },
+        )
+        response["Server-Timing"] = (
+            f"db;dur={prof.db_ms:.1f}, tpl;dur={prof.template_ms:.1f}, "
+            f"total;dur={total_ms:.1f}"
+        )
+        return response
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_alter_group_grade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeacherDashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('built_for', models.DateField(verbose_name='محسوبة ليوم')),
+                ('total_groups', models.PositiveIntegerField(default=0, verbose_name='المجموعات')),
+                ('total_students', models.PositiveIntegerField(default=0, verbose_name='الطلاب النشطون')),
+                ('upcoming_count', models.PositiveIntegerField(default=0, verbose_name='حصص قادمة')),
+                ('due_invoices', models.PositiveIntegerField(default=0, verbose_name='فواتير الشهر المستحقة')),
+                ('att_total', models.PositiveIntegerField(default=0, verbose_name='إجمالي سجلات الحضور')),
+                ('att_present', models.PositiveIntegerField(default=0, verbose_name='حاضر/متأخر')),
+                ('group_counters', models.JSONField(default=dict, verbose_name='عدّادات المجموعات')),
+                ('is_stale', models.BooleanField(default=True, verbose_name='تحتاج إعادة حساب؟')),
+                ('built_at', models.DateTimeField(auto_now=True, verbose_name='آخر حساب')),
+                ('teacher', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_snapshot', to='core.teacherprofile', verbose_name='المدرّس')),
+            ],
+            options={
+                'verbose_name': 'لقطة لوحة المدرّس',
+                'verbose_name_plural': 'لقطات لوحة المدرّس',
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+STATUSES = ("PRESENT", "ABSENT", "LATE", "EXCUSED")
+
+
+def rebuild(apps, schema_editor):
+    # نفس تجميع services.attendance.rebuild_all_rollups (بالموديلز التاريخية)
+    Attendance = apps.get_model("core", "Attendance")
+    AttendanceDailyRollup = apps.get_model("core", "AttendanceDailyRollup")
+    rows = (
+        Attendance.objects.values("student_id", "session__group_id", "session__date")
+        .annotate(
+            present=Count("id", filter=Q(status="PRESENT")),
+            absent=Count("id", filter=Q(status="ABSENT")),
+            late=Count("id", filter=Q(status="LATE")),
+            excused=Count("id", filter=Q(status="EXCUSED")),
+            total=Count("id", filter=Q(status__in=STATUSES)),
+        )
+        .order_by()
+    )
+    batch = []
+    for r in rows.iterator(chunk_size=2000):
+        if not r["total"]:
+            continue
+        batch.append(
+            AttendanceDailyRollup(
+                student_id=r["student_id"],
+                group_id=r["session__group_id"],
+                date=r["session__date"],
+                present=r["present"],
+                absent=r["absent"],
+                late=r["late"],
+                excused=r["excused"],
+                total=r["total"],
+            )
+        )
+        if len(batch) >= 2000:
+            AttendanceDailyRollup.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        AttendanceDailyRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_teacherdashboardsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='اليوم')),
+                ('present', models.PositiveIntegerField(default=0, verbose_name='حاضر')),
+                ('absent', models.PositiveIntegerField(default=0, verbose_name='غائب')),
+                ('late', models.PositiveIntegerField(default=0, verbose_name='متأخّر')),
+                ('excused', models.PositiveIntegerField(default=0, verbose_name='معذور')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='المجموع')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='core.group', verbose_name='المجموعة')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='core.student', verbose_name='الطالب')),
+            ],
+            options={
+                'verbose_name': 'تجميعة حضور يومية',
+                'verbose_name_plural': 'تجميعات الحضور اليومية',
+                'indexes': [models.Index(fields=['group', 'date'], name='core_attend_group_i_2e6140_idx')],
+                'unique_together': {('student', 'group', 'date')},
+            },
+        ),
+        migrations.RunPython(rebuild, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:10
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_bounds(apps, schema_editor):
+    ClassSession = apps.get_model("core", "ClassSession")
+    tz = timezone.get_default_timezone()
+    batch = []
+    for s in ClassSession.objects.only("id", "date", "start_time", "end_time").iterator(
+        chunk_size=2000
+    ):
+        start = datetime.combine(s.date, s.start_time)
+        end = datetime.combine(s.date, s.end_time)
+        if s.end_time < s.start_time:
+            end += timedelta(days=1)
+        s.starts_at = timezone.make_aware(start, tz)
+        s.ends_at = timezone.make_aware(end, tz)
+        batch.append(s)
+        if len(batch) >= 2000:
+            ClassSession.objects.bulk_update(batch, ["starts_at", "ends_at"])
+            batch = []
+    if batch:
+        ClassSession.objects.bulk_update(batch, ["starts_at", "ends_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_attendancedailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classsession',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='ينتهي في'),
+        ),
+        migrations.AddField(
+            model_name='classsession',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='يبدأ في'),
+        ),
+        migrations.RunPython(backfill_bounds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_classsession_starts_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['group', '-assigned_at'], name='core_assign_group_i_1b88a5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'session'], name='core_attend_student_1f02f3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='classsession',
+            index=models.Index(fields=['teacher', 'date', 'start_time'], name='core_classs_teacher_0e7b9e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['group', 'is_active'], name='core_enroll_group_i_3a26ef_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='homeworksubmission',
+            index=models.Index(fields=['status', '-submitted_at'], name='core_homewo_status_e16e3e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['-created_at'], name='core_resour_created_b26772_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:16
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_paid_total(apps, schema_editor):
+    Invoice = apps.get_model("core", "Invoice")
+    Payment = apps.get_model("core", "Payment")
+    paid = (
+        Payment.objects.filter(invoice=OuterRef("pk"))
+        .order_by()
+        .values("invoice")
+        .annotate(s=Sum("amount_egp"))
+        .values("s")
+    )
+    Invoice.objects.update(
+        paid_total=Coalesce(
+            Subquery(paid),
+            Value(Decimal("0.00")),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_assignment_core_assign_group_i_1b88a5_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='paid_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=10, verbose_name='إجمالي المسدّد'),
+        ),
+        migrations.RunPython(backfill_paid_total, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_invoice_paid_total'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='event_type',
+            field=models.CharField(choices=[('ASSIGNMENT_CREATED', 'إنشاء واجب'), ('SESSION_REMINDER', 'تذكير حصة'), ('OVERDUE_DIGEST', 'ملخص فواتير متأخرة')], max_length=40),
+        ),
+    ]
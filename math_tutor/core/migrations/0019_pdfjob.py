@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_alter_notificationlog_event_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PdfJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('INVOICE', 'فاتورة'), ('REPORT', 'تقرير شهري'), ('INVOICE_BUNDLE', 'فواتير شهر لمجموعة (ZIP)')], max_length=20, verbose_name='النوع')),
+                ('status', models.CharField(choices=[('PENDING', 'في الانتظار'), ('RUNNING', 'جارٍ التوليد'), ('DONE', 'جاهز'), ('FAILED', 'فشل')], default='PENDING', max_length=10, verbose_name='الحالة')),
+                ('object_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='رقم العنصر')),
+                ('year', models.PositiveIntegerField(blank=True, null=True, verbose_name='السنة')),
+                ('month', models.PositiveIntegerField(blank=True, null=True, verbose_name='الشهر')),
+                ('file', models.FileField(blank=True, upload_to='pdf_jobs/%Y/%m/', verbose_name='الملف')),
+                ('filename', models.CharField(blank=True, max_length=200, verbose_name='اسم ملف التحميل')),
+                ('error', models.TextField(blank=True, verbose_name='الخطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الطلب')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الانتهاء')),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pdf_jobs', to='core.group', verbose_name='المجموعة')),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_jobs', to=settings.AUTH_USER_MODEL, verbose_name='طلبه')),
+            ],
+            options={
+                'verbose_name': 'مهمة PDF',
+                'verbose_name_plural': 'مهام PDF',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='core_pdfjob_created_00031f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_pdfjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfjob',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='بدأ في'),
+        ),
+    ]
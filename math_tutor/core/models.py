@@ -1,5 +1,6 @@
+from datetime import datetime, timedelta
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -179,6 +180,7 @@ class Enrollment(models.Model):
         verbose_name = _("تسجيل")
         verbose_name_plural = _("تسجيلات")
         unique_together = ("student", "group")
+        indexes = [models.Index(fields=["group", "is_active"])]
 
     def __str__(self):
         return f"{self.student} ← {self.group}"
@@ -256,14 +258,55 @@ class ClassSession(models.Model):
     qr_token_expires_at = models.DateTimeField(
         _("انتهاء التوكن"), null=True, blank=True
     )
+    # لحظة البداية/النهاية (aware) مخزّنة ومفهرسة لاستعلامات النوافذ الزمنية
+    starts_at = models.DateTimeField(
+        _("يبدأ في"), null=True, blank=True, db_index=True, editable=False
+    )
+    ends_at = models.DateTimeField(
+        _("ينتهي في"), null=True, blank=True, editable=False
+    )
+
     class Meta:
         verbose_name = _("حصة")
         verbose_name_plural = _("حصص")
         unique_together = ("group", "date", "start_time")
+        # (group, date) مغطّى بالفعل بـ unique_together أعلاه
+        indexes = [models.Index(fields=["teacher", "date", "start_time"])]
 
     def __str__(self):
         return f"{self.group} - {self.date} {self.start_time}"
 
+    def sync_bounds(self):
+        """
+        يحسب starts_at/ends_at من date + start_time/end_time بتوقيت المنصة
+        (TIME_ZONE) — مش توقيت الطلب لو حد عمل timezone.activate()، علشان يطابق
+        الـ backfill في 0015 ونافذة التذكيرات.
+        """
+        if not (self.date and self.start_time):
+            self.starts_at = self.ends_at = None
+            return
+        tz = timezone.get_default_timezone()
+        self.starts_at = timezone.make_aware(
+            datetime.combine(self.date, self.start_time), tz
+        )
+        if self.end_time:
+            end = datetime.combine(self.date, self.end_time)
+            # حصة بتعدّي منتصف الليل
+            if self.end_time < self.start_time:
+                end += timedelta(days=1)
+            self.ends_at = timezone.make_aware(end, tz)
+        else:
+            self.ends_at = None
+
+    def save(self, *args, **kwargs):
+        self.sync_bounds()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"date", "start_time", "end_time"} & set(
+            update_fields
+        ):
+            kwargs["update_fields"] = set(update_fields) | {"starts_at", "ends_at"}
+        return super().save(*args, **kwargs)
+
     def get_subject(self):
         return self.subject or getattr(self.group, "subject", None)
 
@@ -336,6 +379,7 @@ class Resource(models.Model):
     class Meta:
         verbose_name = _("مورد")
         verbose_name_plural = _("موارد")
+        indexes = [models.Index(fields=["-created_at"])]
 
     def clean(self):
         # لازم ترتبط بحصة أو مجموعة على الأقل
@@ -385,6 +429,7 @@ class Assignment(models.Model):
     class Meta:
         verbose_name = _("واجب")
         verbose_name_plural = _("واجبات")
+        indexes = [models.Index(fields=["group", "-assigned_at"])]
 
     def __str__(self):
         return self.title
@@ -438,6 +483,7 @@ class HomeworkSubmission(models.Model):
         verbose_name = _("تسليم واجب")
         verbose_name_plural = _("تسليمات الواجبات")
         unique_together = ("assignment", "student")
+        indexes = [models.Index(fields=["status", "-submitted_at"])]
 
     def clean(self):
         # لازم واحدة من (file/link/answer_text) حتى يعتبر تسليم
@@ -480,6 +526,8 @@ class Attendance(models.Model):
         verbose_name = _("سجل حضور")
         verbose_name_plural = _("سجلات الحضور")
         unique_together = ("session", "student")
+        # unique_together يبدأ بالحصة؛ ده لاستعلامات "حضور الطالب"
+        indexes = [models.Index(fields=["student", "session"])]
 
     def __str__(self):
         return f"{self.session} - {self.student} ({self.get_status_display()})"
@@ -519,6 +567,8 @@ class NotificationLog(models.Model):
     class Event(models.TextChoices):
         ASSIGNMENT_CREATED = "ASSIGNMENT_CREATED", "إنشاء واجب"
         SESSION_REMINDER = "SESSION_REMINDER", "تذكير حصة"
+        # object_id = اليوم (date.toordinal) — سجل واحد لكل وليّ أمر في اليوم
+        OVERDUE_DIGEST = "OVERDUE_DIGEST", "ملخص فواتير متأخرة"
 
     event_type = models.CharField(max_length=40, choices=Event.choices)
     object_id = models.IntegerField()  # id للواجب أو الحصة
@@ -577,6 +627,14 @@ class Invoice(models.Model):
     issued_at = models.DateTimeField(_("تاريخ الإصدار"), auto_now_add=True)
     paid_at = models.DateTimeField(_("تاريخ السداد"), null=True, blank=True)
     notes = models.TextField(_("ملاحظات"), blank=True)
+    # مجموع المدفوعات مخزّن (بيتحدّث بـ F() من سيجنالز Payment)
+    paid_total = models.DecimalField(
+        _("إجمالي المسدّد"),
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        editable=False,
+    )
 
     class Meta:
         verbose_name = _("فاتورة")
@@ -593,16 +651,37 @@ class Invoice(models.Model):
             f"فاتورة {self.student} - {self.month}/{self.year} - {self.amount_egp} EGP"
         )
 
+    def save(self, *args, **kwargs):
+        # paid_total بيتحدّث بـ F() من سيجنالز Payment؛ الحفظ الكامل لنسخة اتحمّلت
+        # قبل دفعة جديدة كان بيرجّعه للقيمة القديمة. في التعديل ما بيتكتبش إلا لو
+        # اتسمّى صراحة في update_fields، وبعد الحفظ بنقرا القيمة الحالية.
+        skip_paid = (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        )
+        if skip_paid:
+            kwargs["update_fields"] = [
+                f.name
+                for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != "paid_total"
+            ]
+        super().save(*args, **kwargs)
+        if skip_paid:
+            self.refresh_from_db(fields=["paid_total"])
+
     @property
     def total_paid(self) -> Decimal:
-        agg = self.payments.aggregate(s=models.Sum("amount_egp"))["s"]
-        return agg or Decimal("0.00")
+        return self.paid_total or Decimal("0.00")
 
     @property
     def remaining(self) -> Decimal:
         return max(Decimal("0.00"), self.amount_egp - self.total_paid)
 
     def refresh_status(self, commit=True):
+        # نسخة الصف الواحد؛ للتحديث الجماعي: services.billing.refresh_invoice_statuses
+        if self.status == self.Status.CANCELED:
+            return
         old = self.status
         if self.remaining <= 0:
             self.status = self.Status.PAID
@@ -649,6 +728,11 @@ class Payment(models.Model):
     def __str__(self):
         return f"{self.amount_egp} EGP - {self.method} - {self.invoice_id}"
 
+    def save(self, *args, **kwargs):
+        # الحفظ + تحديث Invoice.paid_total (في post_save) في نفس الـ transaction
+        with transaction.atomic():
+            return super().save(*args, **kwargs)
+
 
 class StudentProfile(models.Model):
     user = models.OneToOneField(
@@ -670,3 +754,129 @@ class StudentProfile(models.Model):
 
     def __str__(self):
         return self.user.get_full_name() or self.user.username
+
+
+class TeacherDashboardSnapshot(models.Model):
+    """لقطة محسوبة مسبقًا لعدّادات لوحة المدرّس (رأس KPI + عدّادات كل مجموعة)."""
+
+    teacher = models.OneToOneField(
+        TeacherProfile,
+        on_delete=models.CASCADE,
+        related_name="dashboard_snapshot",
+        verbose_name=_("المدرّس"),
+    )
+    # اليوم المحلي اللي اتحسبت على أساسه "الحصص القادمة" و"فواتير الشهر"
+    built_for = models.DateField(_("محسوبة ليوم"))
+    total_groups = models.PositiveIntegerField(_("المجموعات"), default=0)
+    total_students = models.PositiveIntegerField(_("الطلاب النشطون"), default=0)
+    upcoming_count = models.PositiveIntegerField(_("حصص قادمة"), default=0)
+    due_invoices = models.PositiveIntegerField(_("فواتير الشهر المستحقة"), default=0)
+    att_total = models.PositiveIntegerField(_("إجمالي سجلات الحضور"), default=0)
+    att_present = models.PositiveIntegerField(_("حاضر/متأخر"), default=0)
+    # {"<group_id>": {"students": n, "upcoming": n, "due": n}}
+    group_counters = models.JSONField(_("عدّادات المجموعات"), default=dict)
+    is_stale = models.BooleanField(_("تحتاج إعادة حساب؟"), default=True)
+    built_at = models.DateTimeField(_("آخر حساب"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("لقطة لوحة المدرّس")
+        verbose_name_plural = _("لقطات لوحة المدرّس")
+
+    def __str__(self):
+        return f"لقطة {self.teacher} ({self.built_for})"
+
+    def counters_for(self, group_id) -> dict:
+        return self.group_counters.get(str(group_id)) or {
+            "students": 0,
+            "upcoming": 0,
+            "due": 0,
+        }
+
+
+class AttendanceDailyRollup(models.Model):
+    """تجميعة حضور يومية لكل (طالب، مجموعة، يوم) — تتحدّث من سيجنالز Attendance."""
+
+    student = models.ForeignKey(
+        Student,
+        on_delete=models.CASCADE,
+        related_name="attendance_rollups",
+        verbose_name=_("الطالب"),
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name="attendance_rollups",
+        verbose_name=_("المجموعة"),
+    )
+    date = models.DateField(_("اليوم"))
+    present = models.PositiveIntegerField(_("حاضر"), default=0)
+    absent = models.PositiveIntegerField(_("غائب"), default=0)
+    late = models.PositiveIntegerField(_("متأخّر"), default=0)
+    excused = models.PositiveIntegerField(_("معذور"), default=0)
+    total = models.PositiveIntegerField(_("المجموع"), default=0)
+
+    class Meta:
+        verbose_name = _("تجميعة حضور يومية")
+        verbose_name_plural = _("تجميعات الحضور اليومية")
+        unique_together = ("student", "group", "date")
+        indexes = [models.Index(fields=["group", "date"])]
+
+    def __str__(self):
+        return f"{self.student_id}/{self.group_id} {self.date}: {self.present}/{self.total}"
+
+
+class PdfJob(models.Model):
+    """مهمة توليد PDF في الخلفية (Celery) — الطلب يرجع فورًا والملف يتنزّل لما يخلص."""
+
+    class Kind(models.TextChoices):
+        INVOICE = "INVOICE", _("فاتورة")
+        REPORT = "REPORT", _("تقرير شهري")
+        INVOICE_BUNDLE = "INVOICE_BUNDLE", _("فواتير شهر لمجموعة (ZIP)")
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", _("في الانتظار")
+        RUNNING = "RUNNING", _("جارٍ التوليد")
+        DONE = "DONE", _("جاهز")
+        FAILED = "FAILED", _("فشل")
+
+    kind = models.CharField(_("النوع"), max_length=20, choices=Kind.choices)
+    status = models.CharField(
+        _("الحالة"), max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="pdf_jobs",
+        verbose_name=_("طلبه"),
+    )
+    # INVOICE: id الفاتورة — REPORT: id التقرير — INVOICE_BUNDLE: فاضي
+    object_id = models.PositiveIntegerField(_("رقم العنصر"), null=True, blank=True)
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="pdf_jobs",
+        verbose_name=_("المجموعة"),
+    )
+    year = models.PositiveIntegerField(_("السنة"), null=True, blank=True)
+    month = models.PositiveIntegerField(_("الشهر"), null=True, blank=True)
+    file = models.FileField(_("الملف"), upload_to="pdf_jobs/%Y/%m/", blank=True)
+    filename = models.CharField(_("اسم ملف التحميل"), max_length=200, blank=True)
+    error = models.TextField(_("الخطأ"), blank=True)
+    created_at = models.DateTimeField(_("تاريخ الطلب"), auto_now_add=True)
+    started_at = models.DateTimeField(_("بدأ في"), null=True, blank=True)
+    finished_at = models.DateTimeField(_("تاريخ الانتهاء"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("مهمة PDF")
+        verbose_name_plural = _("مهام PDF")
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["created_at"])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.DONE, self.Status.FAILED)
@@ -0,0 +1,35 @@
+# core/ops_views.py
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from .services import fragment_cache
+from .services.profiling import reset, summarize
+
+
+@staff_member_required
+@require_GET
+def profiling_stats(request):
+    """ملخص قياسات الطلبات (JSON) — للـ staff فقط. ?reset=1 يمسح العيّنات بعد القراءة."""
+    data = {
+        "enabled": getattr(settings, "REQUEST_PROFILING", False),
+        "views": summarize(),
+    }
+    if request.GET.get("reset") == "1":
+        reset()
+    return JsonResponse(data, json_dumps_params={"ensure_ascii": False})
+
+
+@staff_member_required
+@require_GET
+def fragment_cache_stats(request):
+    """hit/miss لكل قسم في كاش أجزاء اللوحات — للـ staff فقط. ?reset=1 يصفّر العدّادات."""
+    data = {
+        "backend": settings.CACHES["default"]["BACKEND"],
+        "ttl": getattr(settings, "FRAGMENT_CACHE_TTL", None),
+        "sections": fragment_cache.stats(),
+    }
+    if request.GET.get("reset") == "1":
+        fragment_cache.reset_stats()
+    return JsonResponse(data, json_dumps_params={"ensure_ascii": False})
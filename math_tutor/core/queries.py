@@ -1,6 +1,6 @@
 from datetime import date
 from django.db.models import Q, Sum, Case, When, IntegerField
-from .models import Attendance
+from .models import Attendance, AttendanceDailyRollup
 
 
 def attendance_window_q(date_from: date, date_to: date):
@@ -63,6 +63,36 @@ def annotate_attendance_counts(qs):
     )
 
 
+def rollup_window_q(date_from: date, date_to: date):
+    """نفس attendance_window_q لكن على جدول AttendanceDailyRollup."""
+    q = Q()
+    if date_from:
+        q &= Q(date__gte=date_from)
+    if date_to:
+        q &= Q(date__lte=date_to)
+    return q
+
+
+def rollup_attendance_counts(qs=None):
+    """
+    بديل annotate_attendance_counts من التجميعات اليومية (بدل السجلات الخام).
+    يرجّع نفس الأعمدة: student_id/الاسم + present/absent/late/excused/total.
+    """
+    if qs is None:
+        qs = AttendanceDailyRollup.objects.all()
+    return (
+        qs.values("student_id", "student__first_name", "student__last_name")
+        .annotate(
+            present=Sum("present"),
+            absent=Sum("absent"),
+            late=Sum("late"),
+            excused=Sum("excused"),
+            total=Sum("total"),
+        )
+        .order_by()
+    )
+
+
 def pct(num, den):
     if not den:
         return 0
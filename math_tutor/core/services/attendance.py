@@ -0,0 +1,117 @@
+# core/services/attendance.py
+from django.db import transaction
+from django.db.models import Count, Q
+
+from core.models import Attendance, AttendanceDailyRollup
+from core.services import fragment_cache
+
+S = Attendance.Status
+
+# نفس أعمدة annotate_attendance_counts لكن محسوبة مرة واحدة لكل (طالب، مجموعة، يوم)
+_COUNTS = {
+    "present": Count("id", filter=Q(status=S.PRESENT)),
+    "absent": Count("id", filter=Q(status=S.ABSENT)),
+    "late": Count("id", filter=Q(status=S.LATE)),
+    "excused": Count("id", filter=Q(status=S.EXCUSED)),
+    "total": Count("id", filter=Q(status__in=S.values)),
+}
+
+
+def _raw_rows(q):
+    return (
+        Attendance.objects.filter(q)
+        .values("student_id", "session__group_id", "session__date")
+        .annotate(**_COUNTS)
+        .order_by()
+    )
+
+
+def _to_rollup(r):
+    return AttendanceDailyRollup(
+        student_id=r["student_id"],
+        group_id=r["session__group_id"],
+        date=r["session__date"],
+        present=r["present"],
+        absent=r["absent"],
+        late=r["late"],
+        excused=r["excused"],
+        total=r["total"],
+    )
+
+
+def refresh_rollup(student_id, group_id, day):
+    """يعيد حساب صف واحد من السجلات الخام (كم سجل بس لنفس الطالب/اليوم)."""
+    if not (student_id and group_id and day):
+        return
+    rows = list(
+        _raw_rows(
+            Q(student_id=student_id, session__group_id=group_id, session__date=day)
+        )
+    )
+    if not rows or not rows[0]["total"]:
+        AttendanceDailyRollup.objects.filter(
+            student_id=student_id, group_id=group_id, date=day
+        ).delete()
+        return
+    r = rows[0]
+    AttendanceDailyRollup.objects.update_or_create(
+        student_id=student_id,
+        group_id=group_id,
+        date=day,
+        defaults={k: r[k] for k in _COUNTS},
+    )
+
+
+def _pairs_q(pairs, prefix=""):
+    q = Q()
+    for group_id, day in pairs:
+        q |= Q(**{f"{prefix}group_id": group_id, f"{prefix}date": day})
+    return q
+
+
+@transaction.atomic
+def refresh_rollups_for_pairs(pairs, chunk_size=200):
+    """
+    يعيد بناء التجميعات لمجموعة أزواج (group_id, date) بشكل set-based.
+    يُستخدم بعد المسارات الجماعية (bulk_create/update) اللي ما بتطلق سيجنالز.
+    """
+    pairs = list(set(pairs))
+    for i in range(0, len(pairs), chunk_size):
+        part = pairs[i : i + chunk_size]
+        AttendanceDailyRollup.objects.filter(_pairs_q(part)).delete()
+        AttendanceDailyRollup.objects.bulk_create(
+            [_to_rollup(r) for r in _raw_rows(_pairs_q(part, "session__")) if r["total"]]
+        )
+    # المسارات دي ما بتطلقش سيجنالز لكل طالب
+    if pairs:
+        fragment_cache.bump_all(fragment_cache.STUDENT_ATTENDANCE)
+
+
+@transaction.atomic
+def rebuild_all_rollups(group_ids=None, since=None, batch_size=2000):
+    """إعادة بناء كاملة (أو لمجموعات/من تاريخ محدد). يرجّع عدد الصفوف المنشأة."""
+    q = Q()
+    rq = Q()
+    if group_ids:
+        q &= Q(session__group_id__in=group_ids)
+        rq &= Q(group_id__in=group_ids)
+    if since:
+        q &= Q(session__date__gte=since)
+        rq &= Q(date__gte=since)
+    AttendanceDailyRollup.objects.filter(rq).delete()
+
+    created = 0
+    batch = []
+    for r in _raw_rows(q).iterator(chunk_size=batch_size):
+        if not r["total"]:
+            continue
+        batch.append(_to_rollup(r))
+        if len(batch) >= batch_size:
+            AttendanceDailyRollup.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    if batch:
+        AttendanceDailyRollup.objects.bulk_create(batch)
+        created += len(batch)
+    fragment_cache.bump_all(fragment_cache.STUDENT_ATTENDANCE)
+    return created
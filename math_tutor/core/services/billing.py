@@ -0,0 +1,210 @@
+# core/services/billing.py
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.models import Enrollment, Group, Invoice, ParentProfile, Payment
+from core.services import fragment_cache
+from core.services.dashboard import invalidate_teacher_snapshots
+
+MONEY = DecimalField(max_digits=10, decimal_places=2)
+OPEN_STATUSES = (Invoice.Status.DUE, Invoice.Status.OVERDUE)
+BILLING_SUMMARY_FIELDS = ("total_due", "total_overdue", "month_paid", "open_count")
+
+
+def apply_paid_delta(invoice_id, delta):
+    """UPDATE ذرّي لـ paid_total (F() expression) — آمن مع المدفوعات المتزامنة."""
+    if not invoice_id or not delta:
+        return 0
+    return Invoice.objects.filter(pk=invoice_id).update(
+        paid_total=F("paid_total") + Decimal(delta)
+    )
+
+
+def _payments_sum_subquery():
+    return Coalesce(
+        Subquery(
+            Payment.objects.filter(invoice=OuterRef("pk"))
+            .order_by()
+            .values("invoice")
+            .annotate(s=Sum("amount_egp"))
+            .values("s")
+        ),
+        Value(Decimal("0.00")),
+        output_field=MONEY,
+    )
+
+
+def with_billing_summary(parents, today=None):
+    """
+    يضيف على QuerySet أولياء الأمور أعمدة BILLING_SUMMARY_FIELDS في نفس الكويري:
+    - total_due / total_overdue = مجموع (amount_egp - paid_total) للفواتير
+      المفتوحة / المتأخرة (paid_total مخزّن، فمن غير join للمدفوعات).
+    - open_count = عدد الفواتير المفتوحة (DUE/OVERDUE؛ الملغاة مش مفتوحة).
+    - month_paid = مدفوعات الشهر الحالي — subquery مش join، علشان صفوف
+      المدفوعات ما تكرّرش الفواتير في المجاميع اللي فوق.
+    """
+    S = Invoice.Status
+    today = today or timezone.localdate()
+    zero = Value(Decimal("0.00"))
+    remaining = F("invoices__amount_egp") - F("invoices__paid_total")
+    is_open = Q(invoices__status__in=OPEN_STATUSES)
+    month_paid = Subquery(
+        Payment.objects.filter(
+            invoice__parent=OuterRef("pk"),
+            received_at__date__gte=today.replace(day=1),
+        )
+        .order_by()
+        .values("invoice__parent")
+        .annotate(s=Sum("amount_egp"))
+        .values("s"),
+        output_field=MONEY,
+    )
+    return parents.annotate(
+        total_due=Coalesce(Sum(remaining, filter=is_open), zero, output_field=MONEY),
+        total_overdue=Coalesce(
+            Sum(remaining, filter=Q(invoices__status=S.OVERDUE)), zero, output_field=MONEY
+        ),
+        open_count=Count("invoices", filter=is_open),
+        month_paid=Coalesce(month_paid, zero, output_field=MONEY),
+    )
+
+
+def parent_billing_summary(parent, today=None):
+    """ملخّص فوترة وليّ أمر واحد (dict بـ BILLING_SUMMARY_FIELDS) — كويري واحد."""
+    return (
+        with_billing_summary(ParentProfile.objects.filter(pk=parent.pk), today)
+        .values(*BILLING_SUMMARY_FIELDS)
+        .get()
+    )
+
+
+@transaction.atomic
+def reconcile_paid_totals(dry_run=False):
+    """
+    يعيد حساب paid_total من صفوف Payment ويصلّح أي فاتورة مختلفة.
+    يرجّع list من (invoice_id, stored, actual) للفواتير اللي كانت غلط.
+    """
+    mismatched = list(
+        Invoice.objects.annotate(actual=_payments_sum_subquery())
+        .filter(~Q(paid_total=F("actual")))
+        .values_list("id", "paid_total", "actual")
+    )
+    if dry_run or not mismatched:
+        return mismatched
+
+    fixed = Invoice.objects.filter(id__in=[row[0] for row in mismatched])
+    fixed.update(paid_total=_payments_sum_subquery())
+    fragment_cache.bump(
+        fragment_cache.PARENT_BILLING, fixed.values_list("parent_id", flat=True)
+    )
+    refresh_invoice_statuses(fixed)
+    return mismatched
+
+
+def refresh_invoice_statuses(queryset=None, today=None):
+    """
+    محرّك حالة set-based: يعيد تصنيف الفواتير PAID/DUE/OVERDUE بعدد ثابت من
+    UPDATEs (نفس قواعد Invoice.refresh_status) مهما كان عدد الفواتير.
+    - queryset اختياري لقصر التحديث (مثلاً اختيار الأدمن أو شهر معيّن).
+    - الفواتير الملغاة (CANCELED) ما بتتلمسش.
+    يرجّع dict بعدد الفواتير اللي اتغيّرت لكل حالة.
+    """
+    S = Invoice.Status
+    qs = Invoice.objects.all() if queryset is None else queryset
+    qs = qs.exclude(status=S.CANCELED).order_by()
+    today = today or timezone.localdate()
+    now = timezone.now()
+
+    paid = Q(paid_total__gte=F("amount_egp"))
+    overdue = ~paid & Q(due_date__lt=today)
+    due = ~paid & (Q(due_date__isnull=True) | Q(due_date__gte=today))
+
+    to_paid = paid & (~Q(status=S.PAID) | Q(paid_at__isnull=True))
+    to_overdue = overdue & (~Q(status=S.OVERDUE) | Q(paid_at__isnull=False))
+    to_due = due & (~Q(status=S.DUE) | Q(paid_at__isnull=False))
+
+    with transaction.atomic():
+        # المدرّسين المتأثرين قبل الـ UPDATE: لو qs متفلتر بالحالة (فلتر الأدمن
+        # مثلاً) الصفوف اللي اتغيّرت ما بقتش تطابقه بعده
+        teacher_ids = set(
+            qs.filter(to_paid | to_overdue | to_due)
+            .values_list("group__teacher_id", flat=True)
+            .distinct()
+        )
+        changed = {
+            S.PAID: qs.filter(to_paid).update(
+                status=S.PAID, paid_at=Coalesce(F("paid_at"), Value(now))
+            ),
+            S.OVERDUE: qs.filter(to_overdue).update(status=S.OVERDUE, paid_at=None),
+            S.DUE: qs.filter(to_due).update(status=S.DUE, paid_at=None),
+        }
+        if any(changed.values()):
+            # update() ما بيطلق سيجنالز — عدّاد "فواتير مستحقة" في اللقطة اتغيّر
+            invalidate_teacher_snapshots(teacher_id__in=teacher_ids - {None})
+            # الملّاك المتأثرين مش معروفين بعد الـ UPDATE (الليلي بيلمس الكل)
+            fragment_cache.bump_all(fragment_cache.PARENT_BILLING)
+    return changed
+
+
+def issue_monthly_invoices(groups, year, month, amount, due_date=None, chunk_size=1000):
+    """
+    إصدار فواتير شهر لكل التسجيلات النشطة في groups (QuerySet مجموعات:
+    مجموعة واحدة، كل مجموعات مدرّس، أو كل المجموعات) بعدد ثابت من الكويريز:
+    كويري للتسجيلات + كويري للمفاتيح الموجودة + bulk_create على دفعات.
+    - الطالب بدون وليّ أمر بيتخطّى (parent إجباري على الفاتورة).
+    يرجّع (created, skipped).
+    """
+    enrollments = list(
+        Enrollment.objects.filter(group__in=groups, is_active=True)
+        .order_by()
+        .values_list("student__parent_id", "student_id", "group_id")
+    )
+    if not enrollments:
+        return 0, 0
+
+    existing = set(
+        Invoice.objects.filter(
+            group_id__in={g for _, _, g in enrollments}, year=year, month=month
+        ).values_list("parent_id", "student_id", "group_id")
+    )
+
+    to_create = []
+    skipped = 0
+    for key in enrollments:
+        parent_id, student_id, group_id = key
+        if parent_id is None or key in existing:
+            skipped += 1
+            continue
+        existing.add(key)
+        to_create.append(
+            Invoice(
+                parent_id=parent_id,
+                student_id=student_id,
+                group_id=group_id,
+                year=year,
+                month=month,
+                amount_egp=amount,
+                due_date=due_date,
+            )
+        )
+
+    if to_create:
+        # ignore_conflicts: لو طلب موازي أصدر نفس الفاتورة بين القراءة والكتابة
+        with transaction.atomic():
+            Invoice.objects.bulk_create(
+                to_create, batch_size=chunk_size, ignore_conflicts=True
+            )
+        # bulk_create ما بيطلق سيجنالز
+        invalidate_teacher_snapshots(
+            teacher_id__in=Group.objects.filter(
+                id__in={i.group_id for i in to_create}
+            ).values("teacher_id")
+        )
+        fragment_cache.bump(
+            fragment_cache.PARENT_BILLING, {i.parent_id for i in to_create}
+        )
+    return len(to_create), skipped
@@ -0,0 +1,91 @@
+# core/services/dashboard.py
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from core.models import (
+    AttendanceDailyRollup,
+    ClassSession,
+    Enrollment,
+    Group,
+    Invoice,
+    TeacherDashboardSnapshot,
+)
+
+DUE_STATUSES = [Invoice.Status.DUE, Invoice.Status.OVERDUE]
+
+
+def _per_group(qs):
+    return dict(qs.values("group_id").annotate(c=Count("id")).values_list("group_id", "c"))
+
+
+def build_teacher_snapshot(teacher, today=None):
+    """
+    يحسب لقطة لوحة المدرّس من الصفر ويخزّنها.
+    - عدد ثابت من الكويريز مهما كان عدد المجموعات (تجميع GROUP BY لكل جدول).
+    - الحصص القادمة وفواتير الشهر محسوبة نسبةً لـ today.
+    """
+    today = today or timezone.localdate()
+    group_ids = list(Group.objects.filter(teacher=teacher).values_list("id", flat=True))
+
+    students = _per_group(
+        Enrollment.objects.filter(group_id__in=group_ids, is_active=True)
+    )
+    upcoming = _per_group(
+        ClassSession.objects.filter(group_id__in=group_ids, date__gte=today)
+    )
+    due = _per_group(
+        Invoice.objects.filter(
+            group_id__in=group_ids,
+            year=today.year,
+            month=today.month,
+            status__in=DUE_STATUSES,
+        )
+    )
+    att = AttendanceDailyRollup.objects.filter(group_id__in=group_ids).aggregate(
+        total=Sum("total"),
+        present=Sum(F("present") + F("late")),
+    )
+
+    counters = {
+        str(gid): {
+            "students": students.get(gid, 0),
+            "upcoming": upcoming.get(gid, 0),
+            "due": due.get(gid, 0),
+        }
+        for gid in group_ids
+    }
+
+    snap, _ = TeacherDashboardSnapshot.objects.update_or_create(
+        teacher=teacher,
+        defaults={
+            "built_for": today,
+            "total_groups": len(group_ids),
+            "total_students": sum(students.values()),
+            "upcoming_count": sum(upcoming.values()),
+            "due_invoices": sum(due.values()),
+            "att_total": att["total"] or 0,
+            "att_present": att["present"] or 0,
+            "group_counters": counters,
+            "is_stale": False,
+        },
+    )
+    return snap
+
+
+def get_teacher_snapshot(teacher):
+    """يرجّع لقطة صالحة (كويري واحد لو موجودة وحديثة، وإلا يعيد بناءها)."""
+    today = timezone.localdate()
+    snap = TeacherDashboardSnapshot.objects.filter(teacher=teacher).first()
+    if snap is None or snap.is_stale or snap.built_for != today:
+        snap = build_teacher_snapshot(teacher, today=today)
+    return snap
+
+
+def invalidate_teacher_snapshots(**lookups):
+    """
+    يعلّم لقطات المدرّسين المتأثرين كـ stale (UPDATE واحد).
+    أمثلة: teacher_id=3 أو teacher__teachergroups=group_id
+    """
+    if any(v is None for v in lookups.values()):
+        return 0
+    return TeacherDashboardSnapshot.objects.filter(**lookups).update(is_stale=True)
@@ -0,0 +1,373 @@
+# core/services/dataset.py
+"""
+مولّد بيانات واقعية الحجم لقياس الأداء: مدرّسين/مجموعات/طلاب/أولياء أمور/حصص/
+حضور/واجبات/موارد/فواتير/مدفوعات/تقارير شهرية.
+كل الإدخال بـ bulk_create، فبعده لازم نعيد بناء التجميعات ونعلّم اللقطات كـ stale
+لأن bulk_create ما بيطلق سيجنالز.
+"""
+import random
+import secrets
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import (
+    AcademicYear,
+    Assignment,
+    Attendance,
+    ClassSession,
+    Enrollment,
+    Group,
+    HomeworkSubmission,
+    Invoice,
+    MonthlyReport,
+    ParentProfile,
+    Payment,
+    Resource,
+    Student,
+    StudentProfile,
+    Subject,
+    TeacherProfile,
+)
+from core.services import fragment_cache
+from core.services.attendance import rebuild_all_rollups
+from core.services.dashboard import invalidate_teacher_snapshots
+
+BATCH = 1000
+
+_STATUS_WEIGHTS = [
+    (Attendance.Status.PRESENT, 80),
+    (Attendance.Status.ABSENT, 10),
+    (Attendance.Status.LATE, 7),
+    (Attendance.Status.EXCUSED, 3),
+]
+
+
+def _checkin_code():
+    # bulk_create ما بينادي Student.save()
+    return secrets.token_urlsafe(6).replace("-", "").replace("_", "")[:8]
+
+
+def _aware(day, t):
+    return timezone.make_aware(datetime.combine(day, t))
+
+
+def _months_between(start, end):
+    """[(year, month), ...] من شهر start لحد شهر end."""
+    y, m = start.year, start.month
+    out = []
+    while (y, m) <= (end.year, end.month):
+        out.append((y, m))
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
+def _users(names):
+    User.objects.bulk_create([User(username=n) for n in names], batch_size=BATCH)
+    return {u.username: u for u in User.objects.filter(username__in=names)}
+
+
+@transaction.atomic
+def seed_dataset(
+    teachers=5,
+    groups_per_teacher=4,
+    students_per_group=25,
+    weeks=12,
+    sessions_per_week=2,
+    assignments_per_week=1,
+    students_per_parent=2,
+    student_logins=True,
+    monthly_fee=Decimal("300.00"),
+    paid_ratio=0.6,
+    prefix="bench",
+    seed=42,
+):
+    """
+    يزرع بيانات تجريبية وينهي بـ dict فيه عدد الصفوف لكل جدول.
+    prefix يميّز المستخدمين/المجموعات المزروعة (ولازم يكون جديد في كل تشغيل).
+    - students_per_parent: كل وليّ أمر له كام طالب.
+    - student_logins: إنشاء حساب (StudentProfile) لكل طالب.
+    - paid_ratio: نسبة الفواتير المسدّدة بالكامل (وجزء صغير مسدّد جزئيًا).
+    """
+    rnd = random.Random(seed)
+    today = timezone.localdate()
+    start = today - timedelta(weeks=weeks)
+    end = today + timedelta(days=14)
+
+    subject, _ = Subject.objects.get_or_create(name=f"{prefix}-رياضيات")
+    ay = AcademicYear.objects.create(
+        name=f"{prefix}-{today.year}",
+        start_date=start - timedelta(days=30),
+        end_date=end + timedelta(days=180),
+    )
+
+    # المدرّسين
+    t_users = list(_users([f"{prefix}_t{i}" for i in range(teachers)]).values())
+    TeacherProfile.objects.bulk_create([TeacherProfile(user=u) for u in t_users])
+    profiles = list(TeacherProfile.objects.filter(user__in=t_users))
+
+    # المجموعات
+    Group.objects.bulk_create(
+        [
+            Group(
+                academic_year=ay,
+                name=f"{prefix}-g{t.id}-{j}",
+                grade=Group.Grade.G1,
+                teacher=t,
+                subject=subject,
+            )
+            for t in profiles
+            for j in range(groups_per_teacher)
+        ]
+    )
+    groups = list(Group.objects.filter(academic_year=ay))
+
+    # أولياء الأمور
+    n_students = len(groups) * students_per_group
+    n_parents = -(-n_students // max(1, students_per_parent))
+    p_users = _users([f"{prefix}_p{i}" for i in range(n_parents)])
+    ParentProfile.objects.bulk_create(
+        [ParentProfile(user=u) for u in p_users.values()], batch_size=BATCH
+    )
+    parent_ids = dict(
+        ParentProfile.objects.filter(user__in=p_users.values()).values_list(
+            "user__username", "id"
+        )
+    )
+
+    # الطلاب + التسجيلات
+    Student.objects.bulk_create(
+        [
+            Student(
+                first_name=f"{prefix}{g.id}",
+                last_name=str(k),
+                checkin_code=_checkin_code(),
+                parent_id=parent_ids[
+                    f"{prefix}_p{(gi * students_per_group + k) // students_per_parent}"
+                ],
+            )
+            for gi, g in enumerate(groups)
+            for k in range(students_per_group)
+        ],
+        batch_size=BATCH,
+    )
+    # نرجع الـ ids بكويري (مش كل الداتابيز بترجّعها من bulk_create)
+    gid_by_name = {f"{prefix}{g.id}": g.id for g in groups}
+    students_by_group = {}
+    parent_of = {}
+    for st in Student.objects.filter(first_name__in=gid_by_name).only(
+        "id", "first_name", "parent_id"
+    ):
+        students_by_group.setdefault(gid_by_name[st.first_name], []).append(st.id)
+        parent_of[st.id] = st.parent_id
+    Enrollment.objects.bulk_create(
+        [
+            Enrollment(group_id=gid, student_id=sid)
+            for gid, sids in students_by_group.items()
+            for sid in sids
+        ],
+        batch_size=BATCH,
+    )
+
+    # الحصص (أيام ثابتة لكل مجموعة)
+    sessions = []
+    for g in groups:
+        days = rnd.sample(range(7), sessions_per_week)
+        hour = rnd.randint(14, 20)
+        d = start
+        while d <= end:
+            if d.weekday() in days:
+                s = ClassSession(
+                    group=g,
+                    teacher_id=g.teacher_id,
+                    subject=subject,
+                    date=d,
+                    start_time=time(hour, 0),
+                    end_time=time(hour + 1, 0),
+                )
+                s.sync_bounds()
+                sessions.append(s)
+            d += timedelta(days=1)
+    ClassSession.objects.bulk_create(sessions, batch_size=BATCH)
+    past_sessions = list(
+        ClassSession.objects.filter(group__in=groups, date__lte=today).values_list(
+            "id", "group_id"
+        )
+    )
+
+    # الحضور للحصص اللي فاتت
+    statuses = [s for s, _ in _STATUS_WEIGHTS]
+    weights = [w for _, w in _STATUS_WEIGHTS]
+    att = []
+    for sess_id, gid in past_sessions:
+        for sid in students_by_group.get(gid, ()):
+            att.append(
+                Attendance(
+                    session_id=sess_id,
+                    student_id=sid,
+                    status=rnd.choices(statuses, weights)[0],
+                )
+            )
+    Attendance.objects.bulk_create(att, batch_size=BATCH)
+
+    # الواجبات + التسليمات (assigned_at/submitted_at/created_at auto_now_add
+    # فبنظبطها بعد الإنشاء بـ bulk_update)
+    assignments = []
+    for g in groups:
+        for w in range(weeks * assignments_per_week):
+            assignments.append(
+                Assignment(group=g, subject=subject, title=f"{prefix} واجب {w + 1}")
+            )
+    Assignment.objects.bulk_create(assignments, batch_size=BATCH)
+    assignments = list(Assignment.objects.filter(group__in=groups))
+    for a in assignments:
+        a.assigned_at = _aware(
+            start + timedelta(days=rnd.randint(0, (today - start).days)), time(12, 0)
+        )
+        a.due_at = a.assigned_at + timedelta(days=7)
+    Assignment.objects.bulk_update(assignments, ["assigned_at", "due_at"], batch_size=BATCH)
+
+    subs = []
+    for a in assignments:
+        for sid in students_by_group.get(a.group_id, ()):
+            if rnd.random() < 0.75:
+                graded = rnd.random() < 0.6
+                subs.append(
+                    HomeworkSubmission(
+                        assignment=a,
+                        student_id=sid,
+                        answer_text="-",
+                        status=(
+                            HomeworkSubmission.Status.GRADED
+                            if graded
+                            else rnd.choice(
+                                [
+                                    HomeworkSubmission.Status.SUBMITTED,
+                                    HomeworkSubmission.Status.LATE,
+                                ]
+                            )
+                        ),
+                        grade=rnd.randint(40, 100) if graded else None,
+                    )
+                )
+    HomeworkSubmission.objects.bulk_create(subs, batch_size=BATCH)
+    subs = list(
+        HomeworkSubmission.objects.filter(assignment__in=assignments)
+        .select_related("assignment")
+        .only("id", "assignment", "assignment__assigned_at")
+    )
+    for sub in subs:
+        sub.submitted_at = sub.assignment.assigned_at + timedelta(
+            hours=rnd.randint(1, 24 * 9)
+        )
+    HomeworkSubmission.objects.bulk_update(subs, ["submitted_at"], batch_size=BATCH)
+
+    # الموارد
+    resources = [
+        Resource(
+            group=g,
+            subject=subject,
+            kind=Resource.Kind.LINK,
+            title=f"{prefix} مورد {k}",
+            url="https://example.com/",
+        )
+        for g in groups
+        for k in range(weeks)
+    ]
+    Resource.objects.bulk_create(resources, batch_size=BATCH)
+
+    # حسابات الطلاب
+    student_profiles = 0
+    if student_logins:
+        s_users = _users([f"{prefix}_s{sid}" for sid in parent_of])
+        StudentProfile.objects.bulk_create(
+            [
+                StudentProfile(user=s_users[f"{prefix}_s{sid}"], student_id=sid)
+                for sid in parent_of
+            ],
+            batch_size=BATCH,
+        )
+        student_profiles = len(s_users)
+
+    # الفواتير + المدفوعات (شهريًا لكل تسجيل). bulk_create ما بيطلق سيجنالز
+    # Payment، فالحالة و paid_total بنحدّدهم هنا مباشرة.
+    now = timezone.now()
+    invoices = []
+    paid_plan = {}
+    for y, m in _months_between(start, today):
+        due_date = date(y, m, 10)
+        for gid, sids in students_by_group.items():
+            for sid in sids:
+                roll = rnd.random()
+                if roll < paid_ratio:
+                    status, paid = Invoice.Status.PAID, monthly_fee
+                elif roll < paid_ratio + 0.15:
+                    status, paid = Invoice.Status.DUE, monthly_fee / 2
+                else:
+                    status, paid = Invoice.Status.DUE, Decimal("0.00")
+                if status != Invoice.Status.PAID and due_date < today:
+                    status = Invoice.Status.OVERDUE
+                invoices.append(
+                    Invoice(
+                        parent_id=parent_of[sid],
+                        student_id=sid,
+                        group_id=gid,
+                        year=y,
+                        month=m,
+                        amount_egp=monthly_fee,
+                        due_date=due_date,
+                        status=status,
+                        paid_at=now if status == Invoice.Status.PAID else None,
+                        paid_total=paid,
+                    )
+                )
+                if paid:
+                    paid_plan[(sid, gid, y, m)] = paid
+    Invoice.objects.bulk_create(invoices, batch_size=BATCH)
+    payments = [
+        Payment(invoice_id=inv_id, amount_egp=paid_plan[(sid, gid, y, m)])
+        for inv_id, sid, gid, y, m in Invoice.objects.filter(group__in=groups).values_list(
+            "id", "student_id", "group_id", "year", "month"
+        )
+        if (sid, gid, y, m) in paid_plan
+    ]
+    Payment.objects.bulk_create(payments, batch_size=BATCH)
+
+    # تقرير الشهر الماضي لكل طالب (لصفحات/PDF التقرير)
+    last_month = today.replace(day=1) - timedelta(days=1)
+    reports = [
+        MonthlyReport(
+            student_id=sid,
+            year=last_month.year,
+            month=last_month.month,
+            attendance_pct=Decimal(rnd.randint(60, 100)),
+            avg_homework_score=Decimal(rnd.randint(50, 100)),
+            teacher_comment="-",
+        )
+        for sid in parent_of
+    ]
+    MonthlyReport.objects.bulk_create(reports, batch_size=BATCH)
+
+    rollups = rebuild_all_rollups(group_ids=[g.id for g in groups])
+    invalidate_teacher_snapshots(teacher_id__in=[t.id for t in profiles])
+    fragment_cache.bump(fragment_cache.TEACHER_GROUPS, [t.id for t in profiles])
+
+    return {
+        "teachers": len(profiles),
+        "groups": len(groups),
+        "parents": len(p_users),
+        "students": len(parent_of),
+        "student_profiles": student_profiles,
+        "sessions": len(sessions),
+        "attendance": len(att),
+        "assignments": len(assignments),
+        "submissions": len(subs),
+        "resources": len(resources),
+        "invoices": len(invoices),
+        "payments": len(payments),
+        "monthly_reports": len(reports),
+        "rollups": rollups,
+    }
@@ -0,0 +1,110 @@
+# core/services/fragment_cache.py
+"""
+كاش لأجزاء اللوحات المحسوبة/المرندرة (ملخّص فواتير وليّ الأمر، إحصائيات حضور
+الطالب، عدّادات مجموعات المدرّس) فوق Django cache framework.
+
+المفتاح = القسم + جيل القسم + المالك (وليّ أمر/طالب/مدرّس) ونسخته + المستخدم
++ باراميترات الطلب. السيجنالز بتزوّد نسخة المالك (bump) عند أي تغيير في الموديلز
+اللي القسم معتمد عليها، فالمفاتيح القديمة ما بتتقريش تاني وبتنتهي بالـ TTL لوحدها.
+المسارات الجماعية اللي ما بتطلقش سيجنالز (update/bulk_create) بتزوّد جيل القسم
+كله (bump_all) أو نسخ الملّاك اللي تعرفهم.
+
+عدّادات hit/miss لكل قسم في الكاش نفسه: stats() و /ops/fragment-cache.json.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+PARENT_BILLING = "parent_billing"
+STUDENT_ATTENDANCE = "student_attendance"
+TEACHER_GROUPS = "teacher_groups"
+SECTIONS = (PARENT_BILLING, STUDENT_ATTENDANCE, TEACHER_GROUPS)
+
+GEN_KEY = "frag:gen:{}"
+VER_KEY = "frag:ver:{}:{}"
+STATS_KEY = "frag:stats:{}:{}"
+
+
+def _ttl():
+    return getattr(settings, "FRAGMENT_CACHE_TTL", 60 * 10)
+
+
+def _versions(keys):
+    """
+    النسخ الحالية (بتتخزّن من غير انتهاء). النسخة الناقصة (أول مرة أو اتمسحت)
+    بتبدأ من time_ns() مش 1، علشان ما نرجعش لرقم قديم ليه مدخلات لسه في الكاش.
+    """
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def _incr(key, fresh):
+    try:
+        cache.incr(key)
+    except ValueError:  # المفتاح مش موجود
+        cache.set(key, fresh, None)
+
+
+def _count(section, kind):
+    _incr(STATS_KEY.format(section, kind), 1)
+
+
+def get_or_build(section, owner_id, user_id, build, *parts):
+    """
+    يرجّع القيمة المتكاشة للقسم أو يبنيها بـ build() ويخزّنها.
+    parts: أي حاجة تانية القيمة بتختلف بيها (querystring، تاريخ النهارده...).
+    """
+    gen, ver = _versions([GEN_KEY.format(section), VER_KEY.format(section, owner_id)])
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    key = f"frag:{section}:{gen}:{owner_id}:{ver}:{user_id}:{digest}"
+
+    value = cache.get(key)
+    if value is not None:
+        _count(section, "hit")
+        return value
+    _count(section, "miss")
+    value = build()
+    cache.set(key, value, _ttl())
+    return value
+
+
+def bump(section, owner_ids):
+    """يبطّل كاش ملّاك معيّنين — بعد الـ commit، علشان طلب موازي ما يكاش الداتا القديمة بالنسخة الجديدة."""
+    keys = [VER_KEY.format(section, oid) for oid in set(owner_ids) if oid is not None]
+    if keys:
+        transaction.on_commit(lambda: [_incr(k, time.time_ns()) for k in keys])
+
+
+def bump_all(section):
+    """يبطّل القسم كله (للمسارات الجماعية اللي مش عارفة الملّاك المتأثرين)."""
+    key = GEN_KEY.format(section)
+    transaction.on_commit(lambda: _incr(key, time.time_ns()))
+
+
+def stats():
+    keys = [STATS_KEY.format(s, kind) for s in SECTIONS for kind in ("hit", "miss")]
+    found = cache.get_many(keys)
+    out = {}
+    for section in SECTIONS:
+        hits = found.get(STATS_KEY.format(section, "hit"), 0)
+        misses = found.get(STATS_KEY.format(section, "miss"), 0)
+        total = hits + misses
+        out[section] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 3) if total else None,
+        }
+    return out
+
+
+def reset_stats():
+    cache.delete_many(
+        [STATS_KEY.format(s, kind) for s in SECTIONS for kind in ("hit", "miss")]
+    )
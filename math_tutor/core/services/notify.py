@@ -1,33 +1,62 @@
-from django.core.mail import send_mail
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from itertools import groupby
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
-from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.template.loader import render_to_string
-from django.utils import timezone
 from django.contrib.auth.models import User
+from django.utils import timezone
 
-from core.models import NotificationLog, Enrollment, HomeworkSubmission
+from core.models import NotificationLog, Enrollment, HomeworkSubmission, Invoice
 
 
-def _send_email(to_user: User, subject: str, template: str, ctx: dict) -> bool:
-    if not to_user.email:
-        return False
-    body = render_to_string(template, ctx)
-    send_mail(
-        subject, body, settings.DEFAULT_FROM_EMAIL, [to_user.email], fail_silently=True
+def _already_sent_keys(event_type: str, keys) -> set:
+    """
+    كويري واحد يرجّع أزواج (object_id, recipient_id) اللي اتبعت لها قبل كده.
+    keys: iterable من (object_id, user_id).
+    """
+    keys = list(keys)
+    if not keys:
+        return set()
+    object_ids = {o for o, _ in keys}
+    user_ids = {u for _, u in keys}
+    return set(
+        NotificationLog.objects.filter(
+            event_type=event_type,
+            object_id__in=object_ids,
+            recipient_id__in=user_ids,
+        ).values_list("object_id", "recipient_id")
     )
-    return True
 
 
-def _already_sent(event_type: str, object_id: int, user: User) -> bool:
-    return NotificationLog.objects.filter(
-        event_type=event_type, object_id=object_id, recipient=user
-    ).exists()
+def _deliver(event_type: str, items, connection=None) -> int:
+    """
+    يبعت كل الرسائل على اتصال SMTP واحد ثم يسجّل NotificationLog دفعة واحدة.
+    items: list من (object_id, user, EmailMessage).
+    """
+    if not items:
+        return 0
+    connection = connection or get_connection(fail_silently=True)
+    sent = connection.send_messages([msg for _, _, msg in items]) or 0
+    if not sent:
+        return 0
+    NotificationLog.objects.bulk_create(
+        [
+            NotificationLog(event_type=event_type, object_id=obj_id, recipient=user)
+            for obj_id, user, _ in items
+        ],
+        ignore_conflicts=True,
+    )
+    return sent
 
 
-def _mark_sent(event_type: str, object_id: int, user: User):
-    NotificationLog.objects.get_or_create(
-        event_type=event_type, object_id=object_id, recipient=user
-    )
+def _build_message(to_user: User, subject: str, template: str, ctx: dict):
+    if not to_user.email:
+        return None
+    body = render_to_string(template, ctx)
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [to_user.email])
 
 
 def parents_for_group(group):
@@ -47,56 +76,185 @@ def parents_for_group(group):
     return users
 
 
+def parents_for_groups(group_ids):
+    """
+    نسخة جماعية من parents_for_group بكويري واحد لكل المجموعات.
+    يرجّع {group_id: [(user, student), ...]} بدون تكرار وليّ الأمر داخل المجموعة.
+    """
+    result = defaultdict(list)
+    seen = set()
+    qs = (
+        Enrollment.objects.filter(group_id__in=group_ids, is_active=True)
+        .select_related("student__parent__user")
+        .order_by("group_id", "id")
+    )
+    for e in qs:
+        p = getattr(e.student.parent, "user", None)
+        if p and (e.group_id, p.id) not in seen:
+            result[e.group_id].append((p, e.student))
+            seen.add((e.group_id, p.id))
+    return result
+
+
+def _dispatch(event_type, object_id, pairs, subject, template, ctx, connection=None):
+    """
+    مسار موحّد لإرسال حدث لعدة مستلمين:
+    1) كويري واحد للمستلمين اللي اتبعت لهم قبل كده.
+    2) تجهيز كل الرسائل.
+    3) إرسالها على اتصال واحد + bulk_create للسجل.
+    """
+    done = _already_sent_keys(event_type, [(object_id, u.id) for u, _ in pairs])
+    items = []
+    for user, student in pairs:
+        if (object_id, user.id) in done:
+            continue
+        msg = _build_message(user, subject, template, {**ctx, "student": student})
+        if msg is not None:
+            items.append((object_id, user, msg))
+    return _deliver(event_type, items, connection=connection)
+
+
 # === إشعار إنشاء واجب ===
 def notify_assignment_created(assignment):
     group = assignment.group
     pairs = parents_for_group(group)
     subject_obj = assignment.get_subject()
-    subj_text = f" — {subject_obj.name}" if subject_obj else ""
-    subject_line = f"واجب جديد{subj_text}: {assignment.title} — {assignment.group.name}"
-    sent_count = 0
-    for user, student in pairs:
-        if _already_sent(NotificationLog.Event.ASSIGNMENT_CREATED, assignment.id, user):
-            continue
-        ctx = {
-            "site_name": settings.SITE_NAME,
-            "site_url": settings.SITE_URL,
-            "assignment": assignment,
-            "group": group,
-            "student": student,
-            "subject_obj": subject_obj,  # مجرد اسم لرسالة ألطف
-        }
-        subject = f"واجب جديد: {assignment.title} — {group.name}"
-        if _send_email(user, subject, "emails/assignment_created.txt", ctx):
-            _mark_sent(NotificationLog.Event.ASSIGNMENT_CREATED, assignment.id, user)
-            sent_count += 1
-    return sent_count
+    ctx = {
+        "site_name": settings.SITE_NAME,
+        "site_url": settings.SITE_URL,
+        "assignment": assignment,
+        "group": group,
+        "subject_obj": subject_obj,  # مجرد اسم لرسالة ألطف
+    }
+    subject = f"واجب جديد: {assignment.title} — {group.name}"
+    return _dispatch(
+        NotificationLog.Event.ASSIGNMENT_CREATED,
+        assignment.id,
+        pairs,
+        subject,
+        "emails/assignment_created.txt",
+        ctx,
+    )
 
 
 # === تذكير الحصة قبل ساعتين ===
+def _session_reminder_parts(session):
+    ctx = {
+        "site_name": settings.SITE_NAME,
+        "site_url": settings.SITE_URL,
+        "session": session,
+        "group": session.group,
+        "subject_obj": session.get_subject(),
+    }
+    subject = (
+        f"تذكير حصة: {session.group.name} اليوم {session.date} الساعة {session.start_time}"
+    )
+    return subject, ctx
+
+
+def notify_session_reminders_batch(sessions, connection=None):
+    """
+    تذكيرات لعدة حصص دفعة واحدة:
+    - أولياء أمور كل المجموعات بكويري واحد.
+    - سجل NotificationLog لكل أزواج (حصة، مستلم) بكويري واحد.
+    - كل الرسائل على اتصال بريد واحد.
+    يرجّع عدد الرسائل المرسلة.
+    """
+    sessions = list(sessions)
+    if not sessions:
+        return 0
+    event = NotificationLog.Event.SESSION_REMINDER
+    parents = parents_for_groups({s.group_id for s in sessions})
+    done = _already_sent_keys(
+        event,
+        [(s.id, u.id) for s in sessions for u, _ in parents.get(s.group_id, ())],
+    )
+
+    items = []
+    for session in sessions:
+        subject, ctx = _session_reminder_parts(session)
+        for user, student in parents.get(session.group_id, ()):
+            if (session.id, user.id) in done:
+                continue
+            msg = _build_message(
+                user, subject, "emails/session_reminder.txt", {**ctx, "student": student}
+            )
+            if msg is not None:
+                items.append((session.id, user, msg))
+    return _deliver(event, items, connection=connection)
+
+
 def notify_session_reminder(session):
-    group = session.group
-    pairs = parents_for_group(group)
-    sent = 0
-    subject_obj = session.get_subject()
-    subj_text = f" — {subject_obj.name}" if subject_obj else ""
-    subject_line = f"تذكير حصة{subj_text}: {session.group.name} اليوم {session.date} الساعة {session.start_time}"
+    return notify_session_reminders_batch([session])
 
-    for user, student in pairs:
-        if _already_sent(NotificationLog.Event.SESSION_REMINDER, session.id, user):
-            continue
-        ctx = {
-            "site_name": settings.SITE_NAME,
-            "site_url": settings.SITE_URL,
-            "session": session,
-            "group": group,
-            "student": student,
-            "subject_obj": subject_obj,
-        }
-        subject = (
-            f"تذكير حصة: {group.name} اليوم {session.date} الساعة {session.start_time}"
+
+# === ملخص الفواتير المتأخرة (رسالة واحدة لكل وليّ أمر) ===
+def _overdue_digest_message(user, parent, invoices):
+    ctx = {
+        "site_name": settings.SITE_NAME,
+        "site_url": settings.SITE_URL,
+        "parent_name": user.get_full_name() or user.username,
+        "parent": parent,
+        "invoices": invoices,
+        "total_remaining": sum((inv.remaining for inv in invoices), Decimal("0.00")),
+    }
+    subject = f"تذكير: {len(invoices)} فاتورة متأخرة السداد"
+    return _build_message(user, subject, "emails/invoice_overdue_digest.txt", ctx)
+
+
+def notify_overdue_invoices_digest(
+    today=None, min_interval_days=None, batch_size=200, connection=None
+):
+    """
+    خط معالجة متدفق لتذكير الفواتير المتأخرة:
+    - كويري واحد مرتّب بوليّ الأمر (select_related) ومقروء بـ iterator().
+    - رسالة ملخّص واحدة لكل وليّ أمر فيها كل فواتيره المتأخرة.
+    - كل الرسائل على اتصال بريد واحد، وسجل NotificationLog كل batch_size وليّ أمر
+      (لو التاسك وقع في النص، إعادة التشغيل بتكمّل من غير تكرار).
+    - Rate limit: وليّ الأمر اللي اتبعت له ملخص خلال آخر min_interval_days يوم بيتخطّى.
+    يرجّع عدد الرسائل المرسلة.
+    """
+    today = today or timezone.localdate()
+    if min_interval_days is None:
+        min_interval_days = getattr(settings, "OVERDUE_DIGEST_INTERVAL_DAYS", 3)
+    event = NotificationLog.Event.OVERDUE_DIGEST
+    since = (today - timedelta(days=max(1, min_interval_days) - 1)).toordinal()
+
+    recently_notified = NotificationLog.objects.filter(
+        event_type=event,
+        recipient_id=OuterRef("parent__user_id"),
+        object_id__gte=since,
+    )
+    qs = (
+        Invoice.objects.filter(
+            status__in=[Invoice.Status.DUE, Invoice.Status.OVERDUE],
+            due_date__lt=today,
         )
-        if _send_email(user, subject, "emails/session_reminder.txt", ctx):
-            _mark_sent(NotificationLog.Event.SESSION_REMINDER, session.id, user)
-            sent += 1
+        .filter(~Exists(recently_notified))
+        .select_related("parent__user", "student", "group")
+        .order_by("parent_id", "due_date", "id")
+    )
+
+    own_connection = connection is None
+    connection = connection or get_connection(fail_silently=True)
+    sent = 0
+    items = []
+    try:
+        for _parent_id, rows in groupby(
+            qs.iterator(chunk_size=1000), key=lambda inv: inv.parent_id
+        ):
+            invoices = [inv for inv in rows if inv.remaining > 0]
+            if not invoices:
+                continue
+            parent = invoices[0].parent
+            msg = _overdue_digest_message(parent.user, parent, invoices)
+            if msg is not None:
+                items.append((today.toordinal(), parent.user, msg))
+            if len(items) >= batch_size:
+                sent += _deliver(event, items, connection=connection)
+                items = []
+        sent += _deliver(event, items, connection=connection)
+    finally:
+        if own_connection:
+            connection.close()
     return sent
@@ -0,0 +1,227 @@
+# core/services/pdf.py
+"""
+توليد PDF للفواتير والتقارير الشهرية مع كاش content-addressed في media storage:
+    pdf_cache/<kind>/<pk>/<sha256>.pdf
+المفتاح = hash(نسخة قالب PDF + البيانات اللي بتظهر في الملف)، فأي تعديل في الصف
+أو القالب بيطلع مفتاح جديد تلقائيًا. السيجنالز بتمسح الملفات القديمة (توفير مساحة).
+"""
+import hashlib
+import json
+import os
+import zipfile
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template.loader import get_template, render_to_string
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.pdfmetrics import registerFontFamily
+from reportlab.pdfbase.ttfonts import TTFont
+from xhtml2pdf import pisa
+
+CACHE_ROOT = "pdf_cache"
+# زوّدها لو اتغيّر منطق التوليد نفسه (مش القالب) عشان تبطّل كل الكاش
+PDF_CACHE_VERSION = 1
+
+INVOICE_TEMPLATE = "core/invoice_pdf.html"
+REPORT_TEMPLATE = "core/parent_report_pdf.html"
+
+
+class PdfRenderError(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def ensure_pdf_fonts():
+    """تسجيل الخط العربي عند ReportLab مرة واحدة لكل بروسيس."""
+    font_path = finders.find("fonts/NotoNaskhArabic-Regular.ttf") or finders.find(
+        "fonts/Amiri-Regular.ttf"
+    )
+    if not font_path:
+        return False
+    try:
+        pdfmetrics.getFont("NotoNaskh")
+    except KeyError:
+        pdfmetrics.registerFont(TTFont("NotoNaskh", font_path))
+        # مو لازم يكون عندك Bold/Italic؛ نربط العائلة لنفس الخط
+        registerFontFamily(
+            "NotoNaskh",
+            normal="NotoNaskh",
+            bold="NotoNaskh",
+            italic="NotoNaskh",
+            boldItalic="NotoNaskh",
+        )
+    return True
+
+
+def link_callback(uri, rel):
+    """xhtml2pdf يحتاج مسار ملف حقيقي للصور/الخطوط تحت STATIC_URL."""
+    if uri.startswith(settings.STATIC_URL):
+        relative_path = uri.replace(settings.STATIC_URL, "", 1)
+        found = finders.find(relative_path)
+        if isinstance(found, (list, tuple)):
+            found = found[0] if found else None
+        if found:
+            return found
+        # بعد collectstatic (finders ممكن تكون مش شغالة في الإنتاج)
+        if settings.STATIC_ROOT:
+            return os.path.join(settings.STATIC_ROOT, relative_path)
+    return uri
+
+
+def html_to_pdf(html_str) -> bytes:
+    pdf_io = BytesIO()
+    status = pisa.CreatePDF(
+        src=html_str, dest=pdf_io, encoding="utf-8", link_callback=link_callback
+    )
+    if status.err:
+        raise PdfRenderError("تعذّر توليد PDF بواسطة xhtml2pdf.")
+    return pdf_io.getvalue()
+
+
+@lru_cache(maxsize=None)
+def _template_version(name):
+    """hash لمصدر القالب (يتحسب مرة لكل بروسيس؛ تعديل القالب = deploy جديد)."""
+    source = get_template(name).template.source
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+def _digest(template_name, fingerprint):
+    payload = json.dumps(
+        [PDF_CACHE_VERSION, _template_version(template_name), fingerprint],
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cached(kind, pk, digest, render):
+    """
+    يرجّع (file, hit). لو مش موجود: يولّد ويخزّن ويمسح النسخ القديمة لنفس الصف.
+    render=None = بحث في الكاش بس (يرجّع (None, False) لو مش موجود).
+    """
+    path = f"{CACHE_ROOT}/{kind}/{pk}/{digest}.pdf"
+    if default_storage.exists(path):
+        return default_storage.open(path, "rb"), True
+    if render is None:
+        return None, False
+    data = render()
+    purge_pdf_cache(kind, pk)
+    default_storage.save(path, ContentFile(data))
+    return ContentFile(data), False
+
+
+def purge_pdf_cache(kind, pk):
+    folder = f"{CACHE_ROOT}/{kind}/{pk}"
+    try:
+        _dirs, files = default_storage.listdir(folder)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for name in files:
+        default_storage.delete(f"{folder}/{name}")
+
+
+# ===== الفاتورة =====
+def _invoice_context(inv):
+    return {
+        "inv": inv,
+        "SITE_NAME": getattr(settings, "SITE_NAME", ""),
+        "SITE_URL": getattr(settings, "SITE_URL", ""),
+    }
+
+
+def _invoice_fingerprint(inv):
+    return {
+        "id": inv.pk,
+        "year": inv.year,
+        "month": inv.month,
+        "amount": inv.amount_egp,
+        "paid": inv.paid_total,
+        "status": inv.status,
+        "due": inv.due_date,
+        "notes": inv.notes,
+        "student": [inv.student.first_name, inv.student.last_name],
+        "parent": inv.parent.user.username,
+        "group": inv.group.name if inv.group_id else None,
+        "site": [getattr(settings, "SITE_NAME", ""), getattr(settings, "SITE_URL", "")],
+    }
+
+
+def render_invoice_pdf(inv) -> bytes:
+    return html_to_pdf(render_to_string(INVOICE_TEMPLATE, _invoice_context(inv)))
+
+
+def invoice_pdf_file(inv, render=True):
+    """inv لازم يكون معاه select_related('student', 'group', 'parent__user')."""
+    digest = _digest(INVOICE_TEMPLATE, _invoice_fingerprint(inv))
+    return _cached(
+        "invoice", inv.pk, digest, (lambda: render_invoice_pdf(inv)) if render else None
+    )
+
+
+def invoice_filename(inv):
+    return f"invoice_{inv.student_id}_{inv.year}_{inv.month}.pdf"
+
+
+def write_invoice_bundle(invoices, fh):
+    """
+    يكتب PDF كل فاتورة في ZIP على fh (ملف مفتوح للكتابة) ويرجّع العدد.
+    كل فاتورة بتعدّي على الكاش، فإعادة طلب نفس الشهر ما بتولّدش غير اللي اتغيّر.
+    ZIP_STORED: الـ PDF مضغوط أصلًا، فالضغط تاني وقت CPU على الفاضي.
+    """
+    count = 0
+    with zipfile.ZipFile(fh, "w", zipfile.ZIP_STORED) as zf:
+        for inv in invoices:
+            pdf_file, _hit = invoice_pdf_file(inv)
+            with pdf_file:
+                zf.writestr(invoice_filename(inv), pdf_file.read())
+            count += 1
+    return count
+
+
+# ===== التقرير الشهري =====
+def _report_fingerprint(student, report):
+    return {
+        "id": report.pk,
+        "student": [student.first_name, student.last_name],
+        "fields": [
+            report.year,
+            report.month,
+            report.attendance_pct,
+            report.avg_homework_score,
+            report.strengths,
+            report.weaknesses,
+            report.recommendations,
+            report.teacher_comment,
+            report.created_at,
+        ],
+    }
+
+
+def render_report_pdf(student, report) -> bytes:
+    ensure_pdf_fonts()
+    html_str = render_to_string(
+        REPORT_TEMPLATE,
+        {"student": student, "report": report, "STATIC_URL": settings.STATIC_URL},
+    )
+    return html_to_pdf(html_str)
+
+
+def report_pdf_file(student, report, render=True):
+    digest = _digest(REPORT_TEMPLATE, _report_fingerprint(student, report))
+    return _cached(
+        "report",
+        report.pk,
+        digest,
+        (lambda: render_report_pdf(student, report)) if render else None,
+    )
+
+
+def report_filename(student, report):
+    return (
+        f"report_{student.first_name}_{student.last_name}_{report.year}_{report.month}.pdf"
+    )
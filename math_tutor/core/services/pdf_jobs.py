@@ -0,0 +1,147 @@
+# core/services/pdf_jobs.py
+"""
+توليد PDF في الخلفية: الفيو ينشئ PdfJob ويبعته لـ Celery ويرجع فورًا، والووركر
+يولّد الملف في storage (PdfJob.file) ويحدّث الحالة؛ المتصفح بيسأل عن الحالة
+وينزّل الملف لما يجهز.
+لو CELERY_TASK_ALWAYS_EAGER شغال (مفيش ووركر) الفيوز بتفضل على المسار المتزامن.
+"""
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+
+from core.models import Invoice, MonthlyReport, PdfJob
+from core.services.pdf import (
+    invoice_filename,
+    invoice_pdf_file,
+    report_filename,
+    report_pdf_file,
+    write_invoice_bundle,
+)
+
+logger = logging.getLogger(__name__)
+
+# الـ ZIP بيتكتب في الذاكرة لحد الحجم ده وبعدها على ملف مؤقت
+BUNDLE_SPOOL_BYTES = 16 * 1024 * 1024
+
+
+def async_pdf_enabled():
+    return not getattr(settings, "CELERY_TASK_ALWAYS_EAGER", False)
+
+
+def bundle_invoices_qs(group, year, month):
+    """فواتير شهر لمجموعة (من غير الملغاة) بالبيانات اللي قالب الـ PDF محتاجها."""
+    return (
+        Invoice.objects.filter(group=group, year=year, month=month)
+        .exclude(status=Invoice.Status.CANCELED)
+        .select_related("student", "group", "parent__user")
+        .order_by("student__first_name", "student__last_name", "id")
+    )
+
+
+def bundle_filename(group, year, month):
+    return f"invoices_{group.pk}_{year}_{month}.zip"
+
+
+def build_invoice_bundle(group, year, month):
+    """يرجّع (ملف مؤقت مفتوح على أوله، عدد الفواتير)."""
+    tmp = tempfile.SpooledTemporaryFile(max_size=BUNDLE_SPOOL_BYTES)
+    count = write_invoice_bundle(
+        bundle_invoices_qs(group, year, month).iterator(chunk_size=200), tmp
+    )
+    tmp.seek(0)
+    return tmp, count
+
+
+def enqueue_pdf_job(job):
+    """يبعت المهمة بعد الـ commit؛ لو البروكر مش متاح ينفّذها فورًا داخل الطلب."""
+    from core.tasks import render_pdf_job
+
+    try:
+        transaction.on_commit(lambda: render_pdf_job.delay(job.pk))
+    except OperationalError:
+        run_pdf_job(job.pk)
+        job.refresh_from_db()
+
+
+def _render(job):
+    """(اسم الملف، File) حسب نوع المهمة."""
+    if job.kind == PdfJob.Kind.INVOICE:
+        inv = Invoice.objects.select_related("student", "group", "parent__user").get(
+            pk=job.object_id
+        )
+        pdf_file, _hit = invoice_pdf_file(inv)
+        return invoice_filename(inv), pdf_file
+    if job.kind == PdfJob.Kind.REPORT:
+        report = MonthlyReport.objects.select_related("student").get(pk=job.object_id)
+        pdf_file, _hit = report_pdf_file(report.student, report)
+        return report_filename(report.student, report), pdf_file
+    tmp, _count = build_invoice_bundle(job.group, job.year, job.month)
+    return bundle_filename(job.group, job.year, job.month), File(tmp)
+
+
+def _stale_before():
+    """RUNNING أقدم من حد وقت المهمة = الووركر مات في النص (acks_late بيرجّع الرسالة)."""
+    return timezone.now() - timedelta(seconds=getattr(settings, "CELERY_TASK_TIME_LIMIT", 600))
+
+
+def run_pdf_job(job_id):
+    """
+    ينفّذ المهمة مرة واحدة بس: الانتقال PENDING → RUNNING بـ UPDATE مشروط،
+    فلو الرسالة اتسلّمت مرتين الووركر التاني بيخرج من غير شغل.
+    الاستثناء: RUNNING قديم (stale) — الرسالة اللي رجعت بعد موت الووركر تاخده تاني.
+    """
+    S = PdfJob.Status
+    claimed = (
+        PdfJob.objects.filter(pk=job_id)
+        .filter(Q(status=S.PENDING) | Q(status=S.RUNNING, started_at__lt=_stale_before()))
+        .update(status=S.RUNNING, started_at=timezone.now())
+    )
+    if not claimed:
+        return None
+    job = PdfJob.objects.select_related("group").get(pk=job_id)
+    try:
+        name, content = _render(job)
+        with content:
+            job.file.save(name, content, save=False)
+        job.filename = name
+        job.status = PdfJob.Status.DONE
+    except Exception as exc:  # المتصفح بيستنى حالة نهائية؛ أي فشل يتسجّل على المهمة
+        logger.exception("PdfJob %s failed", job_id)
+        job.status = PdfJob.Status.FAILED
+        job.error = str(exc) or exc.__class__.__name__
+    job.finished_at = timezone.now()
+    job.save(update_fields=["file", "filename", "status", "error", "finished_at"])
+    return job.status
+
+
+def cleanup_pdf_jobs(max_age_hours=None):
+    """
+    مسح المهام القديمة وملفاتها (الملف متاح للتحميل PDF_JOB_TTL_HOURS ساعة).
+    RUNNING اللي محدش رجع أخده (stale) بيتعلّم FAILED علشان المتصفح يبطّل يسأل.
+    """
+    if max_age_hours is None:
+        max_age_hours = getattr(settings, "PDF_JOB_TTL_HOURS", 24)
+    PdfJob.objects.filter(
+        status=PdfJob.Status.RUNNING, started_at__lt=_stale_before()
+    ).update(
+        status=PdfJob.Status.FAILED,
+        error="انتهت مهلة التوليد.",
+        finished_at=timezone.now(),
+    )
+    qs = PdfJob.objects.filter(
+        created_at__lt=timezone.now() - timedelta(hours=max_age_hours)
+    )
+    removed = 0
+    for job in qs.only("id", "file").iterator():
+        if job.file:
+            job.file.delete(save=False)
+        removed += 1
+    qs.delete()
+    return removed
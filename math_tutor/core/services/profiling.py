@@ -0,0 +1,134 @@
+# core/services/profiling.py
+"""
+تخزين وتجميع عيّنات قياس الطلبات (اللي بيسجّلها RequestProfilingMiddleware).
+كل فيو ليه في الكاش (مشترك بين البروسيسات لو الكاش Redis):
+- مجاميع تراكمية بـ incr (عدد الطلبات، مجموع الأزمنة/الكويريز، طلبات N+1) — atomic.
+- أقصى قيمة لكل مقياس.
+- حلقة صغيرة لآخر N عيّنة (خانة لكل عيّنة، من غير إعادة كتابة لستة) للـ percentiles.
+الـ max بس read-modify-write؛ فقدان قيمة نادرة تحت ضغط مقبول لأداة قياس.
+"""
+import math
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+INDEX_KEY = "reqprof:views"
+COUNT_KEY = "reqprof:v:{}:count"
+SUM_KEY = "reqprof:v:{}:sum:{}"
+FLAGGED_KEY = "reqprof:v:{}:n1"
+MAX_KEY = "reqprof:v:{}:max"
+RING_KEY = "reqprof:v:{}:ring:{}"
+TTL = 60 * 60 * 24
+
+# الطلبات اللي ما اتحلّتش لفيو (404 عشوائية...) كلها تحت اسم واحد
+UNRESOLVED = "<unresolved>"
+FIELDS = ("total_ms", "db_ms", "template_ms", "queries")
+# المجاميع بتتخزّن أعداد صحيحة (incr) بالـ 1/1000
+SCALE = 1000
+
+
+def _ring_size():
+    return getattr(settings, "REQUEST_PROFILING_SAMPLE_LIMIT", 50)
+
+
+def _incr(key, delta):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:  # المفتاح مش موجود
+        if cache.add(key, delta, TTL):
+            return delta
+        return cache.incr(key, delta)
+
+
+def record_sample(view_name: str, sample: dict):
+    n = _incr(COUNT_KEY.format(view_name), 1)
+    if n == 1:
+        names = cache.get(INDEX_KEY) or []
+        if view_name not in names:
+            cache.set(INDEX_KEY, names + [view_name], TTL)
+
+    for field in FIELDS:
+        _incr(SUM_KEY.format(view_name, field), round(sample[field] * SCALE))
+    if sample.get("duplicates"):
+        _incr(FLAGGED_KEY.format(view_name), 1)
+
+    maxes = cache.get(MAX_KEY.format(view_name)) or {}
+    if any(sample[f] > maxes.get(f, -1) for f in FIELDS):
+        cache.set(
+            MAX_KEY.format(view_name),
+            {f: max(sample[f], maxes.get(f, sample[f])) for f in FIELDS},
+            TTL,
+        )
+    cache.set(RING_KEY.format(view_name, (n - 1) % _ring_size()), sample, TTL)
+
+
+def _view_keys(name):
+    return [
+        COUNT_KEY.format(name),
+        FLAGGED_KEY.format(name),
+        MAX_KEY.format(name),
+        *(SUM_KEY.format(name, f) for f in FIELDS),
+        *(RING_KEY.format(name, i) for i in range(_ring_size())),
+    ]
+
+
+def reset():
+    names = cache.get(INDEX_KEY) or []
+    cache.delete_many([k for n in names for k in _view_keys(n)] + [INDEX_KEY])
+
+
+def _percentile(values, p):
+    """nearest-rank percentile (values مرتّبة)."""
+    if not values:
+        return 0
+    k = max(0, math.ceil(p / 100 * len(values)) - 1)
+    return values[k]
+
+
+def _stats(values, total, count, peak):
+    values = sorted(values)
+    return {
+        "avg": round(total / SCALE / count, 2) if count else 0,
+        "p50": round(_percentile(values, 50), 2),
+        "p95": round(_percentile(values, 95), 2),
+        "p99": round(_percentile(values, 99), 2),
+        "max": round(peak, 2),
+    }
+
+
+def summarize():
+    """
+    ملخص لكل فيو: عدد الطلبات، المتوسط والأقصى (تراكمي)، percentiles من حلقة
+    آخر العيّنات للزمن الكلي/الداتابيز/القوالب وعدد الكويريز، وأكثر الكويريز
+    المكرّرة (توقيعات N+1 محتملة). مرتّب تنازليًا حسب p95 للزمن الكلي.
+    """
+    out = []
+    for name in cache.get(INDEX_KEY) or []:
+        found = cache.get_many(_view_keys(name))
+        count = found.get(COUNT_KEY.format(name), 0)
+        if not count:
+            continue
+        samples = [
+            found[k] for k in (RING_KEY.format(name, i) for i in range(_ring_size())) if k in found
+        ]
+        maxes = found.get(MAX_KEY.format(name)) or {}
+        dups = Counter()
+        for s in samples:
+            for sig, n in (s.get("duplicates") or {}).items():
+                dups[sig] = max(dups[sig], n)
+        row = {"view": name, "count": count, "recent": len(samples)}
+        for f in FIELDS:
+            row[f] = _stats(
+                [s[f] for s in samples],
+                found.get(SUM_KEY.format(name, f), 0),
+                count,
+                maxes.get(f, 0),
+            )
+        row["n_plus_one_requests"] = found.get(FLAGGED_KEY.format(name), 0)
+        row["top_duplicates"] = [
+            {"sql": sig, "max_repeats": n} for sig, n in dups.most_common(5)
+        ]
+        out.append(row)
+    out.sort(key=lambda r: r["total_ms"]["p95"], reverse=True)
+    return out
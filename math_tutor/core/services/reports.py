@@ -0,0 +1,124 @@
+# core/services/reports.py
+import calendar
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Avg, F, Sum
+from django.utils import timezone
+
+from core.models import AttendanceDailyRollup, Enrollment, HomeworkSubmission, MonthlyReport
+from core.queries import pct
+from core.services.pdf import purge_pdf_cache
+
+# الحقول المحسوبة بس — نصوص المدرّس (strengths/weaknesses/...) ما بتتلمسش في الـ upsert
+COMPUTED_FIELDS = ["attendance_pct", "avg_homework_score"]
+
+
+def previous_month(today=None):
+    today = today or timezone.localdate()
+    first = today.replace(day=1)
+    return (first.year - 1, 12) if first.month == 1 else (first.year, first.month - 1)
+
+
+def _month_bounds(year, month):
+    last_day = calendar.monthrange(year, month)[1]
+    start = timezone.make_aware(datetime(year, month, 1))
+    end = timezone.make_aware(
+        datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    )
+    return date(year, month, 1), date(year, month, last_day), start, end
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def generate_monthly_reports(year, month, groups=None, chunk_size=1000):
+    """
+    توليد/تحديث MonthlyReport لشهر كامل بكويريز تجميعية (مجمّعة حسب الطالب):
+      - نسبة الحضور من AttendanceDailyRollup: (حاضر + متأخر) / الإجمالي.
+      - متوسط درجات الواجبات المصحّحة للواجبات اللي اتسندت في الشهر.
+    groups (QuerySet مجموعات) بيحدّد الطلاب بس؛ الأرقام محسوبة على كل مجموعات
+    الطالب، فالتشغيل لمدرّس/مجموعة بيطلع نفس النتيجة وآمن يتعاد في أي وقت.
+    الطالب اللي ملوش حضور ولا درجات في الشهر بيتخطّى.
+    يرجّع (created, updated, skipped).
+    """
+    enrollments = Enrollment.objects.filter(is_active=True)
+    if groups is not None:
+        enrollments = enrollments.filter(group__in=groups)
+    student_ids = sorted(
+        set(enrollments.order_by().values_list("student_id", flat=True))
+    )
+
+    day_from, day_to, start, end = _month_bounds(year, month)
+    created = updated = skipped = 0
+    for ids in _chunks(student_ids, chunk_size):
+        attendance = {
+            r["student_id"]: pct(r["attended"], r["total"])
+            for r in AttendanceDailyRollup.objects.filter(
+                student_id__in=ids, date__range=(day_from, day_to)
+            )
+            .values("student_id")
+            .annotate(attended=Sum(F("present") + F("late")), total=Sum("total"))
+            .order_by()
+            if r["total"]
+        }
+        homework = dict(
+            HomeworkSubmission.objects.filter(
+                student_id__in=ids,
+                grade__isnull=False,
+                assignment__assigned_at__gte=start,
+                assignment__assigned_at__lt=end,
+            )
+            .values("student_id")
+            .annotate(avg=Avg("grade"))
+            .order_by()
+            .values_list("student_id", "avg")
+        )
+        # student_id → pk للتقارير الموجودة (الـ PDF المتكاش متخزّن بالـ pk)
+        existing = dict(
+            MonthlyReport.objects.filter(
+                student_id__in=ids, year=year, month=month
+            ).values_list("student_id", "id")
+        )
+
+        rows = []
+        upserted = []
+        for sid in ids:
+            if sid not in attendance and sid not in homework:
+                skipped += 1
+                continue
+            avg = homework.get(sid)
+            rows.append(
+                MonthlyReport(
+                    student_id=sid,
+                    year=year,
+                    month=month,
+                    attendance_pct=Decimal(str(attendance.get(sid, 0))),
+                    avg_homework_score=(
+                        None if avg is None else Decimal(avg).quantize(Decimal("0.01"))
+                    ),
+                )
+            )
+            if sid in existing:
+                updated += 1
+                upserted.append(existing[sid])
+            else:
+                created += 1
+
+        if rows:
+            with transaction.atomic():
+                MonthlyReport.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=["student", "year", "month"],
+                    update_fields=COMPUTED_FIELDS,
+                )
+                # bulk_create ما بيطلق post_save (اللي بيمسح كاش الـ PDF)، والبصمة
+                # اتغيّرت فالملفات القديمة هتفضل يتيمة على الديسك
+                transaction.on_commit(
+                    lambda pks=upserted: [purge_pdf_cache("report", pk) for pk in pks]
+                )
+    return created, updated, skipped
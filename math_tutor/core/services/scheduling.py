@@ -1,8 +1,14 @@
 # core/services/scheduling.py
+from collections import defaultdict
 from datetime import timedelta
 from django.utils import timezone
 from django.db import transaction
-from core.models import WeeklyScheduleBlock, ClassSession, Group
+from core.models import WeeklyScheduleBlock, ClassSession, Enrollment, Group
+from core.services import fragment_cache
+from core.services.dashboard import invalidate_teacher_snapshots
+
+# حجم الدفعة في bulk_create (يحمي من حدود عدد الباراميترات في SQLite)
+BULK_CHUNK_SIZE = 500
 
 
 def _daterange(start_date, end_date):
@@ -12,60 +18,101 @@ def _daterange(start_date, end_date):
         cur += timedelta(days=1)
 
 
-def generate_sessions_for_range(start_date, end_date, teacher=None):
+def _candidate_sessions(blocks, start_date, end_date):
     """
-    يولّد ClassSession من WeeklyScheduleBlock ضمن مدى تواريخ محدد.
-    - يحترم academic_year (ضمن المدة ومفعّل).
-    - يتجنب التكرار (unique_together على group/date/start_time).
-    - ينسخ is_online/location/meeting_link من البلوك.
-    - لو teacher محدد: يفلتر على مجموعات هذا المدرّس فقط.
-    يرجّع عدد الحصص المنشأة.
+    يبني كل الحصص المرشّحة في الذاكرة.
+    البلوكات متجمّعة حسب اليوم، فكل يوم يمرّ فقط على بلوكاته.
+    weekday في الموديل: 1=Mon..7=Sun = isoweekday() في بايثون.
     """
-    created_count = 0
-    # weekday: 1=Mon..7=Sun في الموديل، و weekday() في بايثون: Mon=0..Sun=6
-    weekday_map = {0: 1, 1: 2, 2: 3, 3: 4, 4: 5, 5: 6, 6: 7}
-
-    # فلترة المجموعات (اختياريًا على المدرّس)
-    groups_qs = Group.objects.all()
-    if teacher is not None:
-        groups_qs = groups_qs.filter(teacher=teacher)
-
-    # نحضّر بلوكات الجداول لهذه المجموعات فقط
-    blocks = WeeklyScheduleBlock.objects.filter(group__in=groups_qs).select_related(
-        "group", "group__academic_year"
-    )
+    by_weekday = defaultdict(list)
+    for b in blocks:
+        by_weekday[b.weekday].append(b)
 
-    # نشتغل على كل يوم ونسقطه على البلوكات المطابقة
     for d in _daterange(start_date, end_date):
-        weekday_val = weekday_map[d.weekday()]
-
-        # بلوكات نفس اليوم
-        day_blocks = [b for b in blocks if b.weekday == weekday_val]
-
-        for b in day_blocks:
+        for b in by_weekday.get(d.isoweekday(), ()):
             ay = b.group.academic_year
             # تحقّق أن التاريخ داخل السنة ومفعّلة
             if not ay.is_active or not (ay.start_date <= d <= ay.end_date):
                 continue
+            session = ClassSession(
+                group_id=b.group_id,
+                teacher_id=b.group.teacher_id,
+                subject_id=b.group.subject_id,
+                date=d,
+                start_time=b.start_time,
+                end_time=b.end_time,
+                is_online=b.is_online,
+                meeting_link=b.meeting_link,
+                topic="",  # يقدر يضيف لاحقًا
+                notes="",
+            )
+            # bulk_create ما بينادي save()، فنحسب starts_at/ends_at هنا
+            session.sync_bounds()
+            yield session
 
-            defaults = {
-                "teacher": b.group.teacher,
-                "start_time": b.start_time,
-                "end_time": b.end_time,
-                "is_online": b.is_online,
-                "meeting_link": b.meeting_link,
-                "topic": "",  # يقدر يضيف لاحقًا
-                "notes": "",
-            }
-            # إنشاء أو تخطّي إن موجود
-            with transaction.atomic():
-                obj, created = ClassSession.objects.get_or_create(
-                    group=b.group, date=d, start_time=b.start_time, defaults=defaults
-                )
-            if created:
-                created_count += 1
 
-    return created_count
+def generate_sessions_for_groups(groups, start_date, end_date):
+    """
+    محرّك التوليد المشترك (لوحة المدرّس، الأمر، والأدمن).
+    - groups: QuerySet للمجموعات المطلوبة.
+    - يحترم academic_year (ضمن المدة ومفعّل).
+    - يتجنب التكرار (unique_together على group/date/start_time).
+    - ينسخ is_online/meeting_link من البلوك ومادة المجموعة.
+    يرجّع (created, skipped) — skipped = حصص مرشّحة كانت موجودة مسبقًا.
+
+    عدد ثابت من الكويريز مهما كان عدد المجموعات: كويري للبلوكات +
+    كويري للمفاتيح الموجودة + bulk_create على دفعات.
+    """
+    blocks = list(
+        WeeklyScheduleBlock.objects.filter(group__in=groups).select_related(
+            "group", "group__academic_year"
+        )
+    )
+    if not blocks:
+        return 0, 0
+
+    group_ids = {b.group_id for b in blocks}
+    existing = set(
+        ClassSession.objects.filter(
+            group_id__in=group_ids, date__range=(start_date, end_date)
+        ).values_list("group_id", "date", "start_time")
+    )
+
+    to_create = []
+    skipped = 0
+    for s in _candidate_sessions(blocks, start_date, end_date):
+        key = (s.group_id, s.date, s.start_time)
+        if key in existing:
+            skipped += 1
+            continue
+        existing.add(key)
+        to_create.append(s)
+
+    if to_create:
+        # ignore_conflicts: لو عملية موازية أنشأت نفس الحصة بين القراءة والكتابة
+        with transaction.atomic():
+            ClassSession.objects.bulk_create(
+                to_create, batch_size=BULK_CHUNK_SIZE, ignore_conflicts=True
+            )
+        # bulk_create ما بيطلق سيجنالز
+        teacher_ids = {s.teacher_id for s in to_create}
+        invalidate_teacher_snapshots(teacher_id__in=teacher_ids)
+        fragment_cache.bump(fragment_cache.TEACHER_GROUPS, teacher_ids)
+    return len(to_create), skipped
+
+
+def generate_sessions_for_range(start_date, end_date, teacher=None):
+    """
+    يولّد ClassSession من WeeklyScheduleBlock ضمن مدى تواريخ محدد.
+    - لو teacher محدد: يفلتر على مجموعات هذا المدرّس فقط.
+    يرجّع عدد الحصص المنشأة.
+    """
+    # فلترة المجموعات (اختياريًا على المدرّس)
+    groups_qs = Group.objects.all()
+    if teacher is not None:
+        groups_qs = groups_qs.filter(teacher=teacher)
+    created, _skipped = generate_sessions_for_groups(groups_qs, start_date, end_date)
+    return created
 
 
 def generate_next_7_days(teacher=None, from_today=False):
@@ -77,3 +124,50 @@ def generate_next_7_days(teacher=None, from_today=False):
     start = today if from_today else (today + timedelta(days=1))
     end = start + timedelta(days=6)
     return generate_sessions_for_range(start, end, teacher=teacher)
+
+
+# ===== الجدول القادم (لوحة وليّ الأمر) =====
+
+
+def group_children_map(student_ids):
+    """
+    {group_id: [{"id", "name"}]} من التسجيلات النشطة بس — كويري واحد.
+    بيتشارك بين تبويبات وليّ الأمر (الحصص القادمة والواجبات).
+    """
+    rows = (
+        Enrollment.objects.filter(student_id__in=student_ids, is_active=True)
+        .order_by("student__first_name", "student__last_name")
+        .values("group_id", "student_id", "student__first_name", "student__last_name")
+    )
+    children = {}
+    for r in rows:
+        children.setdefault(r["group_id"], []).append(
+            {
+                "id": r["student_id"],
+                "name": f'{r["student__first_name"]} {r["student__last_name"]}'.strip(),
+            }
+        )
+    return children
+
+
+def upcoming_sessions(group_ids, today=None, days=7):
+    """
+    حصص المجموعات من النهارده لحد days قدام — صف لكل حصة، من غير join على
+    التسجيلات (فمن غير تكرار لكل طفل ولا DISTINCT). الأبناء بيتضافوا في
+    الذاكرة بـ attach_children بعد التقطيع.
+    """
+    today = today or timezone.localdate()
+    return (
+        ClassSession.objects.filter(
+            group_id__in=group_ids, date__range=(today, today + timedelta(days=days))
+        )
+        .select_related("group", "subject", "group__subject")
+        .defer("notes", "meeting_link")
+    )
+
+
+def attach_children(sessions, children_map):
+    """يحط s.children (من group_children_map) على كل حصة في الصفحة."""
+    for s in sessions:
+        s.children = children_map.get(s.group_id, [])
+    return sessions
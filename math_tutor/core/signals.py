@@ -22,7 +22,8 @@ from .utils.thumbs import make_image_thumb, make_pdf_thumb
 from .utils.files import is_image, is_pdf
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Payment
+from .models import Payment, Invoice, MonthlyReport
+from .services.pdf import purge_pdf_cache
 
 @receiver(pre_save, sender=Resource)
 def resource_opt(sender, instance, **kwargs):
@@ -53,7 +54,241 @@ def resource_opt(sender, instance, **kwargs):
         optimize_image(f)
 
 
-@receiver([post_save, post_delete], sender=Payment)
+# ===== Invoice.paid_total + الحالة =====
+from .services.billing import apply_paid_delta
+
+
+@receiver(pre_save, sender=Payment)
+def _payment_remember_old(sender, instance: Payment, **kwargs):
+    instance._paid_old = None
+    if instance.pk:
+        instance._paid_old = (
+            Payment.objects.filter(pk=instance.pk)
+            .values_list("invoice_id", "amount_egp")
+            .first()
+        )
+
+
+def _refresh_invoice_status(instance: Payment, invoice_ids):
+    for invoice_id in invoice_ids:
+        try:
+            inv = (
+                instance.invoice
+                if invoice_id == instance.invoice_id
+                else Invoice.objects.get(pk=invoice_id)
+            )
+            inv.refresh_from_db(fields=["paid_total"])
+        except Invoice.DoesNotExist:
+            continue  # الفاتورة نفسها بتتمسح (cascade)
+        inv.refresh_status(commit=True)
+
+
+@receiver(post_save, sender=Payment)
 def _recalc_invoice_status(sender, instance: Payment, **kwargs):
-    inv = instance.invoice
-    inv.refresh_status(commit=True)
+    old = getattr(instance, "_paid_old", None)
+    touched = {instance.invoice_id}
+    if old:
+        old_invoice_id, old_amount = old
+        touched.add(old_invoice_id)
+        if old_invoice_id == instance.invoice_id:
+            apply_paid_delta(instance.invoice_id, instance.amount_egp - old_amount)
+        else:
+            apply_paid_delta(old_invoice_id, -old_amount)
+            apply_paid_delta(instance.invoice_id, instance.amount_egp)
+    else:
+        apply_paid_delta(instance.invoice_id, instance.amount_egp)
+    _refresh_invoice_status(instance, touched)
+
+
+@receiver(post_delete, sender=Payment)
+def _recalc_invoice_status_deleted(sender, instance: Payment, **kwargs):
+    apply_paid_delta(instance.invoice_id, -instance.amount_egp)
+    _refresh_invoice_status(instance, {instance.invoice_id})
+
+
+# ===== لقطة لوحة المدرّس: علّمها stale عند أي تغيير يأثّر على العدّادات =====
+from .models import Group, Enrollment, ClassSession, Attendance, Subject, AcademicYear
+from .services.dashboard import invalidate_teacher_snapshots
+
+
+@receiver([post_save, post_delete], sender=Group)
+def _snapshot_group_changed(sender, instance: Group, **kwargs):
+    invalidate_teacher_snapshots(teacher_id=instance.teacher_id)
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=ClassSession)
+@receiver([post_save, post_delete], sender=Invoice)
+def _snapshot_group_row_changed(sender, instance, **kwargs):
+    invalidate_teacher_snapshots(teacher__teachergroups=instance.group_id)
+
+
+@receiver([post_save, post_delete], sender=Payment)
+def _snapshot_payment_changed(sender, instance: Payment, **kwargs):
+    invalidate_teacher_snapshots(teacher__teachergroups__invoices=instance.invoice_id)
+
+
+@receiver([post_save, post_delete], sender=Attendance)
+def _snapshot_attendance_changed(sender, instance: Attendance, **kwargs):
+    invalidate_teacher_snapshots(teacher__teachergroups__sessions=instance.session_id)
+
+
+# ===== تجميعات الحضور اليومية =====
+from .services.attendance import refresh_rollup, refresh_rollups_for_pairs
+
+
+def _attendance_key(student_id, session_id):
+    row = (
+        ClassSession.objects.filter(id=session_id).values_list("group_id", "date").first()
+    )
+    return (student_id, *row) if row else None
+
+
+@receiver(pre_save, sender=Attendance)
+def _rollup_remember_old_key(sender, instance: Attendance, **kwargs):
+    instance._rollup_old_key = None
+    if instance.pk:
+        old = (
+            Attendance.objects.filter(pk=instance.pk)
+            .values_list("student_id", "session__group_id", "session__date")
+            .first()
+        )
+        instance._rollup_old_key = old
+
+
+@receiver([post_save, post_delete], sender=Attendance)
+def _rollup_attendance_changed(sender, instance: Attendance, **kwargs):
+    new_key = _attendance_key(instance.student_id, instance.session_id)
+    if new_key:
+        refresh_rollup(*new_key)
+    old_key = getattr(instance, "_rollup_old_key", None)
+    if old_key and old_key != new_key:
+        refresh_rollup(*old_key)
+
+
+@receiver(pre_save, sender=ClassSession)
+def _rollup_remember_session_pair(sender, instance: ClassSession, **kwargs):
+    instance._rollup_old_pair = None
+    if instance.pk:
+        instance._rollup_old_pair = (
+            ClassSession.objects.filter(pk=instance.pk)
+            .values_list("group_id", "date")
+            .first()
+        )
+
+
+@receiver(post_save, sender=ClassSession)
+def _rollup_session_moved(sender, instance: ClassSession, created, **kwargs):
+    old_pair = getattr(instance, "_rollup_old_pair", None)
+    new_pair = (instance.group_id, instance.date)
+    if old_pair and tuple(old_pair) != new_pair:
+        refresh_rollups_for_pairs([tuple(old_pair), new_pair])
+
+
+# ===== كاش أجزاء اللوحات: زوّد نسخة المالك (وليّ أمر/طالب/مدرّس) عند أي تغيير =====
+from .services import fragment_cache
+
+
+@receiver([post_save, post_delete], sender=Group)
+def _fragment_group_changed(sender, instance: Group, created=False, **kwargs):
+    fragment_cache.bump(fragment_cache.TEACHER_GROUPS, [instance.teacher_id])
+    if not created:
+        # اسم المجموعة بيظهر في جدول حضور الطالب المتكاش (تعديل نادر)
+        fragment_cache.bump_all(fragment_cache.STUDENT_ATTENDANCE)
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=ClassSession)
+def _fragment_group_row_changed(sender, instance, **kwargs):
+    # الفورمات غالبًا بتحط المجموعة على الـ instance، فمن غير كويري
+    if sender.group.is_cached(instance):
+        teacher_ids = [instance.group.teacher_id] if instance.group else []
+    else:
+        teacher_ids = Group.objects.filter(pk=instance.group_id).values_list(
+            "teacher_id", flat=True
+        )
+    fragment_cache.bump(fragment_cache.TEACHER_GROUPS, teacher_ids)
+
+
+@receiver(post_save, sender=ClassSession)
+def _fragment_session_changed(sender, instance: ClassSession, created, **kwargs):
+    # ميعاد الحصة بيظهر في جدول حضور الطالب المتكاش (الحذف بيطلق سيجنالز Attendance)
+    if not created:
+        fragment_cache.bump(
+            fragment_cache.STUDENT_ATTENDANCE,
+            Attendance.objects.filter(session=instance).values_list("student_id", flat=True),
+        )
+
+
+@receiver(pre_save, sender=Invoice)
+def _fragment_invoice_remember_parent(sender, instance: Invoice, **kwargs):
+    instance._billing_old_parent = None
+    if instance.pk:
+        instance._billing_old_parent = (
+            Invoice.objects.filter(pk=instance.pk).values_list("parent_id", flat=True).first()
+        )
+
+
+@receiver([post_save, post_delete], sender=Invoice)
+def _fragment_invoice_changed(sender, instance: Invoice, **kwargs):
+    # لو الفاتورة اتنقلت لوليّ أمر تاني، ملخّص القديم كمان اتغيّر
+    old_parent = getattr(instance, "_billing_old_parent", None)
+    fragment_cache.bump(fragment_cache.PARENT_BILLING, [instance.parent_id, old_parent])
+
+
+@receiver([post_save, post_delete], sender=Subject)
+@receiver([post_save, post_delete], sender=AcademicYear)
+def _fragment_group_label_changed(sender, instance, created=False, **kwargs):
+    # اسم المادة/السنة بيظهر في تبويب مجموعات المدرّس المتكاش
+    if created:
+        return
+    field = "subject" if sender is Subject else "academic_year"
+    teacher_ids = Group.objects.filter(**{field: instance.pk}).values_list("teacher_id", flat=True)
+    fragment_cache.bump(fragment_cache.TEACHER_GROUPS, teacher_ids)
+
+
+@receiver([post_save, post_delete], sender=Payment)
+def _fragment_payment_changed(sender, instance: Payment, **kwargs):
+    old = getattr(instance, "_paid_old", None)
+    invoice_ids = {instance.invoice_id, old[0] if old else None}
+    parent_ids = Invoice.objects.filter(pk__in=invoice_ids).values_list(
+        "parent_id", flat=True
+    )
+    fragment_cache.bump(fragment_cache.PARENT_BILLING, parent_ids)
+
+
+@receiver([post_save, post_delete], sender=Attendance)
+def _fragment_attendance_changed(sender, instance: Attendance, **kwargs):
+    old_key = getattr(instance, "_rollup_old_key", None)
+    fragment_cache.bump(
+        fragment_cache.STUDENT_ATTENDANCE,
+        [instance.student_id, old_key[0] if old_key else None],
+    )
+
+
+# ===== كاش PDF: امسح النسخ القديمة عند تغيّر المصدر =====
+
+@receiver([post_save, post_delete], sender=Invoice)
+def _pdf_invoice_changed(sender, instance: Invoice, **kwargs):
+    # الـ pk لازم يتقري دلوقتي: بعد الحذف الـ Collector بيخليه None قبل الـ commit
+    pk = instance.pk
+    transaction.on_commit(lambda: purge_pdf_cache("invoice", pk))
+
+
+@receiver([post_save, post_delete], sender=Payment)
+def _pdf_payment_changed(sender, instance: Payment, **kwargs):
+    # لو الدفعة اتنقلت لفاتورة تانية، نسخة الفاتورة القديمة كمان بقت قديمة
+    old = getattr(instance, "_paid_old", None)
+    invoice_ids = {instance.invoice_id, old[0] if old else None} - {None}
+
+    def purge():
+        for invoice_id in invoice_ids:
+            purge_pdf_cache("invoice", invoice_id)
+
+    transaction.on_commit(purge)
+
+
+@receiver([post_save, post_delete], sender=MonthlyReport)
+def _pdf_report_changed(sender, instance: MonthlyReport, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: purge_pdf_cache("report", pk))
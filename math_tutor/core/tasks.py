@@ -1,12 +1,12 @@
 from datetime import timedelta
 from django.utils import timezone
 from celery import shared_task
-from django.db.models import Q
-from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
 
-from .models import ClassSession, NotificationLog, Assignment, Invoice
-from .services.notify import notify_assignment_created, notify_session_reminder
+from .models import ClassSession, Assignment
+from .services.notify import (
+    notify_assignment_created,
+    notify_overdue_invoices_digest,
+)
 
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=5)
@@ -16,18 +16,30 @@ def send_assignment_created(self, assignment_id: int):
 
 
 # tasks.py
-from datetime import datetime, timedelta
-from django.db.models import Q
-from django.utils import timezone
-from celery import shared_task
 from django.core.cache import cache  # لقفل بسيط (اختياري)
+from django.core.mail import get_connection
 from core.models import ClassSession
-from core.services.notify import notify_session_reminder
+from core.services.notify import notify_session_reminders_batch
+
+
+def _window_sessions(window_minutes=120, teacher_id=None):
+    """كل الحصص اللي هتبدأ خلال النافذة — range scan واحد على starts_at المفهرس."""
+    now = timezone.now()
+    qs = (
+        ClassSession.objects.select_related("group", "teacher", "subject", "group__subject")
+        .filter(starts_at__range=(now, now + timedelta(minutes=window_minutes)))
+        .order_by("starts_at")
+    )
+    if teacher_id:
+        qs = qs.filter(group__teacher_id=teacher_id)
+    return list(qs)
 
 
 def _send_window_logic(window_minutes=120, teacher_id=None):
     """
-    نفس منطقك بالضبط، مع إضافة اختيار teacher_id لتقييد الحصص.
+    تذكيرات النافذة كدفعة واحدة (مع اختيار teacher_id لتقييد الحصص):
+    كل الحصص ← أولياء الأمور بكويري واحد ← NotificationLog بكويري واحد ←
+    اتصال بريد واحد للدفعة كلها.
     """
     lock_key = "send_session_reminders_window_lock"
     # قفل بسيط يمنع التشغيل المتوازي (مثلاً نصف زمن النافذة أو 60ث على الأقل)
@@ -35,51 +47,12 @@ def _send_window_logic(window_minutes=120, teacher_id=None):
     if not got_lock:
         return 0  # تنفيذ جارٍ بالفعل
 
-    sent_total = 0
     try:
-        from core.services.notify import (
-            notify_session_reminder,
-        )  # import محلي لتفادي الدوران
-
-        tz = timezone.get_current_timezone()
-        now = timezone.now()
-        window_end = now + timedelta(minutes=window_minutes)
-
-        start_date = timezone.localdate(now)
-        end_date = timezone.localdate(window_end)
-        start_time = timezone.localtime(now).timetz()
-        end_time = timezone.localtime(window_end).timetz()
-
-        cond_today = Q(date=start_date, start_time__gte=start_time)
-        cond_between = Q(date__gt=start_date, date__lt=end_date)
-        cond_endday = Q(date=end_date, start_time__lte=end_time)
-
-        if start_date == end_date:
-            q_date = Q(
-                date=start_date, start_time__gte=start_time, start_time__lte=end_time
-            )
-        else:
-            q_date = cond_today | cond_between | cond_endday
-
-        qs = (
-            ClassSession.objects.select_related("group", "teacher", "subject")
-            .filter(q_date)
-            .order_by("date", "start_time")
-        )
-        if teacher_id:
-            qs = qs.filter(group__teacher_id=teacher_id)
-
-        def start_dt(sess: ClassSession):
-            naive = datetime.combine(sess.date, sess.start_time)
-            return timezone.make_aware(naive, tz)
-
-        sessions = [s for s in qs if now <= start_dt(s) <= window_end]
-
-        # الإرسال (notify_session_reminder نفسه مسؤول يمنع التكرار بـ NotificationLog)
-        for s in sessions:
-            sent_total += notify_session_reminder(s) or 0
-
-        return sent_total
+        sessions = _window_sessions(window_minutes, teacher_id=teacher_id)
+        if not sessions:
+            return 0
+        with get_connection(fail_silently=True) as connection:
+            return notify_session_reminders_batch(sessions, connection=connection)
     finally:
         cache.delete(lock_key)
 
@@ -111,64 +84,10 @@ def send_session_reminders_window(self, window_minutes=120):
     """
     ابعت تذكيرات للحصص اللي هتبدأ خلال النافذة الزمنية القادمة (افتراضي: 120 دقيقة).
     - يدعم عبور منتصف الليل.
-    - يقلل نتائج DB قدر الإمكان.
+    - دفعة واحدة لكل الحصص (نفس مسار _send_window_logic).
     - قفل بسيط لمنع التنفيذ المتوازي.
     """
-    # قفل بسيط لمدة النافذة + هامش صغير (ثواني)
-    lock_key = "send_session_reminders_window_lock"
-    got_lock = cache.add(lock_key, "1", timeout=window_minutes * 60 // 2 or 60)
-    if not got_lock:
-        # في تنفيذ آخر جارٍ — تخطَّ
-        return
-
-    try:
-        tz = timezone.get_current_timezone()
-        now = timezone.now()
-        window_end = now + timedelta(minutes=window_minutes)
-
-        # هنحوّل النافذة لثلاث حالات لتغطية عبور اليوم:
-        start_date = timezone.localdate(now)
-        end_date = timezone.localdate(window_end)
-        start_time = timezone.localtime(now).timetz()
-        end_time = timezone.localtime(window_end).timetz()
-
-        # فلترة أدق:
-        # 1) نفس يوم البداية: وقت الحصة >= الآن
-        cond_today = Q(date=start_date, start_time__gte=start_time)
-        # 2) الأيام الوسط (لو النافذة عدّت يوم): أي تاريخ ما بين اليومين
-        cond_between = Q(date__gt=start_date, date__lt=end_date)
-        # 3) يوم النهاية (لو مختلف): وقت الحصة <= نهاية النافذة
-        cond_endday = Q(date=end_date, start_time__lte=end_time)
-
-        if start_date == end_date:
-            # النافذة داخل نفس اليوم
-            q_date = Q(
-                date=start_date, start_time__gte=start_time, start_time__lte=end_time
-            )
-        else:
-            # النافذة عابرة لمنتصف الليل
-            q_date = cond_today | cond_between | cond_endday
-
-        qs = (
-            ClassSession.objects.select_related("group", "teacher", "subject")
-            .filter(q_date)
-            .order_by("date", "start_time")
-        )
-
-        # تحقّق دقيق نهائي لبداية الحصة داخل النافذة (بالـ datetime aware)
-        def start_dt(sess: ClassSession):
-            naive = datetime.combine(sess.date, sess.start_time)
-            return timezone.make_aware(naive, tz)
-
-        sessions = [s for s in qs if now <= start_dt(s) <= window_end]
-
-        # إبعت لكل جلسة (يعتمد على notify_session_reminder إنه يمنع التكرار عبر NotificationLog)
-        for s in sessions:
-            notify_session_reminder(s)
-
-    finally:
-        # فك القفل
-        cache.delete(lock_key)
+    return _send_window_logic(window_minutes=window_minutes)
 
 
 @shared_task
@@ -181,18 +100,86 @@ def cleanup_expired_qr():
     )
 
 
+@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
+def refresh_invoice_statuses_nightly(self):
+    """كنس ليلي: ينقل الفواتير اللي عدّى ميعادها لـ OVERDUE (وأي حالة غلط) بـ UPDATEs جماعية."""
+    from .services.billing import refresh_invoice_statuses
+
+    changed = refresh_invoice_statuses()
+    return {str(k): v for k, v in changed.items()}
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
+def issue_monthly_invoices_task(
+    self, year, month, amount, teacher_id=None, group_ids=None, due_date=None
+):
+    """
+    إصدار فواتير شهر كامل في الخلفية (amount/due_date كنص عشان JSON serializer).
+    بدون teacher_id/group_ids = كل المجموعات.
+    """
+    from datetime import date
+    from decimal import Decimal
+    from .models import Group
+    from .services.billing import issue_monthly_invoices
+
+    groups = Group.objects.all()
+    if teacher_id:
+        groups = groups.filter(teacher_id=teacher_id)
+    if group_ids:
+        groups = groups.filter(id__in=group_ids)
+    created, skipped = issue_monthly_invoices(
+        groups,
+        year,
+        month,
+        Decimal(str(amount)),
+        due_date=date.fromisoformat(due_date) if due_date else None,
+    )
+    return {"created": created, "skipped": skipped}
+
+
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True)
 def remind_overdue_invoices(self):
-    today = timezone.localdate()
-    overdue = Invoice.objects.filter(due_date__lt=today).exclude(status="PAID")
-    for inv in overdue:
-        ctx = {"invoice": inv}
-        html = render_to_string("emails/invoice_overdue.html", ctx)
-        msg = EmailMessage(
-            subject=f"تذكير فاتورة {inv.month}/{inv.year}",
-            body=html,
-            to=[inv.parent.user.email] if inv.parent.user.email else [],
-        )
-        msg.content_subtype = "html"
-        if msg.to:
-            msg.send(fail_silently=True)
+    """
+    ملخص يومي لأولياء الأمور بفواتيرهم المتأخرة (رسالة واحدة لكل وليّ أمر).
+    آمن لإعادة المحاولة: NotificationLog بيمنع التكرار ويطبّق الـ rate limit.
+    """
+    return notify_overdue_invoices_digest()
+
+
+@shared_task(bind=True, ignore_result=True, acks_late=True)
+def render_pdf_job(self, job_id):
+    """توليد ملف PdfJob في الخلفية (الحالة والخطأ بيتسجّلوا على المهمة نفسها)."""
+    from .services.pdf_jobs import run_pdf_job
+
+    return run_pdf_job(job_id)
+
+
+@shared_task(ignore_result=True)
+def cleanup_pdf_jobs():
+    from .services.pdf_jobs import cleanup_pdf_jobs as _cleanup
+
+    return _cleanup()
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
+def generate_monthly_reports_task(
+    self, year=None, month=None, teacher_id=None, group_ids=None
+):
+    """
+    توليد التقارير الشهرية في الخلفية (افتراضي: الشهر اللي فات لكل الطلاب).
+    آمنة لإعادة المحاولة: upsert على (student, year, month).
+    """
+    from .models import Group
+    from .services.reports import generate_monthly_reports, previous_month
+
+    if not (year and month):
+        year, month = previous_month()
+    groups = None
+    if teacher_id or group_ids:
+        groups = Group.objects.all()
+        if teacher_id:
+            groups = groups.filter(teacher_id=teacher_id)
+        if group_ids:
+            groups = groups.filter(id__in=group_ids)
+    created, updated, skipped = generate_monthly_reports(year, month, groups=groups)
+    return {"created": created, "updated": updated, "skipped": skipped}
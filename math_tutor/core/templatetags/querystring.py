@@ -5,12 +5,14 @@ register = template.Library()
 
 
 @register.simple_tag(takes_context=True)
-def url_replace(context, **kwargs):
+def url_replace(context, *args, **kwargs):
     """
     يدمج الباراميترات الحالية من request.GET مع أي تحديثات جديدة (مثل page)
     ويرجع querystring جاهز (بدون ?).
     الاستخدام: <a href="?{% url_replace page=2 %}">...</a>
     أو: <a href="?{% url_replace request=request page=2 %}">...</a>
+    ولو اسم الباراميتر متغيّر: {% url_replace page_param page_obj.next_cursor %}
+    (أزواج اسم/قيمة positional).
     """
     request = context.get("request")
     if request is None:
@@ -21,8 +23,11 @@ def url_replace(context, **kwargs):
     if request is not None:
         params.update(request.GET.dict())
 
+    updates = dict(zip(args[::2], args[1::2]))
+    updates.update(kwargs)
+
     # احذف المفاتيح التي قيمتها None لتُزال من الكويري
-    for k, v in kwargs.items():
+    for k, v in updates.items():
         if v is None:
             params.pop(k, None)
         else:
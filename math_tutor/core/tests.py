@@ -1,3 +1,279 @@
-from django.test import TestCase
+from datetime import time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from .models import (
+    AcademicYear,
+    Attendance,
+    ClassSession,
+    Enrollment,
+    Group,
+    Invoice,
+    ParentProfile,
+    Payment,
+    Student,
+    Subject,
+    TeacherProfile,
+)
+from .services import fragment_cache
+from .services.billing import parent_billing_summary
+from .utiils import _encode_cursor, cursor_paginate
+
+
+def make_world():
+    """مدرّس + وليّ أمر + مجموعة وطالبين مسجّلين (أقل داتا تكفي الاختبارات)."""
+    today = timezone.localdate()
+    teacher = TeacherProfile.objects.create(user=User.objects.create_user("t"))
+    parent = ParentProfile.objects.create(user=User.objects.create_user("p"))
+    subject = Subject.objects.create(name="Math")
+    year = AcademicYear.objects.create(
+        name="y", start_date=today - timedelta(days=100), end_date=today + timedelta(days=200)
+    )
+    group = Group.objects.create(
+        academic_year=year, name="g", grade="G1", teacher=teacher, subject=subject
+    )
+    students = [
+        Student.objects.create(first_name=f"s{i}", last_name=last, parent=parent)
+        for i, last in enumerate(["b", "a", "b", "c"])
+    ]
+    for s in students:
+        Enrollment.objects.create(student=s, group=group)
+    return teacher, parent, group, students
+
+
+def invoice(parent, student, group, month, amount="300", **extra):
+    return Invoice.objects.create(
+        parent=parent,
+        student=student,
+        group=group,
+        year=2026,
+        month=month,
+        amount_egp=Decimal(amount),
+        **extra,
+    )
+
+
+class CursorPaginateTests(TestCase):
+    # نفس ترتيب تبويب فواتير المدرّس: اتجاهات مختلطة + related + id في الآخر
+    ORDERING = ("-status", "student__last_name", "id")
+
+    @classmethod
+    def setUpTestData(cls):
+        _teacher, parent, group, students = make_world()
+        statuses = ["DUE", "OVERDUE", "PAID", "DUE", "OVERDUE", "DUE", "PAID"]
+        for month, status in enumerate(statuses, start=1):
+            invoice(parent, students[month % len(students)], group, month, status=status)
+        cls.expected = list(
+            Invoice.objects.order_by(*cls.ORDERING).values_list("id", flat=True)
+        )
+
+    def page(self, cursor=None, per_page=3):
+        params = {"cursor": cursor} if cursor is not None else {}
+        request = RequestFactory().get("/", params)
+        qs = Invoice.objects.select_related("student")
+        return cursor_paginate(request, qs, self.ORDERING, per_page=per_page)
+
+    def ids(self, page):
+        return [inv.id for inv in page]
+
+    def test_forward_and_back_cover_every_row_once(self):
+        pages = [self.page()]
+        while pages[-1].has_next():
+            pages.append(self.page(pages[-1].next_cursor))
+        forward = [self.ids(p) for p in pages]
+        self.assertEqual(sum(forward, []), self.expected)
+
+        back = [pages[-1]]
+        while back[-1].has_previous():
+            back.append(self.page(back[-1].prev_cursor))
+        self.assertEqual([self.ids(p) for p in reversed(back)], forward)
+
+    def test_flags_at_both_ends(self):
+        first = self.page()
+        self.assertFalse(first.has_previous())
+        self.assertTrue(first.has_next())
+
+        last = self.page(per_page=len(self.expected) - 1)
+        last = self.page(last.next_cursor, per_page=len(self.expected) - 1)
+        self.assertEqual(self.ids(last), self.expected[-1:])
+        self.assertTrue(last.has_previous())
+        self.assertFalse(last.has_next())
+
+        # الرجوع للأول من الصفحة التانية
+        second = self.page(first.next_cursor)
+        again = self.page(second.prev_cursor)
+        self.assertEqual(self.ids(again), self.ids(first))
+        self.assertFalse(again.has_previous())
+
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        first = self.ids(self.page())
+        inv = Invoice.objects.select_related("student").first()
+        wrong_length = _encode_cursor("n", inv, ["status", "id"])
+        wrong_direction = _encode_cursor("x", inv, ["status", "student__last_name", "id"])
+        for token in ["", "not-base64!!", "e30", wrong_length, wrong_direction]:
+            with self.subTest(token=token):
+                page = self.page(token)
+                self.assertEqual(self.ids(page), first)
+                self.assertFalse(page.has_previous())
+
+
+class PaidTotalSyncTests(TestCase):
+    def setUp(self):
+        _teacher, self.parent, self.group, students = make_world()
+        self.inv_a = invoice(self.parent, students[0], self.group, 1)
+        self.inv_b = invoice(self.parent, students[1], self.group, 1)
+
+    def paid(self, inv):
+        inv.refresh_from_db()
+        return inv.paid_total
+
+    def test_create_edit_move_delete(self):
+        pay = Payment.objects.create(invoice=self.inv_a, amount_egp=Decimal("100"))
+        self.assertEqual(self.paid(self.inv_a), Decimal("100"))
+
+        pay.amount_egp = Decimal("300")
+        pay.save()
+        self.assertEqual(self.paid(self.inv_a), Decimal("300"))
+        self.assertEqual(self.inv_a.status, Invoice.Status.PAID)
+
+        pay.invoice = self.inv_b
+        pay.save()
+        self.assertEqual(self.paid(self.inv_a), Decimal("0"))
+        self.assertEqual(self.paid(self.inv_b), Decimal("300"))
+        self.assertEqual(self.inv_a.status, Invoice.Status.DUE)
+
+        pay.delete()
+        self.assertEqual(self.paid(self.inv_b), Decimal("0"))
+
+    def test_full_save_of_stale_instance_keeps_paid_total(self):
+        stale = Invoice.objects.get(pk=self.inv_a.pk)
+        Payment.objects.create(invoice=self.inv_a, amount_egp=Decimal("120"))
+        stale.notes = "تعديل"
+        stale.save()
+        self.assertEqual(self.paid(self.inv_a), Decimal("120"))
+        self.assertEqual(stale.paid_total, Decimal("120"))
+
+
+class ParentBillingSummaryTests(TestCase):
+    def test_canceled_and_overpaid_invoices(self):
+        _teacher, parent, group, students = make_world()
+        due = invoice(parent, students[0], group, 1)
+        invoice(
+            parent,
+            students[1],
+            group,
+            1,
+            amount="200",
+            status=Invoice.Status.OVERDUE,
+            due_date=timezone.localdate() - timedelta(days=5),
+        )
+        invoice(parent, students[2], group, 1, amount="500", status=Invoice.Status.CANCELED)
+        overpaid = invoice(parent, students[3], group, 1, amount="100")
+        Payment.objects.create(invoice=due, amount_egp=Decimal("100"))
+        Payment.objects.create(invoice=overpaid, amount_egp=Decimal("150"))
+
+        self.assertEqual(
+            parent_billing_summary(parent),
+            {
+                # 200 متبقي من المستحقة + 200 المتأخرة؛ الملغاة والمدفوعة زيادة برّه
+                "total_due": Decimal("400"),
+                "total_overdue": Decimal("200"),
+                "month_paid": Decimal("250"),
+                "open_count": 2,
+            },
+        )
+
+    def test_parent_without_invoices(self):
+        parent = ParentProfile.objects.create(user=User.objects.create_user("empty"))
+        summary = parent_billing_summary(parent)
+        self.assertEqual(summary["total_due"], Decimal("0"))
+        self.assertEqual(summary["open_count"], 0)
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return {"n": self.builds}
+
+    def get(self, section, owner):
+        return fragment_cache.get_or_build(section, owner, 1, self.build, "x")
+
+    def test_hit_after_miss_and_counters(self):
+        section = fragment_cache.PARENT_BILLING
+        self.assertEqual(self.get(section, 1), {"n": 1})
+        self.assertEqual(self.get(section, 1), {"n": 1})
+        self.assertEqual(self.builds, 1)
+        stats = fragment_cache.stats()[section]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_bump_invalidates_only_that_owner(self):
+        section = fragment_cache.STUDENT_ATTENDANCE
+        self.get(section, 1)
+        self.get(section, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            fragment_cache.bump(section, [1])
+        self.assertEqual(self.get(section, 1), {"n": 3})
+        self.assertEqual(self.get(section, 2), {"n": 2})
+
+    def test_bump_all_invalidates_section(self):
+        section = fragment_cache.TEACHER_GROUPS
+        self.get(section, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            fragment_cache.bump_all(section)
+        self.assertEqual(self.get(section, 1), {"n": 2})
+
+    def test_signals_bump_owners(self):
+        teacher, parent, group, students = make_world()
+        inv = invoice(parent, students[0], group, 1)
+        session = ClassSession.objects.create(
+            group=group,
+            teacher=teacher,
+            date=timezone.localdate(),
+            start_time=time(10),
+            end_time=time(11),
+        )
+        Attendance.objects.create(session=session, student=students[0], status="PRESENT")
+        cases = [
+            (fragment_cache.PARENT_BILLING, parent.id,
+             lambda: Payment.objects.create(invoice=inv, amount_egp=Decimal("10"))),
+            (fragment_cache.STUDENT_ATTENDANCE, students[0].id,
+             lambda: ClassSession.objects.filter(pk=session.pk).get().save()),
+            (fragment_cache.TEACHER_GROUPS, teacher.id,
+             lambda: Enrollment.objects.filter(student=students[1]).delete()),
+        ]
+        for section, owner, change in cases:
+            with self.subTest(section=section):
+                before = self.get(section, owner)
+                with self.captureOnCommitCallbacks(execute=True):
+                    change()
+                self.assertNotEqual(self.get(section, owner), before)
+
+    def test_moved_invoice_bumps_old_and_new_parent(self):
+        _teacher, parent, group, students = make_world()
+        other = ParentProfile.objects.create(user=User.objects.create_user("p2"))
+        inv = invoice(parent, students[0], group, 1)
+        before = [self.get(fragment_cache.PARENT_BILLING, p.id) for p in (parent, other)]
+        with self.captureOnCommitCallbacks(execute=True):
+            inv.parent = other
+            inv.save()
+        after = [self.get(fragment_cache.PARENT_BILLING, p.id) for p in (parent, other)]
+        self.assertNotEqual(after[0], before[0])
+        self.assertNotEqual(after[1], before[1])
+
+    def test_subject_and_year_rename_bump_teacher_groups(self):
+        teacher, _parent, group, _students = make_world()
+        for label in (group.subject, group.academic_year):
+            with self.subTest(model=type(label).__name__):
+                before = self.get(fragment_cache.TEACHER_GROUPS, teacher.id)
+                with self.captureOnCommitCallbacks(execute=True):
+                    label.name = label.name + "!"
+                    label.save()
+                self.assertNotEqual(self.get(fragment_cache.TEACHER_GROUPS, teacher.id), before)
@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views, export_views, account_views
+from . import views, export_views, account_views, ops_views
 
 app_name = "core"
 
@@ -49,6 +49,7 @@ urlpatterns = [
     ),
     # ----- لوحة المدرّس -----
     path("dashboard/", views.teacher_dashboard, name="dashboard"),
+    path("dashboard/tab/<slug:tab>/", views.teacher_dashboard_tab, name="dashboard_tab"),
     path(
         "dashboard/generate-next-week/",
         views.dashboard_generate_next_week,
@@ -170,8 +171,19 @@ urlpatterns = [
         views.invoice_pdf,
         name="invoice_pdf_teacher",
     ),
+    path("billing/invoices/bundle/", views.invoice_bundle, name="invoice_bundle"),
+    # توليد PDF في الخلفية (Celery): حالة المهمة + تحميل الملف
+    path("pdf/jobs/<int:job_id>/", views.pdf_job_status, name="pdf_job_status"),
+    path(
+        "pdf/jobs/<int:job_id>/download/",
+        views.pdf_job_download,
+        name="pdf_job_download",
+    ),
     # بوابة وليّ الأمر
     path("parent/", views.parent_dashboard, name="parent_dashboard"),
+    path(
+        "parent/tab/<slug:tab>/", views.parent_dashboard_tab, name="parent_dashboard_tab"
+    ),
     path(
         "parent/report/<int:student_id>/<int:year>/<int:month>/",
         views.parent_report_view,
@@ -186,6 +198,9 @@ urlpatterns = [
     path("parent/invoice/<int:invoice_id>/pdf/", views.invoice_pdf, name="invoice_pdf"),
     # بوابة الطالب
     path("student/", views.student_dashboard, name="student_dashboard"),
+    path(
+        "student/tab/<slug:tab>/", views.student_dashboard_tab, name="student_dashboard_tab"
+    ),
     path(
         "student/assignment/<int:assignment_id>/submit/",
         views.student_assignment_submit,
@@ -207,4 +222,11 @@ urlpatterns = [
         export_views.export_ungraded_submissions,
         name="export_ungraded",
     ),
+    # قياسات الأداء (staff فقط)
+    path("ops/profiling.json", ops_views.profiling_stats, name="profiling_stats"),
+    path(
+        "ops/fragment-cache.json",
+        ops_views.fragment_cache_stats,
+        name="fragment_cache_stats",
+    ),
 ]
@@ -1,6 +1,190 @@
+import base64
+import csv
+import io
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date
+
 
 def paginate(request, qs, per_page=25, page_param="page"):
     """يرجّع Page object جاهز للعرض."""
     page_num = request.GET.get(page_param) or 1
     return Paginator(qs, per_page).get_page(page_num)
+
+
+class CursorPage:
+    """
+    صفحة keyset: من غير COUNT ولا OFFSET — بس "السابق/التالي".
+    next_cursor/prev_cursor بيتحطّوا في الرابط كـ ?<cursor_param>=...
+    """
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, prev_cursor):
+        self.object_list = object_list
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+
+def _row_value(row, path):
+    """قيمة مفتاح الترتيب من صف: dict (values()) أو instance (مع related__field)."""
+    if isinstance(row, dict):
+        return row[path]
+    for attr in path.split("__"):
+        row = getattr(row, attr)
+    return row
+
+
+def _to_python(model, path, value):
+    """
+    يرجّع قيمة الـ JSON لنوعها (تاريخ/وقت/رقم) عن طريق الحقل في الموديل؛
+    الـ annotations (مش حقول) بتفضل زي ما هي.
+    """
+    try:
+        for name in path.split("__")[:-1]:
+            model = model._meta.get_field(name).related_model
+        field = model._meta.get_field(path.split("__")[-1])
+    except (FieldDoesNotExist, AttributeError):
+        return value
+    return field.to_python(value)
+
+
+def _encode_cursor(direction, row, fields):
+    values = [_row_value(row, f) for f in fields]
+    raw = json.dumps([direction, values], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(token, model, fields):
+    """(direction, values) أو None لو الـ cursor بايظ (يرجع لأول صفحة)."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        direction, values = json.loads(raw)
+        if direction not in ("n", "p") or len(values) != len(fields):
+            return None
+        return direction, [_to_python(model, f, v) for f, v in zip(fields, values)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def _keyset_q(ordering, values, forward):
+    """
+    (f1, f2, .. , id) > (v1, v2, .., vid) بترتيب ordering — مقارنة lexicographic
+    كـ OR من الشروط، كل حقل باتجاهه (asc/desc).
+    """
+    q = Q()
+    for i, key in enumerate(ordering):
+        field = key.lstrip("-")
+        desc = key.startswith("-")
+        lookup = "lt" if desc == forward else "gt"
+        cond = Q(**{f"{field}__{lookup}": values[i]})
+        for prev_key, prev_value in zip(ordering[:i], values[:i]):
+            cond &= Q(**{prev_key.lstrip("-"): prev_value})
+        q |= cond
+    return q
+
+
+def cursor_paginate(request, qs, ordering, per_page=25, cursor_param="cursor"):
+    """
+    ترقيم keyset بدل Paginator: الصفحة = WHERE (مفاتيح الترتيب) بعد آخر صف + LIMIT.
+    - ordering: مفاتيح ترتيب ثابتة وفريدة في الآخر (مثلًا ("-submitted_at", "-id")).
+    - المفاتيح ممكن تكون حقول، related (student__last_name) أو annotations،
+      والـ qs ممكن يكون values()؛ بس لازم ما تكونش null.
+    - الصفحة التالية/السابقة بتعتمد على صف واحد، فمفيش COUNT ولا OFFSET scan.
+    """
+    fields = [key.lstrip("-") for key in ordering]
+    decoded = _decode_cursor(request.GET.get(cursor_param) or "", qs.model, fields)
+
+    direction, values = decoded or ("n", None)
+    forward = direction == "n"
+    page_qs = qs
+    if values is not None:
+        page_qs = page_qs.filter(_keyset_q(ordering, values, forward))
+    order = ordering if forward else [
+        key[1:] if key.startswith("-") else f"-{key}" for key in ordering
+    ]
+    rows = list(page_qs.order_by(*order)[: per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    if forward:
+        has_next, has_previous = has_more, values is not None
+    else:
+        has_next, has_previous = True, has_more
+    return CursorPage(
+        rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_cursor=_encode_cursor("n", rows[-1], fields) if rows else None,
+        prev_cursor=_encode_cursor("p", rows[0], fields) if rows else None,
+    )
+
+
+# حجم الـ chunk اللي بيتبعت للعميل في الردود المتدفقة (بدل سطر سطر)
+CSV_FLUSH_BYTES = 64 * 1024
+
+
+def stream_csv(header, rows, filename, bom=False):
+    """
+    StreamingHttpResponse لملف CSV: الصفوف بتتكتب وتتبعت على دفعات
+    (~CSV_FLUSH_BYTES)، فالملف كله عمره ما بيتحمّل في الذاكرة.
+    rows: أي iterable لصفوف (يفضّل values_list(...).iterator()).
+    bom=True: يبدأ الملف بـ UTF-8 BOM عشان Excel يقرا العربي صح.
+    """
+
+    def _chunks():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if bom:
+            buf.write("\ufeff")
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            if buf.tell() >= CSV_FLUSH_BYTES:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    response = StreamingHttpResponse(_chunks(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def wants_bom(request):
+    """?bom=1 — تصدير مناسب لـ Excel."""
+    return request.GET.get("bom") in ("1", "true", "yes")
+
+
+def parse_date_param(request, name):
+    """تاريخ YYYY-MM-DD من الـ GET أو None لو فاضي/غلط."""
+    try:
+        return parse_date(request.GET.get(name) or "")
+    except ValueError:  # شكل صح لكن تاريخ مستحيل (2025-02-30)
+        return None
+
+
+def parse_int_param(request, name):
+    value = request.GET.get(name) or ""
+    return int(value) if value.isdigit() else None
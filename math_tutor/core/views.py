@@ -1,7 +1,6 @@
 # core/views.py
 # ===== قياسية من بايثون =====
 import os
-import csv
 from io import BytesIO
 from datetime import date, timedelta
 from core.tasks import notify_assignment_created
@@ -9,32 +8,26 @@ import base64, qrcode
 from io import BytesIO
 from urllib.parse import urlencode
 from .forms import SubmissionGradeForm
-from .forms import InvoiceForm, InvoiceBulkForm, PaymentForm
+from .forms import InvoiceForm, InvoiceBulkForm, InvoiceBundleForm, PaymentForm
 from .forms import InvoiceSimpleForm
 from django.db import IntegrityError, transaction
 from core.tasks import send_session_reminders_window_task, _send_window_logic
 from kombu.exceptions import OperationalError
 from django.utils import timezone
 from .models import Attendance, Enrollment, Group
-from .queries import attendance_window_q, annotate_attendance_counts, pct
-# ===== طرف ثالث =====
-from xhtml2pdf import pisa
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase.pdfmetrics import registerFontFamily
-
+from .queries import attendance_window_q, rollup_window_q, rollup_attendance_counts, pct
 # ===== Django =====
 from django import forms
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
-from django.contrib.staticfiles import finders
 from django.core.mail import EmailMessage
 from django.db import transaction
 from django.db.models import Avg, Count, Q
 from django.http import (
     FileResponse,
+    Http404,
     HttpResponse,
     HttpResponseBadRequest,
     HttpResponseForbidden,
@@ -46,22 +39,27 @@ from django.template.loader import render_to_string
 from django.templatetags.static import static
 from django.urls import reverse
 from django.utils import timezone
-from django.utils.dateparse import parse_date
+from django.utils.cache import get_conditional_response, patch_cache_control, set_response_etag
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.views.decorators.http import require_http_methods, require_POST,require_GET
 from django.forms import modelformset_factory
 from .models import HomeworkSubmission, TeacherProfile
 from django.db.models import Q, Exists, OuterRef
-from django.db.models import Q, Count, Sum, F, Value
-from django.db.models.functions import Coalesce
+from django.db.models import Q, Count, F
+from django.db.models.functions import Substr
+from django.core.files.storage import default_storage
 from django.utils import timezone
 from decimal import Decimal
-from django.db.models import Q, Count, Sum, F, Value, DecimalField, ExpressionWrapper
-from django.db.models.functions import Coalesce
+from django.db.models import Q, Count, F, DecimalField, ExpressionWrapper
 
 # ===== مشروعك (local apps) =====
 from .decorators import student_required
-from .forms import AssignmentQuickForm, HomeworkBulkGradeForm, StudentSubmissionForm
+from .forms import (
+    AssignmentQuickForm,
+    BulkGradeFormSet,
+    HomeworkBulkGradeForm,
+    StudentSubmissionForm,
+)
 from .models import (
     ParentProfile,
     Student,
@@ -78,11 +76,47 @@ from .models import (
     Invoice,
     Payment,
     NotificationLog,
+    AttendanceDailyRollup,
+    PdfJob,
 )
 from .services.notify import notify_session_reminder
-from .services.scheduling import generate_next_7_days
+from .services.scheduling import (
+    attach_children,
+    generate_next_7_days,
+    group_children_map,
+    upcoming_sessions,
+)
+from .services.dashboard import get_teacher_snapshot
+from .services import fragment_cache
+from .services.billing import issue_monthly_invoices, parent_billing_summary
+from .services.grading import (
+    GradeImportError,
+    apply_grade_changes,
+    import_grades,
+    parse_grade_csv,
+)
+from .services.pdf import (
+    PdfRenderError,
+    invoice_filename,
+    invoice_pdf_file,
+    report_filename,
+    report_pdf_file,
+)
+from .services.pdf_jobs import (
+    async_pdf_enabled,
+    build_invoice_bundle,
+    bundle_filename,
+    bundle_invoices_qs,
+    enqueue_pdf_job,
+)
 from .forms import GroupForm, BulkStudentsForm, AddExistingStudentsForm
-from .utiils import paginate
+from .utiils import (
+    cursor_paginate,
+    parse_date_param,
+    parse_int_param,
+    stream_csv,
+    wants_bom,
+)
 from datetime import date as _date
 
 def _teacher_group_or_404(teacher, group_id: int):
@@ -94,14 +128,6 @@ def _resource_queryset_for_teacher(teacher):
         Q(group__teacher=teacher) | Q(session__group__teacher=teacher)
     )
 
-from django.core.paginator import Paginator
-
-
-def paginate(request, qs, per_page=10, page_param="page"):
-    pg = Paginator(qs, per_page)
-    return pg.get_page(request.GET.get(page_param))
-
-
 @login_required
 def download_submission(request, submission_id: int):
     sub = get_object_or_404(HomeworkSubmission, id=submission_id)
@@ -141,7 +167,7 @@ from .models import Resource, Group, ClassSession, Subject
 
 from .models import ClassSession, Enrollment, Assignment, Group, Subject
 import base64
-from django.db.models import Sum, Q
+from django.db.models import Q
 
 
 def home(request):
@@ -224,132 +250,128 @@ def parent_required(view_func):
     return _wrapped
 
 
+# ====== تبويبات اللوحات: كل تبويب endpoint لوحده بيرندر الـ partial بتاعه بس ======
+
+def _dashboard_tabs(request, prefix, tabs, builders):
+    """
+    تبويبات الصفحة الرئيسية: النشط من ?tab= (أو الأول). التبويب اللي ليه builder
+    بيتحمّل من الـ endpoint بتاعه أول ما يتفتح، والباقي (ثابت) بيتضمّن في الصفحة.
+    """
+    slugs = [slug for slug, _label in tabs]
+    active = request.GET.get("tab")
+    if active not in slugs:
+        active = slugs[0]
+    return [
+        {
+            "slug": slug,
+            "label": label,
+            "active": slug == active,
+            "lazy": slug in builders,
+            "template": f"core/tabs/{prefix}_{slug}.html",
+        }
+        for slug, label in tabs
+    ]
+
+
+def _render_tab(request, prefix, builders, tab, cached=None):
+    """
+    يرندر تبويب واحد (fragment). كل تبويب ليه URL لوحده (بالـ querystring بتاعه)،
+    فالمتصفح بيكاشه لوحده: private + ETag، ولو المحتوى ما اتغيّرش يرجع 304.
+    cached: {tab: (قسم fragment_cache، دالة بترجع المالك من الطلب)} — الـ HTML
+    المرندر نفسه بيتكاش على السيرفر (التبويبات مفيهاش csrf_token، شوف csrf_slot).
+    """
+    build = builders.get(tab)
+    if build is None:
+        raise Http404("تبويب غير معروف.")
+    template = f"core/tabs/{prefix}_{tab}.html"
+    section, owner = (cached or {}).get(tab, (None, None))
+    if section:
+        params = sorted((k, v) for k, v in request.GET.lists() if k != "tab")
+        html = fragment_cache.get_or_build(
+            section,
+            owner(request),
+            request.user.pk,
+            lambda: render_to_string(template, build(request), request),
+            params,
+            timezone.localdate(),
+        )
+        response = HttpResponse(html)
+    else:
+        response = render(request, template, build(request))
+    patch_cache_control(response, private=True, no_cache=True)
+    set_response_etag(response)
+    return get_conditional_response(request, etag=response["ETag"], response=response)
+
+
+def _parent_billing(request, parent):
+    """ملخّص فوترة وليّ الأمر (كويري واحد) من كاش PARENT_BILLING — مشترك بين اللوحة وصفحة الفواتير."""
+    today = timezone.localdate()
+    return fragment_cache.get_or_build(
+        fragment_cache.PARENT_BILLING,
+        parent.id,
+        request.user.pk,
+        lambda: parent_billing_summary(parent, today),
+        today,
+    )
+
+
 @parent_required
 def parent_dashboard(request):
+    """الصفحة نفسها = هيدر الـ KPIs بس؛ كل تبويب بيتحمّل من parent_dashboard_tab."""
     parent = request.parent
-    today = timezone.localdate()
-    next_week = today + timezone.timedelta(days=7)
-
     kids = Student.objects.filter(parent=parent).order_by("first_name", "last_name")
-    kids_ids = list(kids.values_list("id", flat=True))
 
-    # ـــــــــــ خريطة: كل مجموعة -> الأبناء المنسوبين لها ـــــــــــ
-    enroll_rows = Enrollment.objects.filter(
-        student_id__in=kids_ids, is_active=True
-    ).values(
-        "group_id",
-        "student_id",
-        "student__first_name",
-        "student__last_name",
-    )
-    group_children_map = {}
-    for r in enroll_rows:
-        group_children_map.setdefault(r["group_id"], []).append(
-            {
-                "id": r["student_id"],
-                "name": f'{r["student__first_name"]} {r["student__last_name"]}'.strip(),
-            }
-        )
+    ctx = {
+        "kids": kids,
+        # فوترة عامة
+        "billing": _parent_billing(request, parent),
+        "tabs": _dashboard_tabs(request, "parent", PARENT_TABS, _PARENT_TAB_BUILDERS),
+        "tab_url": "core:parent_dashboard_tab",
+    }
+    return render(request, "core/parent_dashboard.html", ctx)
 
-    # ـــــــــــ الحصص القادمة (سطر لكل طفل) — values() مع بيانات الطالب ـــــــــــ
-    sessions_qs = (
-        ClassSession.objects.filter(
-            group__enrollments__student_id__in=kids_ids,
-            date__range=(today, next_week),
-        )
-        .select_related("group", "subject")
-        .annotate(
-            student_id=F("group__enrollments__student_id"),
-            student_first=F("group__enrollments__student__first_name"),
-            student_last=F("group__enrollments__student__last_name"),
-            group_name=F("group__name"),
-            subj_name=Coalesce(F("subject__name"), F("group__subject__name")),
-        )
-        .values(
-            "id",
-            "date",
-            "start_time",
-            "end_time",
-            "is_online",
-            "group_id",
-            "group_name",
-            "subj_name",
-            "student_id",
-            "student_first",
-            "student_last",
-        )
-        .order_by("date", "start_time", "group_name", "student_last")
-        .distinct()
-    )
 
-    # ـــــــــــ الواجبات/التسليمات/الفواتير/المدفوعات (زي ما عملنا قبل) ـــــــــــ
-    now = timezone.now()
-    assignments_qs = (
-        Assignment.objects.filter(group__enrollments__student_id__in=kids_ids)
-        .select_related("group", "subject")
-        .order_by("-assigned_at")
-        .distinct()
-    )
-    submissions_qs = (
-        HomeworkSubmission.objects.filter(student_id__in=kids_ids)
-        .select_related("student", "assignment", "assignment__group")
-        .order_by("-submitted_at")
-    )
+def _parent_kids_ids(parent):
+    return list(Student.objects.filter(parent=parent).values_list("id", flat=True))
 
-    parent_invoices_all = (
-        Invoice.objects.filter(parent=parent)
-        .annotate(
-            paid_sum=Coalesce(
-                Sum("payments__amount_egp"),
-                Value(Decimal("0.00")),
-                output_field=DecimalField(max_digits=10, decimal_places=2),
-            )
-        )
-        .annotate(
-            remaining_amount=ExpressionWrapper(
-                F("amount_egp") - F("paid_sum"),
-                output_field=DecimalField(max_digits=10, decimal_places=2),
-            )
-        )
-    )
-    invoices_qs = parent_invoices_all.select_related("student", "group").order_by(
-        "-issued_at"
-    )
-    payments_qs = (
-        Payment.objects.filter(invoice__parent=parent)
-        .select_related("invoice", "invoice__student")
-        .order_by("-received_at")
-    )
 
-    # ـــــــــــ Pagination ـــــــــــ
-    sessions = paginate(request, sessions_qs, per_page=10, page_param="page_sess")
-    assignments = paginate(request, assignments_qs, per_page=10, page_param="page_assg")
-    submissions = paginate(request, submissions_qs, per_page=10, page_param="page_subs")
-    invoices = paginate(request, invoices_qs, per_page=10, page_param="page_inv")
-    payments = paginate(request, payments_qs, per_page=10, page_param="page_pay")
+def _parent_tab_overview(request):
+    today = timezone.localdate()
+    next_week = today + timezone.timedelta(days=7)
+    kids = Student.objects.filter(parent=request.parent).order_by("first_name", "last_name")
+    kids_ids = [k.id for k in kids]
 
-    # ملخّص فوترة (زي ما كان)
-    total_due = sum(
-        (
-            inv["remaining_amount"]
-            for inv in parent_invoices_all.values("remaining_amount")
-        ),
-        Decimal("0.00"),
+    # ـــــــــــ الحصص القادمة: صف لكل حصة + أبناؤها من الخريطة ـــــــــــ
+    children_map = group_children_map(kids_ids)
+    sessions = cursor_paginate(
+        request,
+        upcoming_sessions(list(children_map), today),
+        ("date", "start_time", "id"),
+        per_page=10,
+        cursor_param="page_sess",
     )
-    total_overdue = sum(
-        (
-            inv["remaining_amount"]
-            for inv in parent_invoices_all.filter(status=Invoice.Status.OVERDUE).values(
-                "remaining_amount"
-            )
+    attach_children(sessions, children_map)
+
+    submissions_qs = HomeworkSubmission.objects.filter(
+        student_id__in=kids_ids
+    ).select_related("student", "assignment", "assignment__group")
+
+    return {
+        "kids": kids,
+        "today": today,
+        "next_week": next_week,
+        # Pagination (keyset: من غير COUNT ولا OFFSET)
+        "sessions": sessions,
+        "submissions": cursor_paginate(
+            request, submissions_qs, ("-submitted_at", "-id"), per_page=10, cursor_param="page_subs"
         ),
-        Decimal("0.00"),
-    )
-    month_start = today.replace(day=1)
-    month_paid = Payment.objects.filter(
-        invoice__parent=parent, received_at__date__gte=month_start
-    ).aggregate(s=Sum("amount_egp"))["s"] or Decimal("0.00")
-    open_count = parent_invoices_all.exclude(status=Invoice.Status.PAID).count()
+    }
+
+
+def _parent_tab_att(request):
+    kids = Student.objects.filter(parent=request.parent).order_by("first_name", "last_name")
+    kids_ids = [k.id for k in kids]
+
     def _d(s: str | None):
         try:
             return _date.fromisoformat(s) if s else None
@@ -369,12 +391,18 @@ def parent_dashboard(request):
         .filter(attendance_window_q(pd_from_d, pd_to_d))
     )
 
+    # نفس الفلاتر على التجميعات اليومية (بدل تجميع كل السجلات الخام)
+    rollup_q = AttendanceDailyRollup.objects.filter(student_id__in=kids_ids).filter(
+        rollup_window_q(pd_from_d, pd_to_d)
+    )
+
     # لو فيه طالب محدد
     if sel_student:
         att_q = att_q.filter(student_id=sel_student)
+        rollup_q = rollup_q.filter(student_id=sel_student)
 
-    # نجمع الأرقام لكل طالب (الدالة annotate_attendance_counts عندك)
-    summary_rows = annotate_attendance_counts(att_q)
+    # نجمع الأرقام لكل طالب
+    summary_rows = rollup_attendance_counts(rollup_q)
 
     # نبني صفوف الملخّص + KPI النسبة الكلية
     total_present = total_total = 0
@@ -396,8 +424,6 @@ def parent_dashboard(request):
         total_present += row_present
         total_total   += row_total
 
-    # الحضور (زي ما عندك) + إضافة عمود الطالب في القالب لاحقاً
-    # ... parent_attendance كما هو عندك ...
     parent_attendance = {
         "rows": parent_rows,
         "kpi_present_pct": pct(total_present, total_total),
@@ -408,30 +434,62 @@ def parent_dashboard(request):
         "from": request.GET.get("att_from") or "",
         "to": request.GET.get("att_to") or "",
     }
-    ctx = {
-        "kids": kids,
-        "today": today,
-        "next_week": next_week,
-        # Page objects
-        "sessions": sessions,
-        "assignments": assignments,
-        "submissions": submissions,
-        "invoices": invoices,
-        "payments": payments,
+    return {"parent_attendance": parent_attendance, "children": kids}
+
+
+def _parent_tab_hw(request):
+    kids_ids = _parent_kids_ids(request.parent)
+
+    # ـــــــــــ خريطة: كل مجموعة -> الأبناء المنسوبين لها ـــــــــــ
+    group_children = group_children_map(kids_ids)
+
+    # نفس مجموعات الخريطة (تسجيل نشط) — من غير join على التسجيلات ولا DISTINCT
+    assignments_qs = Assignment.objects.filter(
+        group_id__in=list(group_children)
+    ).select_related("group", "subject")
+    return {
+        "assignments": cursor_paginate(
+            request, assignments_qs, ("-assigned_at", "-id"), per_page=10, cursor_param="page_assg"
+        ),
         # يساعد القالب يبيّن أبناء كل واجب/مجموعة
-        "group_children_map": group_children_map,
-        # فوترة عامة
-        "billing": {
-            "total_due": total_due,
-            "total_overdue": total_overdue,
-            "month_paid": month_paid,
-            "open_count": open_count,
-        },
-        # الحضور
-        "parent_attendance": parent_attendance,
-        "children": kids,
+        "group_children_map": group_children,
     }
-    return render(request, "core/parent_dashboard.html", ctx)
+
+
+def _parent_tab_billing(request):
+    parent = request.parent
+    invoices_qs = Invoice.objects.filter(parent=parent).select_related("student", "group")
+    payments_qs = Payment.objects.filter(invoice__parent=parent).select_related(
+        "invoice", "invoice__student"
+    )
+    return {
+        "invoices": cursor_paginate(
+            request, invoices_qs, ("-issued_at", "-id"), per_page=10, cursor_param="page_inv"
+        ),
+        "payments": cursor_paginate(
+            request, payments_qs, ("-received_at", "-id"), per_page=10, cursor_param="page_pay"
+        ),
+    }
+
+
+PARENT_TABS = (
+    ("overview", "نظرة عامة"),
+    ("att", "الحضور"),
+    ("hw", "الواجبات"),
+    ("billing", "الفواتير"),
+)
+_PARENT_TAB_BUILDERS = {
+    "overview": _parent_tab_overview,
+    "att": _parent_tab_att,
+    "hw": _parent_tab_hw,
+    "billing": _parent_tab_billing,
+}
+
+
+@parent_required
+@require_GET
+def parent_dashboard_tab(request, tab):
+    return _render_tab(request, "parent", _PARENT_TAB_BUILDERS, tab)
 
 
 @parent_required
@@ -466,17 +524,10 @@ def teacher_required(view_func):
 from django.db.models.functions import TruncDate, TruncMonth
 
 
-@teacher_required
-def teacher_dashboard(request):
+def _teacher_filters(request):
+    """فلاتر الكويري المشتركة بين هيدر لوحة المدرّس وتبويباتها."""
     tz_today = timezone.localdate()
-    # tz_now = timezone.localtime()  # مش مستخدم حالياً
-
-    # فلاتر الكويري
     q_group = request.GET.get("group")
-    q_subject = request.GET.get("subject")
-    q_status = request.GET.get("status")
-    q_month = int(request.GET.get("month") or tz_today.month)
-    q_year = int(request.GET.get("year") or tz_today.year)
 
     # مجموعات المدرّس
     groups = Group.objects.filter(teacher=request.teacher).select_related(
@@ -485,135 +536,144 @@ def teacher_dashboard(request):
     if q_group:
         groups = groups.filter(id=q_group)
 
-    # إحصائيات علوية سريعة
-    total_groups = groups.count()
-    total_students = Enrollment.objects.filter(group__in=groups, is_active=True).count()
-    upcoming_count = ClassSession.objects.filter(
-        group__in=groups, date__gte=tz_today
-    ).count()
-    due_invoices = Invoice.objects.filter(
-        group__in=groups, year=q_year, month=q_month, status__in=["DUE", "OVERDUE"]
-    ).count()
+    return {
+        "today": tz_today,
+        "groups": groups,
+        "q_group": q_group,
+        "q_subject": request.GET.get("subject"),
+        "q_status": request.GET.get("status"),
+        "q_month": int(request.GET.get("month") or tz_today.month),
+        "q_year": int(request.GET.get("year") or tz_today.year),
+    }
+
+
+def _teacher_tab_groups(request):
+    f = _teacher_filters(request)
+    # عدّادات سريعة لكل مجموعة (من اللقطة)
+    snap = get_teacher_snapshot(request.teacher)
+    return {
+        **f,
+        "enroll_counts": {int(k): v["students"] for k, v in snap.group_counters.items()},
+        "sess_counts": {int(k): v["upcoming"] for k, v in snap.group_counters.items()},
+    }
 
-    # ====== قوائم بـ QS قابل للترقيم (pagination) ======
 
+def _teacher_tab_sessions(request):
+    f = _teacher_filters(request)
     # حصص قادمة
     sessions_qs = (
-        ClassSession.objects.filter(group__in=groups, date__gte=tz_today)
+        ClassSession.objects.filter(group__in=f["groups"], date__gte=f["today"])
         .select_related("group", "subject")
         .defer("notes", "meeting_link")
-        .order_by("date", "start_time")
     )
-    sessions_page = paginate(request, sessions_qs, per_page=10, page_param="page_sess")
+    return {
+        **f,
+        "sessions": cursor_paginate(
+            request, sessions_qs, ("date", "start_time", "id"), per_page=10, cursor_param="page_sess"
+        ),
+    }
+
 
-    # واجبات
+def _teacher_tab_assignments(request):
+    f = _teacher_filters(request)
     assignments_qs = (
-        Assignment.objects.filter(group__in=groups)
+        Assignment.objects.filter(group__in=f["groups"])
         .select_related("group", "subject")
         .defer("description")
-        .order_by("-assigned_at")
-    )
-    assignments_page = paginate(
-        request, assignments_qs, per_page=10, page_param="page_assg"
     )
+    return {
+        **f,
+        "assignments": cursor_paginate(
+            request, assignments_qs, ("-assigned_at", "-id"), per_page=10, cursor_param="page_assg"
+        ),
+    }
 
-    # تسليمات
+
+def _teacher_tab_submissions(request):
+    f = _teacher_filters(request)
     subs_qs = (
-        HomeworkSubmission.objects.filter(assignment__group__in=groups)
+        HomeworkSubmission.objects.filter(assignment__group__in=f["groups"])
         .select_related("student", "assignment__group", "assignment__subject")
         .defer("answer_text", "feedback", "file")
-        .order_by("-submitted_at")
     )
     # (اختياري) لو عايز فلترة بالحالة q_status على التسليمات:
-    if q_status in {"SUBMITTED", "LATE", "GRADED"}:
-        subs_qs = subs_qs.filter(status=q_status)
-    subs_page = paginate(request, subs_qs, per_page=10, page_param="page_subs")
+    if f["q_status"] in {"SUBMITTED", "LATE", "GRADED"}:
+        subs_qs = subs_qs.filter(status=f["q_status"])
+    return {
+        **f,
+        "subs": cursor_paginate(
+            request, subs_qs, ("-submitted_at", "-id"), per_page=10, cursor_param="page_subs"
+        ),
+    }
 
-    # فواتير الشهر
-    invoices_qs = (
-    Invoice.objects.filter(group__in=groups, year=q_year, month=q_month)
-    .select_related("student", "group")
-    .annotate(
-        paid_sum=Coalesce(
-            Sum("payments__amount_egp"),
-            Value(Decimal("0.00")),
-            output_field=DecimalField(max_digits=10, decimal_places=2),
-        )
-    )
-    .annotate(
-        remaining_amount=ExpressionWrapper(
-            F("amount_egp") - F("paid_sum"),
-            output_field=DecimalField(max_digits=10, decimal_places=2),
-        )
-    )
-    .order_by("-status", "student__last_name")
-)
 
-# لو الشهر/السنة المحددين فاضيين: قفز لآخر شهر فيه بيانات
-    latest_inv = (
-        Invoice.objects.filter(group__in=groups)
-        .order_by("-year", "-month", "-issued_at")
-        .first()
-    )
-    if latest_inv and not invoices_qs.exists():
-        q_year, q_month = latest_inv.year, latest_inv.month
-        invoices_qs = (
-            Invoice.objects.filter(group__in=groups, year=q_year, month=q_month)
-            .select_related("student", "group")
-            .annotate(
-                paid_sum=Coalesce(
-                    Sum("payments__amount_egp"),
-                    Value(Decimal("0.00")),
-                    output_field=DecimalField(max_digits=10, decimal_places=2),
-                )
-            )
-            .annotate(
-                remaining_amount=ExpressionWrapper(
-                    F("amount_egp") - F("paid_sum"),
-                    output_field=DecimalField(max_digits=10, decimal_places=2),
-                )
+def _teacher_month_invoices(groups, year, month):
+    return (
+        Invoice.objects.filter(group__in=groups, year=year, month=month)
+        .select_related("student", "group")
+        .annotate(
+            remaining_amount=ExpressionWrapper(
+                F("amount_egp") - F("paid_total"),
+                output_field=DecimalField(max_digits=10, decimal_places=2),
             )
-            .order_by("-status", "student__last_name")
         )
+    )
 
-    invoices_page = paginate(request, invoices_qs, per_page=10, page_param="page_inv")
 
+def _teacher_tab_billing(request):
+    f = _teacher_filters(request)
+    # فواتير الشهر
+    invoices_qs = _teacher_month_invoices(f["groups"], f["q_year"], f["q_month"])
+
+    # لو الشهر/السنة المحددين فاضيين: قفز لآخر شهر فيه بيانات
+    if not invoices_qs.exists():
+        latest_inv = (
+            Invoice.objects.filter(group__in=f["groups"])
+            .order_by("-year", "-month", "-issued_at")
+            .first()
+        )
+        if latest_inv:
+            f["q_year"], f["q_month"] = latest_inv.year, latest_inv.month
+            invoices_qs = _teacher_month_invoices(f["groups"], f["q_year"], f["q_month"])
 
+    return {
+        **f,
+        "invoices": cursor_paginate(
+            request,
+            invoices_qs,
+            ("-status", "student__last_name", "id"),
+            per_page=10,
+            cursor_param="page_inv",
+        ),
+    }
 
+
+def _teacher_tab_resources(request):
+    f = _teacher_filters(request)
     # الموارد (فلترة قبل paginate)
     resources_qs = (
-        Resource.objects.filter(Q(group__in=groups) | Q(session__group__in=groups))
+        Resource.objects.filter(Q(group__in=f["groups"]) | Q(session__group__in=f["groups"]))
         .select_related(
             "group", "session__group", "subject", "session", "session__subject"
         )
-        .order_by("-created_at")
         .distinct()
     )
-    if q_subject:
+    if f["q_subject"]:
         resources_qs = resources_qs.filter(
-            Q(subject_id=q_subject)
-            | Q(session__subject_id=q_subject)
-            | Q(session__group__subject_id=q_subject)
+            Q(subject_id=f["q_subject"])
+            | Q(session__subject_id=f["q_subject"])
+            | Q(session__group__subject_id=f["q_subject"])
         )
-    resources_page = paginate(request, resources_qs, per_page=10, page_param="page_res")
+    return {
+        **f,
+        "resources": cursor_paginate(
+            request, resources_qs, ("-created_at", "-id"), per_page=10, cursor_param="page_res"
+        ),
+    }
 
-    # عدّادات سريعة لكل مجموعة
-    group_ids = list(groups.values_list("id", flat=True))
-    enroll_counts = dict(
-        Enrollment.objects.filter(group_id__in=group_ids, is_active=True)
-        .values("group_id")
-        .annotate(c=Count("id"))
-        .values_list("group_id", "c")
-    )
-    sess_counts = dict(
-        ClassSession.objects.filter(group_id__in=group_ids, date__gte=tz_today)
-        .values("group_id")
-        .annotate(c=Count("id"))
-        .values_list("group_id", "c")
-    )
 
-    # المواد
-    subjects = Subject.objects.filter(is_active=True).order_by("name")
+def _teacher_tab_attendance(request):
+    f = _teacher_filters(request)
 
     # ====== ملخّص حضور المدرّس ======
     att_group_id = request.GET.get("att_group")
@@ -631,16 +691,13 @@ def teacher_dashboard(request):
     att_from_d = _parse_date(att_from)
     att_to_d = _parse_date(att_to)
 
-    teacher_groups = Group.objects.filter(teacher=request.teacher)
-    att_q = (
-        Attendance.objects.select_related("student", "session", "session__group")
-        .filter(session__group__in=teacher_groups)
-        .filter(attendance_window_q(att_from_d, att_to_d))
-    )
+    att_q = AttendanceDailyRollup.objects.filter(
+        group__teacher=request.teacher
+    ).filter(rollup_window_q(att_from_d, att_to_d))
     if att_group_id:
-        att_q = att_q.filter(session__group_id=att_group_id)
+        att_q = att_q.filter(group_id=att_group_id)
 
-    att_rows = annotate_attendance_counts(att_q)
+    att_rows = rollup_attendance_counts(att_q)
 
     att_list = []
     tot_present = tot_total = 0
@@ -662,41 +719,91 @@ def teacher_dashboard(request):
         tot_present += row_present
         tot_total += row_total
 
-    attendance_teacher_summary = {
-        "rows": att_list,
-        "kpi_present_pct": pct(tot_present, tot_total),
-        "kpi_total_records": tot_total,
+    # بدون فلاتر: الـ KPI جاهز في اللقطة
+    if not (att_group_id or att_from_d or att_to_d):
+        snap = get_teacher_snapshot(request.teacher)
+        tot_present, tot_total = snap.att_present, snap.att_total
+
+    return {
+        **f,
+        "attendance_teacher_summary": {
+            "rows": att_list,
+            "kpi_present_pct": pct(tot_present, tot_total),
+            "kpi_total_records": tot_total,
+        },
+        "att_group_id": att_group_id,
+        "att_from": att_from or "",
+        "att_to": att_to or "",
     }
 
+
+TEACHER_TABS = (
+    ("groups", "المجموعات"),
+    ("sessions", "الحصص القادمة"),
+    ("assignments", "الواجبات"),
+    ("submissions", "التسليمات"),
+    ("billing", "الفوترة"),
+    ("resources", "الموارد"),
+    ("attendance", "الحضور"),
+)
+_TEACHER_TAB_BUILDERS = {
+    "groups": _teacher_tab_groups,
+    "sessions": _teacher_tab_sessions,
+    "assignments": _teacher_tab_assignments,
+    "submissions": _teacher_tab_submissions,
+    "billing": _teacher_tab_billing,
+    "resources": _teacher_tab_resources,
+    "attendance": _teacher_tab_attendance,
+}
+# عدّادات المجموعات: بتتبطّل من سيجنالز Group/Enrollment/ClassSession
+_TEACHER_TAB_CACHE = {
+    "groups": (fragment_cache.TEACHER_GROUPS, lambda request: request.teacher.id),
+}
+
+
+@teacher_required
+def teacher_dashboard(request):
+    """الصفحة نفسها = هيدر الـ KPIs بس؛ كل تبويب بيتحمّل من teacher_dashboard_tab."""
+    f = _teacher_filters(request)
+    q_group, q_year, q_month = f["q_group"], f["q_year"], f["q_month"]
+
+    # إحصائيات علوية سريعة — من اللقطة المحسوبة مسبقًا (كويري واحد لو حديثة)
+    snap = get_teacher_snapshot(request.teacher)
+    if q_group:
+        g_counters = snap.counters_for(q_group)
+        total_groups = 1 if str(q_group) in snap.group_counters else 0
+        total_students = g_counters["students"]
+        upcoming_count = g_counters["upcoming"]
+        snap_due = g_counters["due"]
+    else:
+        total_groups = snap.total_groups
+        total_students = snap.total_students
+        upcoming_count = snap.upcoming_count
+        snap_due = snap.due_invoices
+    if (q_year, q_month) == (snap.built_for.year, snap.built_for.month):
+        due_invoices = snap_due
+    else:
+        due_invoices = Invoice.objects.filter(
+            group__in=f["groups"], year=q_year, month=q_month, status__in=["DUE", "OVERDUE"]
+        ).count()
+
     ctx = dict(
-        groups=groups,
-        enroll_counts=enroll_counts,
-        sess_counts=sess_counts,
-        subjects=subjects,
-        q_group=q_group,
-        q_subject=q_subject,
-        q_status=q_status,
-        q_year=q_year,
-        q_month=q_month,
         total_groups=total_groups,
         total_students=total_students,
         upcoming_count=upcoming_count,
         due_invoices=due_invoices,
-        # صفحات مرقّمة
-        sessions=sessions_page,
-        assignments=assignments_page,
-        subs=subs_page,
-        invoices=invoices_page,
-        resources=resources_page,
-        # حضور
-        attendance_teacher_summary=attendance_teacher_summary,
-        att_group_id=att_group_id,
-        att_from=att_from or "",
-        att_to=att_to or "",
+        tabs=_dashboard_tabs(request, "teacher", TEACHER_TABS, _TEACHER_TAB_BUILDERS),
+        tab_url="core:dashboard_tab",
     )
     return render(request, "core/teacher_dashboard.html", ctx)
 
 
+@teacher_required
+@require_GET
+def teacher_dashboard_tab(request, tab):
+    return _render_tab(request, "teacher", _TEACHER_TAB_BUILDERS, tab, _TEACHER_TAB_CACHE)
+
+
 @teacher_required
 def create_assignment(request):
     teacher = request.teacher
@@ -813,119 +920,176 @@ def bulk_grade(request):
     # فلترة بسيطة
     groups = Group.objects.filter(teacher=me).order_by("name")
 
-    qs = (
-        HomeworkSubmission.objects.select_related(
-            "student", "assignment", "assignment__group"
-        )
-        .filter(assignment__group__teacher=me)
-        .order_by("-submitted_at")
-    )
+    qs = HomeworkSubmission.objects.filter(assignment__group__teacher=me)
 
-    active_group = request.GET.get("group") or ""
+    active_group = parse_int_param(request, "group")
     status = request.GET.get("status") or ""
-    date_from = request.GET.get("date_from") or ""
-    date_to = request.GET.get("date_to") or ""
-    limit = int(request.GET.get("limit") or 50)
+    date_from = parse_date_param(request, "date_from")
+    date_to = parse_date_param(request, "date_to")
+    # حجم الصفحة (التنقّل نفسه بالـ cursor، مش حد أقصى للنتائج)
+    limit = max(10, min(parse_int_param(request, "limit") or 50, 200))
 
     if active_group:
         qs = qs.filter(assignment__group_id=active_group)
     if status in ("SUBMITTED", "LATE", "GRADED"):
         qs = qs.filter(status=status)
     if date_from:
-        qs = qs.filter(submitted_at__date__gte=parse_date(date_from))
+        qs = qs.filter(submitted_at__date__gte=date_from)
     if date_to:
-        qs = qs.filter(submitted_at__date__lte=parse_date(date_to))
-
-    qs = qs[:limit]
-    total_pending = qs.count()
+        qs = qs.filter(submitted_at__date__lte=date_to)
 
     FormSet = modelformset_factory(
-        HomeworkSubmission, form=HomeworkBulkGradeForm, extra=0, can_delete=False
+        HomeworkSubmission,
+        form=HomeworkBulkGradeForm,
+        formset=BulkGradeFormSet,
+        extra=0,
+        can_delete=False,
     )
 
     if request.method == "POST":
-        formset = FormSet(request.POST, queryset=qs)
+        # الفورمسِت بيرجع لنفس الصفوف اللي اتعرضت (بالـ id) حتى لو الصفحة اتغيّرت بعد الحفظ
+        posted_ids = [
+            int(v)
+            for k, v in request.POST.items()
+            if k.startswith("form-") and k.endswith("-id") and v.isdigit()
+        ]
+        formset = FormSet(
+            request.POST,
+            queryset=HomeworkSubmission.objects.filter(
+                assignment__group__teacher=me, pk__in=posted_ids
+            ).select_related("student", "assignment", "assignment__group"),
+        )
         if formset.is_valid():
-            saved = 0
+            changed = []
             for form in formset:
                 if not form.cleaned_data.get("select"):
                     continue  # احفظ المحدد فقط
-                sub = form.save(commit=False)
+                sub = form.instance
                 # اضبط الحالة تلقائيًا لو فيه درجة وما تم اختيار حالة
                 if sub.grade is not None and not form.cleaned_data.get("status"):
                     sub.status = HomeworkSubmission.Status.GRADED
-                sub.save()
-                saved += 1
-            messages.success(request, f"تم حفظ {saved} صف/صفوف.")
+                # status دايمًا (ممكن تكون اتضبطت تلقائيًا فوق)
+                fields = (set(form.changed_data) | {"status"}) & {"grade", "status", "feedback"}
+                changes = {f: getattr(sub, f) for f in fields}
+                changed.append((sub, changes))
+            if changed:
+                # UPDATE جماعي + صفوف history بالجملة بدل save() لكل صف
+                with transaction.atomic():
+                    apply_grade_changes(changed, user=request.user)
+            messages.success(request, f"تم حفظ {len(changed)} صف/صفوف.")
             # رجوع لنفس الصفحة مع نفس الفلاتر
             return redirect(f"{request.path}?{request.GET.urlencode()}")
         else:
             messages.error(request, "تحقق من القيم المدخلة.")
+        page = None
     else:
-        formset = FormSet(queryset=qs)
+        # keyset على (submitted_at, id): الصفحة = index range + LIMIT، من غير OFFSET
+        page = cursor_paginate(
+            request,
+            qs.only("id", "submitted_at"),
+            ordering=("-submitted_at", "-id"),
+            per_page=limit,
+        )
+        formset = FormSet(
+            queryset=HomeworkSubmission.objects.filter(
+                pk__in=[s.pk for s in page]
+            )
+            .select_related("student", "assignment", "assignment__group")
+            .order_by("-submitted_at", "-id")
+        )
+
+    # عدد واحد على فلاتر مفهرسة (من غير subquery على slice)
+    total_pending = qs.count()
 
     ctx = {
+        "import_report": request.session.pop("grade_import_report", None),
         "groups": groups,
-        "active_group": int(active_group) if active_group else "",
+        "active_group": active_group or "",
         "status": status,
-        "date_from": date_from,
-        "date_to": date_to,
+        "date_from": request.GET.get("date_from") or "",
+        "date_to": request.GET.get("date_to") or "",
         "limit": limit,
         "total_pending": total_pending,
         "formset": formset,
+        "page_obj": page,
     }
     return render(request, "core/bulk_grade.html", ctx)
 
 
+GRADE_IMPORT_REPORT_LIMIT = 200
+
+
 def _filtered_submissions_qs(request, teacher):
-    # نفس منطق الفلاتر المستخدم في bulk_grade:
-    base_qs = (
-        HomeworkSubmission.objects.filter(
-            assignment__group__teacher=teacher,
-            status__in=[
-                HomeworkSubmission.Status.SUBMITTED,
-                HomeworkSubmission.Status.LATE,
-            ],
-        )
-        .select_related("assignment", "student", "assignment__group")
-        .order_by("-submitted_at")
-    )
+    """نفس فلاتر bulk_grade (status/date_from/date_to/group) — من غير حد للصفوف."""
+    base_qs = HomeworkSubmission.objects.filter(
+        assignment__group__teacher=teacher,
+        status__in=[
+            HomeworkSubmission.Status.SUBMITTED,
+            HomeworkSubmission.Status.LATE,
+        ],
+    ).order_by("-submitted_at", "-id")
 
     status = request.GET.get("status")
     if status in [HomeworkSubmission.Status.SUBMITTED, HomeworkSubmission.Status.LATE]:
         base_qs = base_qs.filter(status=status)
 
-    from django.utils.dateparse import parse_date
-
-    date_from = request.GET.get("date_from")
-    date_to = request.GET.get("date_to")
+    date_from = parse_date_param(request, "date_from")
+    date_to = parse_date_param(request, "date_to")
     if date_from:
-        d = parse_date(date_from)
-        if d:
-            base_qs = base_qs.filter(submitted_at__date__gte=d)
+        base_qs = base_qs.filter(submitted_at__date__gte=date_from)
     if date_to:
-        d = parse_date(date_to)
-        if d:
-            base_qs = base_qs.filter(submitted_at__date__lte=d)
+        base_qs = base_qs.filter(submitted_at__date__lte=date_to)
 
-    group_id = request.GET.get("group")
+    group_id = parse_int_param(request, "group")
     if group_id:
         base_qs = base_qs.filter(assignment__group_id=group_id)
-
-    limit = int(request.GET.get("limit", "50"))
-    return base_qs[: max(1, min(limit, 200))]
+    return base_qs
 
 
 @teacher_required
 def bulk_grade_export(request):
-    teacher = request.teacher
-    qs = _filtered_submissions_qs(request, teacher)
+    """
+    CSV متدفق للتسليمات (نفس أعمدة bulk_grade_import) — بيغطي المدى كله
+    (ترم كامل) إلا لو اتبعت ?limit=؛ ?bom=1 لـ Excel.
+    """
+    qs = (
+        _filtered_submissions_qs(request, request.teacher)
+        .annotate(feedback_head=Substr("feedback", 1, 500))
+        .values_list(
+            "id",
+            "student__first_name",
+            "student__last_name",
+            "assignment__title",
+            "assignment__group__name",
+            "status",
+            "grade",
+            "submitted_at",
+            "link",
+            "file",
+            "feedback_head",
+        )
+    )
+    limit = parse_int_param(request, "limit")
+    if limit is not None:
+        qs = qs[: max(1, limit)]
+
+    def _row(r):
+        pk, first, last, title, group, status, grade, submitted_at, link, file, fb = r
+        return [
+            pk,
+            f"{first} {last}",
+            title,
+            group,
+            status,
+            grade if grade is not None else "",
+            timezone.localtime(submitted_at).strftime("%Y-%m-%d %H:%M"),
+            link or "",
+            default_storage.url(file) if file else "",
+            (fb or "").replace("\n", " ").strip(),
+        ]
 
-    resp = HttpResponse(content_type="text/csv; charset=utf-8")
-    resp["Content-Disposition"] = 'attachment; filename="submissions_export.csv"'
-    w = csv.writer(resp)
     # أعمدة: id أساسي للتحديث
-    w.writerow(
+    return stream_csv(
         [
             "id",
             "student",
@@ -937,118 +1101,42 @@ def bulk_grade_export(request):
             "link",
             "file_url",
             "current_feedback",
-        ]
+        ],
+        map(_row, qs.iterator(chunk_size=2000)),
+        "submissions_export.csv",
+        bom=wants_bom(request),
     )
-    for r in qs:
-        w.writerow(
-            [
-                r.id,
-                f"{r.student.first_name} {r.student.last_name}",
-                r.assignment.title,
-                r.assignment.group.name,
-                r.status,
-                r.grade if r.grade is not None else "",
-                r.submitted_at.strftime("%Y-%m-%d %H:%M"),
-                r.link or "",
-                (r.file.url if r.file else ""),
-                (r.feedback or "").replace("\n", " ").strip()[:500],
-            ]
-        )
-    return resp
 
 
 @teacher_required
 @require_POST
 def bulk_grade_import(request):
-    teacher = request.teacher
+    back = reverse("core:bulk_grade") + "?" + (request.META.get("QUERY_STRING") or "")
     file = request.FILES.get("file")
     if not file:
         messages.error(request, "أرفق ملف CSV أولًا.")
-        return redirect(
-            reverse("core:bulk_grade") + "?" + (request.META.get("QUERY_STRING") or "")
-        )
-
-    import io, csv
+        return redirect(back)
 
     try:
-        text = io.TextIOWrapper(file.file, encoding="utf-8", errors="ignore")
-    except Exception:
-        messages.error(request, "تعذّر قراءة الملف. تأكّد أنه ترميز UTF-8.")
-        return redirect(reverse("core:bulk_grade"))
-
-    reader = csv.DictReader(text)
-    required = {"id", "grade", "status", "feedback"}
-    missing = required - set(
-        h.lower() for h in [c.strip().lower() for c in reader.fieldnames or []]
-    )
-    if missing:
-        messages.error(request, f"الأعمدة المطلوبة مفقودة: {', '.join(missing)}")
-        return redirect(
-            reverse("core:bulk_grade") + "?" + (request.META.get("QUERY_STRING") or "")
-        )
-
-    # سماح بالحالات
-    allowed_status = {
-        HomeworkSubmission.Status.SUBMITTED,
-        HomeworkSubmission.Status.GRADED,
-        HomeworkSubmission.Status.LATE,
+        rows = parse_grade_csv(file)
+    except GradeImportError as exc:
+        messages.error(request, str(exc))
+        return redirect(back)
+
+    result = import_grades(request.teacher, rows, user=request.user)
+    errors = result["errors"]
+    # تقرير الأخطاء لكل صف بيتعرض في صفحة التصحيح (أول 200 بس عشان حجم الـ session)
+    request.session["grade_import_report"] = {
+        "errors": errors[:GRADE_IMPORT_REPORT_LIMIT],
+        "error_count": len(errors),
     }
-    updated = 0
-    skipped = 0
-    errors = 0
-
-    with transaction.atomic():
-        for row in reader:
-            try:
-                sid = int(row.get("id") or row.get("ID") or 0)
-            except Exception:
-                errors += 1
-                continue
-            try:
-                sub = HomeworkSubmission.objects.select_related(
-                    "assignment__group", "assignment"
-                ).get(id=sid, assignment__group__teacher=teacher)
-            except HomeworkSubmission.DoesNotExist:
-                skipped += 1
-                continue
-
-            # قراءة القيم
-            status = (row.get("status") or row.get("STATUS") or "").strip().upper()
-            if status and status not in allowed_status:
-                errors += 1
-                continue
-
-            grade_raw = (row.get("grade") or row.get("GRADE") or "").strip()
-            feedback = (row.get("feedback") or row.get("FEEDBACK") or "").strip()
-
-            # تحديث
-            changed = False
-            if grade_raw != "":
-                try:
-                    grade_val = float(grade_raw)
-                    if sub.grade != grade_val:
-                        sub.grade = grade_val
-                        changed = True
-                except ValueError:
-                    errors += 1
-                    continue
-            if status:
-                if sub.status != status:
-                    sub.status = status
-                    changed = True
-            if feedback != "":
-                if sub.feedback != feedback:
-                    sub.feedback = feedback
-                    changed = True
-
-            if changed:
-                sub.save()
-                updated += 1
-
-    messages.success(request, f"تم تحديث {updated} و تخطّي {skipped} و أخطاء {errors}.")
-    return redirect(
-        reverse("core:bulk_grade") + "?" + (request.META.get("QUERY_STRING") or "")
+    level = messages.warning if errors else messages.success
+    level(
+        request,
+        f"تم تحديث {result['updated']} و بدون تغيير {result['unchanged']} "
+        f"و أخطاء {len(errors)}.",
     )
+    return redirect(back)
 
 
 @login_required
@@ -1081,79 +1169,22 @@ def parent_report_pdf(request, student_id: int, year: int, month: int):
     student = get_object_or_404(Student, id=student_id, parent=request.parent)
     report = get_object_or_404(MonthlyReport, student=student, year=year, month=month)
 
-    # 1) سجّل الخط مباشرة عند ReportLab (بدون @font-face)
-    font_path = finders.find(
-        "fonts/NotoNaskhArabic-Regular.ttf"
-    )  # أو Amiri-Regular.ttf
-    if not font_path:
-        # fallback احتياطي: جرّب Amiri لو موجود
-        font_path = finders.find("fonts/Amiri-Regular.ttf")
-
-    if font_path:
-        try:
-            pdfmetrics.getFont("NotoNaskh")
-        except KeyError:
-            pdfmetrics.registerFont(TTFont("NotoNaskh", font_path))
-            # مو لازم يكون عندك Bold/Italic؛ نربط العائلة لنفس الخط
-            registerFontFamily(
-                "NotoNaskh",
-                normal="NotoNaskh",
-                bold="NotoNaskh",
-                italic="NotoNaskh",
-                boldItalic="NotoNaskh",
-            )
-
-    html_str = render_to_string(
-        "core/parent_report_pdf.html",
-        {
-            "student": student,
-            "report": report,
-            "STATIC_URL": settings.STATIC_URL,
-        },
-    )
-
-    pdf_io = BytesIO()
-    pisa_status = pisa.CreatePDF(
-        src=html_str,
-        dest=pdf_io,
-        encoding="utf-8",
-        # خليه موجود لو عندك صور/لوجو بستايتك؛ للخط ما عاد نحتاجه
-        link_callback=lambda uri, rel: (
-            (finders.find(uri.replace(settings.STATIC_URL, "", 1)) or uri)
-            if uri.startswith(settings.STATIC_URL)
-            else uri
-        ),
-    )
-
-    if pisa_status.err:
+    # كاش content-addressed: نفس البيانات + نفس القالب = نفس الملف بدون xhtml2pdf
+    # مع ووركر Celery: لو مش في الكاش التوليد بيحصل في الخلفية بدل ما يمسك الـ worker
+    render_now = not async_pdf_enabled()
+    try:
+        pdf_file, _hit = report_pdf_file(student, report, render=render_now)
+    except PdfRenderError:
         return HttpResponse("تعذّر توليد PDF بواسطة xhtml2pdf.", status=500)
+    if pdf_file is None:
+        return _start_pdf_job(request, kind=PdfJob.Kind.REPORT, object_id=report.pk)
 
-    filename = f"report_{student.first_name}_{student.last_name}_{year}_{month}.pdf"
-    resp = HttpResponse(pdf_io.getvalue(), content_type="application/pdf")
-    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
-    return resp
-
-
-def _link_callback(uri, rel):
-    """
-    xhtml2pdf يحتاج مسار ملف حقيقي للـ @font-face والصور.
-    نحول STATIC_URL إلى مسار فعلي باستخدام staticfiles finders.
-    """
-    if uri.startswith(settings.STATIC_URL):
-        relative_path = uri.replace(settings.STATIC_URL, "", 1)
-        absolute_path = finders.find(relative_path)
-        if absolute_path:
-            # finders.find قد يرجّع list في بعض الحالات
-            if isinstance(absolute_path, (list, tuple)):
-                absolute_path = absolute_path[0]
-            return absolute_path
-        # لو عملت collectstatic
-        if settings.STATIC_ROOT:
-            import os
-
-            return os.path.join(settings.STATIC_ROOT, relative_path)
-    # اسمح بروابط http(s) كما هي
-    return uri
+    return FileResponse(
+        pdf_file,
+        as_attachment=True,
+        filename=report_filename(student, report),
+        content_type="application/pdf",
+    )
 
 
 @teacher_required
@@ -1211,42 +1242,97 @@ def parent_invoices(request):
         .prefetch_related("payments")
     )
 
-    return render(request, "core/parent_invoices.html", {"invoices": invoices})
+    return render(
+        request,
+        "core/parent_invoices.html",
+        {"invoices": invoices, "billing": _parent_billing(request, parent)},
+    )
+
+
+def teacher_or_parent_required(view_func):
+    """للروابط المشتركة (زي PDF الفاتورة): يمرّر request.teacher أو request.parent."""
 
+    @login_required
+    def _wrapped(request, *args, **kwargs):
+        request.teacher = _get_teacher(request.user)
+        request.parent = None if request.teacher else _get_parent(request.user)
+        if not (request.teacher or request.parent):
+            return redirect("/accounts/login/")
+        return view_func(request, *args, **kwargs)
 
-def _render_pdf(html_str):
-    pdf_io = BytesIO()
-    pisa.CreatePDF(html_str, dest=pdf_io, encoding="utf-8")
-    return pdf_io.getvalue()
+    return _wrapped
 
 
-@teacher_required  # أو استخدم ديكور يمرر لو Teacher أو Parent
+@teacher_or_parent_required
 def invoice_pdf(request, invoice_id: int):
-    qs = Invoice.objects.select_related("student", "group", "parent")
+    qs = Invoice.objects.select_related("student", "group", "parent__user")
 
-    if hasattr(request, "parent") and request.parent:
+    if request.parent:
         inv = get_object_or_404(qs, id=invoice_id, parent=request.parent)
-    elif hasattr(request, "teacher") and request.teacher:
+    elif request.teacher:
         inv = get_object_or_404(qs, id=invoice_id, group__teacher=request.teacher)
     else:
         return HttpResponseForbidden("غير مسموح")
 
-    html = render(
-        request,
-        "core/invoice_pdf.html",
+    try:
+        pdf_file, _hit = invoice_pdf_file(inv, render=not async_pdf_enabled())
+    except PdfRenderError:
+        return HttpResponse("تعذّر توليد PDF بواسطة xhtml2pdf.", status=500)
+    if pdf_file is None:
+        return _start_pdf_job(request, kind=PdfJob.Kind.INVOICE, object_id=inv.pk)
+    return FileResponse(
+        pdf_file,
+        as_attachment=True,
+        filename=invoice_filename(inv),
+        content_type="application/pdf",
+    )
+
+
+def _start_pdf_job(request, **fields):
+    """ينشئ PdfJob ويبعته للووركر ويرجّع صفحة انتظار بتسأل عن الحالة (202)."""
+    job = PdfJob.objects.create(requested_by=request.user, **fields)
+    enqueue_pdf_job(job)
+    return render(request, "core/pdf_job.html", {"job": job}, status=202)
+
+
+@login_required
+@require_GET
+def pdf_job_status(request, job_id: int):
+    job = get_object_or_404(PdfJob, id=job_id, requested_by=request.user)
+    return JsonResponse(
         {
-            "inv": inv,
-            "SITE_NAME": getattr(settings, "SITE_NAME", ""),
-            "SITE_URL": getattr(settings, "SITE_URL", ""),
+            "id": job.id,
+            "kind": job.kind,
+            "status": job.status,
+            "ready": job.status == PdfJob.Status.DONE,
+            "error": job.error,
+            "download_url": (
+                reverse("core:pdf_job_download", args=[job.id])
+                if job.status == PdfJob.Status.DONE
+                else None
+            ),
         },
-    ).content.decode("utf-8")
+        json_dumps_params={"ensure_ascii": False},
+    )
+
 
-    pdf_bytes = _render_pdf(html)
-    resp = HttpResponse(pdf_bytes, content_type="application/pdf")
-    resp["Content-Disposition"] = (
-        f'attachment; filename="invoice_{inv.student.id}_{inv.year}_{inv.month}.pdf"'
+@login_required
+@require_GET
+def pdf_job_download(request, job_id: int):
+    job = get_object_or_404(PdfJob, id=job_id, requested_by=request.user)
+    if job.status != PdfJob.Status.DONE or not job.file:
+        return HttpResponse("الملف لم يجهز بعد.", status=409)
+    content_type = (
+        "application/zip"
+        if job.kind == PdfJob.Kind.INVOICE_BUNDLE
+        else "application/pdf"
+    )
+    return FileResponse(
+        job.file.open("rb"),
+        as_attachment=True,
+        filename=job.filename,
+        content_type=content_type,
     )
-    return resp
 
 
 from django.views.decorators.http import require_POST
@@ -1793,53 +1879,56 @@ def logout_now(request):
     return redirect("core:login")
 
 
-@student_required
-def student_dashboard(request):
-    s = request.user.student_profile.student
-
+def _student_querysets(s):
+    """QuerySets تبويبات الطالب (من غير تقطيع) — مشتركة بين الـ KPIs والتبويبات."""
     # مجموعات الطالب النشطة
     group_ids = list(
         Enrollment.objects.filter(student=s, is_active=True).values_list(
             "group_id", flat=True
         )
     )
+    today = timezone.localdate()
+    return {
+        "assignments": Assignment.objects.filter(group_id__in=group_ids).select_related(
+            "group", "subject", "group__subject"
+        ),
+        "sessions": ClassSession.objects.filter(
+            group_id__in=group_ids, date__range=(today, today + timezone.timedelta(days=7))
+        ).select_related("group", "subject", "group__subject"),
+        "submissions": HomeworkSubmission.objects.filter(student=s).select_related(
+            "assignment", "assignment__group"
+        ),
+        "resources": Resource.objects.filter(
+            Q(group_id__in=group_ids) | Q(session__group_id__in=group_ids)
+        ).select_related("group", "session", "session__group", "subject"),
+    }
 
-    # ====== QuerySets من غير تقطيع علشان pagination ======
-    assignments_qs = (
-        Assignment.objects.filter(group_id__in=group_ids)
-        .select_related("group", "subject", "group__subject")
-        .order_by("-assigned_at")
-    )
 
-    today = timezone.localdate()
-    next_week = today + timezone.timedelta(days=7)
-    sessions_qs = (
-        ClassSession.objects.filter(
-            group_id__in=group_ids, date__range=(today, next_week)
-        )
-        .select_related("group", "subject", "group__subject")
-        .order_by("date", "start_time")
-    )
+@student_required
+def student_dashboard(request):
+    """الصفحة نفسها = هيدر الـ KPIs بس؛ كل تبويب بيتحمّل من student_dashboard_tab."""
+    s = request.user.student_profile.student
+    qs = _student_querysets(s)
 
-    submissions_qs = (
-        HomeworkSubmission.objects.filter(student=s)
-        .select_related("assignment", "assignment__group")
-        .order_by("-submitted_at")
-    )
+    ctx = {
+        "student": s,
+        # الصفحات keyset من غير إجمالي، فأرقام الـ KPIs بـ COUNT صريح (كويريز بسيطة من غير distinct)
+        "kpis": {name: q.count() for name, q in qs.items()},
+        "tabs": _dashboard_tabs(request, "student", STUDENT_TABS, _STUDENT_TAB_BUILDERS),
+        "tab_url": "core:student_dashboard_tab",
+    }
+    return render(request, "core/student_dashboard.html", ctx)
 
-    resources_qs = (
-        Resource.objects.filter(
-            Q(group_id__in=group_ids) | Q(session__group_id__in=group_ids)
-        )
-        .select_related("group", "session", "session__group", "subject")
-        .order_by("-created_at")
-    )
 
-    # ====== Pagination ======
-    assignments = paginate(request, assignments_qs, per_page=10, page_param="page_assg")
-    sessions = paginate(request, sessions_qs, per_page=10, page_param="page_sched")
-    submissions = paginate(request, submissions_qs, per_page=10, page_param="page_subs")
-    resources = paginate(request, resources_qs, per_page=10, page_param="page_res")
+def _student_tab_assignments(request):
+    s = request.user.student_profile.student
+    assignments = cursor_paginate(
+        request,
+        _student_querysets(s)["assignments"],
+        ("-assigned_at", "-id"),
+        per_page=10,
+        cursor_param="page_assg",
+    )
 
     # آخر تسليم لكل واجب "في الصفحة الحالية" بس (أوفر وأسرع)
     current_assignment_ids = [a.id for a in assignments]
@@ -1849,6 +1938,57 @@ def student_dashboard(request):
             student=s, assignment_id__in=current_assignment_ids
         ).select_related("assignment")
     }
+    return {
+        "assignments": assignments,
+        "subs_map": subs_map,
+        "now_ts": int(timezone.now().timestamp()),
+    }
+
+
+def _student_tab_schedule(request):
+    s = request.user.student_profile.student
+    today = timezone.localdate()
+    return {
+        "sessions": cursor_paginate(
+            request,
+            _student_querysets(s)["sessions"],
+            ("date", "start_time", "id"),
+            per_page=10,
+            cursor_param="page_sched",
+        ),
+        "today": today,
+        "next_week": today + timezone.timedelta(days=7),
+    }
+
+
+def _student_tab_submissions(request):
+    s = request.user.student_profile.student
+    return {
+        "submissions": cursor_paginate(
+            request,
+            _student_querysets(s)["submissions"],
+            ("-submitted_at", "-id"),
+            per_page=10,
+            cursor_param="page_subs",
+        ),
+    }
+
+
+def _student_tab_resources(request):
+    s = request.user.student_profile.student
+    return {
+        "resources": cursor_paginate(
+            request,
+            _student_querysets(s)["resources"],
+            ("-created_at", "-id"),
+            per_page=10,
+            cursor_param="page_res",
+        ),
+    }
+
+
+def _student_tab_att(request):
+    s = request.user.student_profile.student
 
     # ====== الحضور (فلترة + ملخص) ======
     sd_from = request.GET.get("att_from")
@@ -1868,7 +2008,11 @@ def student_dashboard(request):
         .filter(attendance_window_q(sd_from_d, sd_to_d))
     )
 
-    summary = annotate_attendance_counts(self_att_q)
+    summary = rollup_attendance_counts(
+        AttendanceDailyRollup.objects.filter(student=s).filter(
+            rollup_window_q(sd_from_d, sd_to_d)
+        )
+    )
     stats = {
         "present": 0,
         "absent": 0,
@@ -1886,27 +2030,44 @@ def student_dashboard(request):
         stats["total"] = r["total"] or 0
         stats["pct_present"] = pct(stats["present"] + stats["late"], stats["total"])
 
-    student_attendance = {
-        "stats": stats,
-        "recent": self_att_q.order_by("-session__date", "-session__start_time")[:20],
-        "from": sd_from or "",
-        "to": sd_to or "",
+    return {
+        "student_attendance": {
+            "stats": stats,
+            "recent": self_att_q.order_by("-session__date", "-session__start_time")[:20],
+            "from": sd_from or "",
+            "to": sd_to or "",
+        },
     }
 
-    ctx = {
-        "student": s,
-        # Page objects (زي ما القالب متوقع)
-        "assignments": assignments,
-        "sessions": sessions,
-        "submissions": submissions,
-        "resources": resources,
-        "subs_map": subs_map,
-        "today": today,
-        "next_week": next_week,
-        "now_ts": int(timezone.now().timestamp()),
-        "student_attendance": student_attendance,
-    }
-    return render(request, "core/student_dashboard.html", ctx)
+
+# "checkin" (ماسح الـ QR) ملوش بيانات، فبيتضمّن في الصفحة على طول
+STUDENT_TABS = (
+    ("assignments", "واجباتي"),
+    ("schedule", "جدول حصصي"),
+    ("submissions", "تسليماتي ونتائجي"),
+    ("resources", "موارد"),
+    ("checkin", "الحضور (QR)"),
+    ("att", "الحضور"),
+)
+_STUDENT_TAB_BUILDERS = {
+    "assignments": _student_tab_assignments,
+    "schedule": _student_tab_schedule,
+    "submissions": _student_tab_submissions,
+    "resources": _student_tab_resources,
+    "att": _student_tab_att,
+}
+_STUDENT_TAB_CACHE = {
+    "att": (
+        fragment_cache.STUDENT_ATTENDANCE,
+        lambda request: request.user.student_profile.student_id,
+    ),
+}
+
+
+@student_required
+@require_GET
+def student_dashboard_tab(request, tab):
+    return _render_tab(request, "student", _STUDENT_TAB_BUILDERS, tab, _STUDENT_TAB_CACHE)
 
 
 @student_required
@@ -2348,7 +2509,7 @@ def resource_update(request, pk):
         if form.is_valid():
             form.save()
             messages.success(request, "تم تحديث المورد بنجاح.")
-            return redirect(reverse("core:dashboard") + "#tab-resources")
+            return redirect(reverse("core:dashboard") + "?tab=resources")
     else:
         form = ResourceForm(instance=obj)
     return render(
@@ -2362,7 +2523,7 @@ def resource_delete(request, pk):
     obj = get_object_or_404(_resource_queryset_for_teacher(request.teacher), pk=pk)
     obj.delete()
     messages.success(request, "تم حذف المورد.")
-    return redirect(reverse("core:dashboard") + "#tab-resources")
+    return redirect(reverse("core:dashboard") + "?tab=resources")
 
 
 @teacher_required
@@ -2397,7 +2558,7 @@ def invoice_create(request):
         messages.success(request, "تم إنشاء الفاتورة بنجاح.")
         url = (
             f"{reverse('core:dashboard')}"
-            f"?year={inv.year}&month={inv.month}&group={inv.group_id}#tab-billing"
+            f"?year={inv.year}&month={inv.month}&group={inv.group_id}&tab=billing"
         )
         return redirect(url)
 
@@ -2419,7 +2580,7 @@ def invoice_update(request, pk):
         # تحديث الحالة بناءً على المدفوعات
         inv.refresh_status(commit=True)
         messages.success(request, "تم تحديث الفاتورة.")
-        return redirect(reverse("core:dashboard") + "#tab-billing")
+        return redirect(reverse("core:dashboard") + "?tab=billing")
     return render(
         request, "core/invoice_form.html", {"form": form, "mode": "edit", "obj": inv}
     )
@@ -2431,7 +2592,7 @@ def invoice_delete(request, pk):
     inv = get_object_or_404(_invoice_qs_for_teacher(request.teacher), pk=pk)
     inv.delete()
     messages.success(request, "تم حذف الفاتورة.")
-    return redirect(reverse("core:dashboard") + "#tab-billing")
+    return redirect(reverse("core:dashboard") + "?tab=billing")
 
 
 @teacher_required
@@ -2440,35 +2601,60 @@ def invoice_bulk_create(request):
     form = InvoiceBulkForm(request.POST or None, teacher=request.teacher)
     created = skipped = 0
     if request.method == "POST" and form.is_valid():
-        group = form.cleaned_data["group"]
-        year = form.cleaned_data["year"]
-        month = form.cleaned_data["month"]
-        amount = form.cleaned_data["amount"]
-        with transaction.atomic():
-            enrolls = Enrollment.objects.select_related(
-                "student", "student__parent"
-            ).filter(group=group, is_active=True)
-            for en in enrolls:
-                # ما تعملش دبلكيشن: نفس (parent, student, group, year, month)
-                inv, was_created = Invoice.objects.get_or_create(
-                    parent=en.student.parent,
-                    student=en.student,
-                    group=group,
-                    year=year,
-                    month=month,
-                    defaults={"amount_egp": amount},
-                )
-                if was_created:
-                    created += 1
-                else:
-                    skipped += 1
+        cd = form.cleaned_data
+        groups = (
+            _teacher_groups(request.teacher)
+            if cd["all_groups"]
+            else Group.objects.filter(pk=cd["group"].pk)
+        )
+        created, skipped = issue_monthly_invoices(
+            groups, cd["year"], cd["month"], cd["amount"], due_date=cd.get("due_date")
+        )
         messages.success(
-            request, f"تم إنشاء {created} فاتورة. تم تجاهل {skipped} (موجودة مسبقًا)."
+            request,
+            f"تم إنشاء {created} فاتورة. تم تجاهل {skipped} (موجودة مسبقًا أو بدون وليّ أمر).",
         )
-        return redirect(reverse("core:dashboard") + "#tab-billing")
+        return redirect(reverse("core:dashboard") + "?tab=billing")
     return render(request, "core/invoice_bulk_form.html", {"form": form})
 
 
+@teacher_required
+@require_http_methods(["GET", "POST"])
+def invoice_bundle(request):
+    """كل فواتير شهر لمجموعة في ملف ZIP واحد (في الخلفية لو في ووركر Celery)."""
+    today = timezone.localdate()
+    form = InvoiceBundleForm(
+        request.POST or None,
+        teacher=request.teacher,
+        initial={"year": today.year, "month": today.month},
+    )
+    if request.method == "POST" and form.is_valid():
+        cd = form.cleaned_data
+        group, year, month = cd["group"], cd["year"], cd["month"]
+        if not bundle_invoices_qs(group, year, month).exists():
+            messages.info(request, "لا توجد فواتير لهذه المجموعة في الشهر المختار.")
+            return redirect("core:invoice_bundle")
+        if async_pdf_enabled():
+            return _start_pdf_job(
+                request,
+                kind=PdfJob.Kind.INVOICE_BUNDLE,
+                group=group,
+                year=year,
+                month=month,
+            )
+        try:
+            bundle, _count = build_invoice_bundle(group, year, month)
+        except PdfRenderError:
+            return HttpResponse("تعذّر توليد PDF بواسطة xhtml2pdf.", status=500)
+        return FileResponse(
+            bundle,
+            as_attachment=True,
+            filename=bundle_filename(group, year, month),
+            content_type="application/zip",
+        )
+    return render(request, "core/invoice_bundle_form.html", {"form": form})
+
+
 @teacher_required
 @require_http_methods(["GET", "POST"])
 def payment_create(request, pk):
@@ -49,6 +49,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "simple_history.middleware.HistoryRequestMiddleware",
+    "core.middleware.RequestProfilingMiddleware",
 ]
 
 ROOT_URLCONF = 'math_tutor.urls'
@@ -149,6 +150,10 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": 300.0,  # كل 5 دقايق
         "args":(120,)
     },
+    "invoice-status-nightly": {
+        "task": "core.tasks.refresh_invoice_statuses_nightly",
+        "schedule": crontab(hour=0, minute=10),  # بعد منتصف الليل: DUE → OVERDUE
+    },
     "invoice-daily-reminder": {
         "task": "core.tasks.remind_overdue_invoices",
         "schedule": crontab(hour=18, minute=0),  # يوميًا 6 مساءً
@@ -157,7 +162,46 @@ CELERY_BEAT_SCHEDULE = {
         "task": "core.tasks.cleanup_expired_qr",
         "schedule": crontab(minute="*/30"),
     },
+    "monthly-reports": {
+        "task": "core.tasks.generate_monthly_reports_task",
+        "schedule": crontab(day_of_month=1, hour=2, minute=0),  # تقارير الشهر اللي فات
+    },
+    "cleanup-pdf-jobs": {
+        "task": "core.tasks.cleanup_pdf_jobs",
+        "schedule": crontab(hour=3, minute=30),
+    },
 }
+# قياس الطلبات (عدد الكويريز/زمن الداتابيز/القوالب) — core.middleware.RequestProfilingMiddleware
+# الملخص: /ops/profiling.json (staff) أو python manage.py profiling_dump
+REQUEST_PROFILING = False
+REQUEST_PROFILING_SAMPLE_LIMIT = 50  # حلقة آخر N عيّنة لكل فيو (للـ percentiles)
+REQUEST_PROFILING_DUPLICATE_THRESHOLD = 3  # نفس الكويري كام مرة يعتبر N+1
+
+# أقل عدد أيام بين ملخّصين للفواتير المتأخرة لنفس وليّ الأمر
+OVERDUE_DIGEST_INTERVAL_DAYS = 3
+
+# ملفات PDF المولّدة في الخلفية (PdfJob) متاحة للتحميل المدة دي وبعدين تتمسح
+PDF_JOB_TTL_HOURS = 24
+
 # تشغيل المهام فورًا داخل نفس بروسيس Django (بدون ووركر)
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
+
+# الكاش: locmem في التطوير، وRedis في الإنتاج على نفس هوست الـ broker (داتابيز 2
+# علشان ما يتخلطش مع طوابير Celery ونتايجها في 0 و1)
+CACHE_REDIS_URL = CELERY_BROKER_URL.rsplit("/", 1)[0] + "/2"
+if DEBUG:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+        },
+    }
+
+# مدة كاش أجزاء اللوحات (core.services.fragment_cache) — الإبطال الفعلي بالسيجنالز
+# والمدة دي حد أقصى بس. الإحصائيات: /ops/fragment-cache.json
+FRAGMENT_CACHE_TTL = 60 * 10